@@ -0,0 +1,517 @@
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+import conditional
+import email_service
+import idempotency
+import models, schemas
+
+# The admission path decides whether a booking request gets a seat.
+#
+# Instead of counting the bookings for a slot and then inserting (which lets two
+# concurrent requests both see a free seat), a seat is claimed with a single
+# conditional UPDATE on the slot's booked_count. The database only applies the
+# increment while the slot is below capacity, so it can never oversell. The
+# booking row is then inserted in the same transaction. The unique constraint on
+# (time_slot_id, user_email) rejects duplicates, and when it does the rollback
+# also gives the claimed seat back. The confirmation email is queued in the
+# outbox and the event's version is bumped in the same transaction (see
+# email_service.py and conditional.py).
+#
+# Cancellation and the waitlist work on the same counter. Every transaction
+# that changes who holds or waits for a seat in a slot first updates the
+# slot's row. On PostgreSQL that row lock orders cancellations, waitlist
+# joins and bookings of one slot; SQLite serializes all writers anyway. A
+# cancelled seat goes to the oldest waitlist entry in the same transaction,
+# and the counter is not decremented while someone is waiting. A freed seat
+# is never visible to a concurrent booking request while someone waits.
+
+
+def _claim_seat(db: Session, event_id: int, time_slot_id: int) -> bool:
+    """
+    Atomically take one seat in a time slot if it still has capacity.
+
+    Args:
+        db: Database session
+        event_id: The event the slot must belong to
+        time_slot_id: The slot to claim a seat in
+
+    Returns:
+        bool: True if a seat was claimed, False if the slot is missing or full
+    """
+    capacity = (
+        select(models.Event.max_bookings_per_slot)
+        .where(models.Event.id == event_id)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(models.TimeSlot)
+        .where(
+            models.TimeSlot.id == time_slot_id,
+            models.TimeSlot.event_id == event_id,
+            models.TimeSlot.booked_count < capacity,
+        )
+        .values(booked_count=models.TimeSlot.booked_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _rejection(db: Session, event_id: int, time_slot_id: int) -> HTTPException:
+    """
+    Work out why a seat could not be claimed.
+
+    This only runs when admission fails, so the happy path stays at one
+    UPDATE and one INSERT.
+    """
+    row = db.execute(
+        select(models.Event.max_bookings_per_slot, models.TimeSlot.id)
+        .select_from(models.Event)
+        .outerjoin(
+            models.TimeSlot,
+            (models.TimeSlot.event_id == models.Event.id) & (models.TimeSlot.id == time_slot_id),
+        )
+        .where(models.Event.id == event_id)
+    ).first()
+
+    if row is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event with ID {event_id} not found"
+        )
+    if row.id is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Time slot with ID {time_slot_id} not found for this event"
+        )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"This time slot is already fully booked (max {row.max_bookings_per_slot} bookings allowed)"
+    )
+
+
+def admit_booking(
+    db: Session,
+    event_id: int,
+    booking: schemas.BookingCreate,
+    idempotency_key: Optional[str] = None,
+    request_hash: Optional[str] = None,
+) -> schemas.Booking:
+    """
+    Admit or reject a booking in a single transaction.
+
+    Args:
+        db: Database session
+        event_id: The ID of the event to book
+        booking: The booking data (user name, email, time slot ID)
+        idempotency_key: Key to store the response under (see idempotency.py)
+        request_hash: Fingerprint of the request the key belongs to
+
+    Returns:
+        Booking: The created booking
+
+    Raises:
+        HTTPException: 404 if the event or slot does not exist, 409 if the slot
+            is full or the user already booked it
+    """
+    try:
+        if not _claim_seat(db, event_id, booking.time_slot_id):
+            error = _rejection(db, event_id, booking.time_slot_id)
+            db.rollback()
+            raise error
+
+        db_booking = models.Booking(
+            time_slot_id=booking.time_slot_id,
+            user_name=booking.user_name,
+            user_email=booking.user_email
+        )
+        db.add(db_booking)
+        db.flush()
+        email_service.enqueue_booking_email(db, "confirmation", db_booking.id)
+
+        # Build the response before committing so the committed (and expired)
+        # object does not have to be reloaded from the database.
+        result = schemas.Booking.model_validate(db_booking)
+        if idempotency_key is not None:
+            idempotency.store(db, idempotency_key, request_hash, status.HTTP_201_CREATED, result.model_dump())
+        # Last, so the event row lock is held only until the commit below.
+        conditional.bump_event_version(db, event_id)
+        db.commit()
+        return result
+
+    except IntegrityError:
+        # The unique constraint caught a duplicate booking. Rolling back also
+        # releases the seat claimed above.
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="You have already booked this time slot"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create booking: {str(e)}"
+        )
+
+
+def _batch_blockers(db: Session, event_id: int, batch: schemas.BatchBookingCreate) -> List[dict]:
+    """
+    Why each slot of a rejected batch could not be booked, in one SELECT.
+
+    Returns:
+        List[dict]: {"time_slot_id", "reason"} per blocking slot, where the
+        reason is 'not_found', 'full' or 'already_booked'
+    """
+    already_booked = (
+        select(models.Booking.id)
+        .where(models.Booking.time_slot_id == models.TimeSlot.id, models.Booking.user_email == batch.user_email)
+        .exists()
+    )
+    rows = db.execute(
+        select(
+            models.TimeSlot.id,
+            models.TimeSlot.booked_count >= models.Event.max_bookings_per_slot,
+            already_booked,
+        )
+        .join(models.Event, models.Event.id == models.TimeSlot.event_id)
+        .where(models.TimeSlot.id.in_(batch.time_slot_ids), models.TimeSlot.event_id == event_id)
+    ).all()
+    found = {slot_id: (full, booked) for slot_id, full, booked in rows}
+    blockers = []
+    for slot_id in batch.time_slot_ids:
+        if slot_id not in found:
+            blockers.append({"time_slot_id": slot_id, "reason": "not_found"})
+        elif found[slot_id][1]:
+            blockers.append({"time_slot_id": slot_id, "reason": "already_booked"})
+        elif found[slot_id][0]:
+            blockers.append({"time_slot_id": slot_id, "reason": "full"})
+    return blockers
+
+
+def admit_booking_batch(db: Session, event_id: int, batch: schemas.BatchBookingCreate) -> List[schemas.Booking]:
+    """
+    Book several slots of an event for one user, all or nothing, in one transaction.
+
+    The seats are claimed with one UPDATE over all the slots, which only
+    counts the slots that are below capacity and not booked by the user yet.
+    If it claimed fewer seats than requested, nothing is kept. Otherwise the
+    bookings are written with one multi-row INSERT and their emails with one
+    INSERT ... SELECT. On PostgreSQL the slot rows are locked in ID order
+    first, so two batches over overlapping slots cannot deadlock.
+
+    Args:
+        db: Database session
+        event_id: The ID of the event to book
+        batch: The user and the slots to book
+
+    Returns:
+        List[Booking]: The created bookings, in the order of batch.time_slot_ids
+
+    Raises:
+        HTTPException: 404 if the event does not exist, 409 with the blocking
+            slots (see _batch_blockers) if any slot cannot be booked
+    """
+    def rejected():
+        # Roll back first, so the seats claimed by this batch are not
+        # reported as blocking it.
+        db.rollback()
+        if db.get(models.Event, event_id) is None:
+            return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Event with ID {event_id} not found")
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "None of the slots were booked", "blocked": _batch_blockers(db, event_id, batch)},
+        )
+
+    slot_ids = batch.time_slot_ids
+    try:
+        db.execute(
+            select(models.TimeSlot.id)
+            .where(models.TimeSlot.id.in_(slot_ids))
+            .order_by(models.TimeSlot.id)
+            .with_for_update()
+        )
+        capacity = (
+            select(models.Event.max_bookings_per_slot)
+            .where(models.Event.id == event_id)
+            .scalar_subquery()
+        )
+        already_booked = (
+            select(models.Booking.id)
+            .where(models.Booking.time_slot_id == models.TimeSlot.id, models.Booking.user_email == batch.user_email)
+            .exists()
+        )
+        claimed = db.execute(
+            update(models.TimeSlot)
+            .where(
+                models.TimeSlot.id.in_(slot_ids),
+                models.TimeSlot.event_id == event_id,
+                models.TimeSlot.booked_count < capacity,
+                ~already_booked,
+            )
+            .values(booked_count=models.TimeSlot.booked_count + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed != len(slot_ids):
+            raise rejected()
+
+        # Without sort_by_parameter_order, which makes SQLite fall back to one
+        # INSERT per row; a slot appears once per batch, so its ID orders them.
+        inserted = db.scalars(
+            insert(models.Booking).returning(models.Booking),
+            [
+                {"time_slot_id": slot_id, "user_name": batch.user_name, "user_email": batch.user_email}
+                for slot_id in slot_ids
+            ],
+        ).all()
+        by_slot = {booking.time_slot_id: booking for booking in inserted}
+        bookings = [by_slot[slot_id] for slot_id in slot_ids]
+        email_service.enqueue_booking_emails(db, "confirmation", [booking.id for booking in bookings])
+        result = [schemas.Booking.model_validate(booking) for booking in bookings]
+        # Last, so the event row lock is held only until the commit below.
+        conditional.bump_event_version(db, event_id)
+        db.commit()
+        return result
+
+    except IntegrityError:
+        # A concurrent request booked one of the slots for the same user.
+        raise rejected()
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create bookings: {str(e)}"
+        )
+
+
+def _lock_slot(db: Session, time_slot_id: int, delta: int = 0, *conditions) -> bool:
+    """
+    Lock a slot's row for this transaction by updating its booked_count.
+
+    Args:
+        db: Database session
+        time_slot_id: The slot to lock
+        delta: Change to apply to booked_count (0 just takes the lock)
+        conditions: Extra conditions the slot must meet
+
+    Returns:
+        bool: True if the slot exists and met the conditions
+    """
+    result = db.execute(
+        update(models.TimeSlot)
+        .where(models.TimeSlot.id == time_slot_id, *conditions)
+        .values(booked_count=models.TimeSlot.booked_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _waitlist_position(db: Session, entry: models.WaitlistEntry) -> int:
+    return db.scalar(
+        select(func.count(models.WaitlistEntry.id)).where(
+            models.WaitlistEntry.time_slot_id == entry.time_slot_id,
+            models.WaitlistEntry.id <= entry.id,
+        )
+    )
+
+
+def join_waitlist(db: Session, event_id: int, booking: schemas.BookingCreate) -> schemas.WaitlistEntry:
+    """
+    Put a user on the waitlist of a fully booked slot.
+
+    Args:
+        db: Database session
+        event_id: The event the slot must belong to
+        booking: The user's name and email, and the time_slot_id to wait for
+
+    Returns:
+        WaitlistEntry: The entry and its position in the queue
+
+    Raises:
+        HTTPException: 404 if the event or slot does not exist, 409 if the slot
+            still has free seats or the user already booked or waits for it
+    """
+    capacity = (
+        select(models.Event.max_bookings_per_slot)
+        .where(models.Event.id == event_id)
+        .scalar_subquery()
+    )
+    try:
+        if not _lock_slot(
+            db, booking.time_slot_id, 0,
+            models.TimeSlot.event_id == event_id,
+            models.TimeSlot.booked_count >= capacity,
+        ):
+            error = _rejection(db, event_id, booking.time_slot_id)
+            db.rollback()
+            if error.status_code == status.HTTP_409_CONFLICT:
+                error.detail = "This time slot still has free seats; book it instead"
+            raise error
+
+        already_booked = db.scalar(
+            select(models.Booking.id).where(
+                models.Booking.time_slot_id == booking.time_slot_id,
+                models.Booking.user_email == booking.user_email,
+            )
+        )
+        if already_booked is not None:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="You have already booked this time slot"
+            )
+
+        entry = models.WaitlistEntry(
+            time_slot_id=booking.time_slot_id,
+            user_name=booking.user_name,
+            user_email=booking.user_email,
+        )
+        db.add(entry)
+        db.flush()
+        result = schemas.WaitlistEntry(
+            id=entry.id,
+            time_slot_id=entry.time_slot_id,
+            user_name=entry.user_name,
+            user_email=entry.user_email,
+            created_at=entry.created_at,
+            position=_waitlist_position(db, entry),
+        )
+        db.commit()
+        return result
+
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="You are already on the waitlist for this time slot"
+        )
+
+
+def leave_waitlist(db: Session, entry_id: int) -> None:
+    """
+    Remove a waitlist entry.
+
+    Raises:
+        HTTPException: 404 if the entry does not exist
+    """
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Waitlist entry with ID {entry_id} not found"
+    )
+    time_slot_id = db.scalar(select(models.WaitlistEntry.time_slot_id).where(models.WaitlistEntry.id == entry_id))
+    if time_slot_id is None:
+        raise not_found
+    # Lock the slot first, so a concurrent cancellation cannot promote the entry meanwhile.
+    _lock_slot(db, time_slot_id)
+    deleted = db.execute(delete(models.WaitlistEntry).where(models.WaitlistEntry.id == entry_id)).rowcount
+    if deleted == 0:
+        # Promoted or removed by a concurrent request since the lookup above.
+        db.rollback()
+        raise not_found
+    db.commit()
+
+
+def _promote_next(db: Session, time_slot_id: int) -> Optional[models.Booking]:
+    """
+    Turn the oldest waitlist entry of a slot into a booking, in the caller's transaction.
+
+    Entries whose user meanwhile holds a booking of the slot are dropped.
+    The caller holds the slot's row lock.
+
+    Returns:
+        Booking: The new booking, or None if nobody is waiting
+    """
+    while True:
+        entry = db.scalar(
+            select(models.WaitlistEntry)
+            .where(models.WaitlistEntry.time_slot_id == time_slot_id)
+            .order_by(models.WaitlistEntry.id)
+            .limit(1)
+        )
+        if entry is None:
+            return None
+        db.delete(entry)
+        promoted = models.Booking(
+            time_slot_id=time_slot_id,
+            user_name=entry.user_name,
+            user_email=entry.user_email,
+        )
+        try:
+            with db.begin_nested():
+                db.add(promoted)
+        except IntegrityError:
+            # Already booked; the entry is still deleted by the outer transaction.
+            continue
+        return promoted
+
+
+def cancel_and_promote(db: Session, booking_id: int) -> Tuple[int, schemas.CancellationResult]:
+    """
+    Cancel a booking and hand its seat to the waitlist, in a single transaction.
+
+    The slot's booked_count is decremented first, which locks the slot. If
+    someone is waiting, the oldest entry becomes a booking and the count is
+    restored. The cancellation email (and the promoted user's confirmation)
+    are queued in the outbox.
+
+    Args:
+        db: Database session
+        booking_id: The ID of the booking to cancel
+
+    Returns:
+        Tuple[int, CancellationResult]: The event ID of the booking, and the
+        cancelled booking ID with the promoted booking, if any
+
+    Raises:
+        HTTPException: 404 if the booking does not exist (or was just cancelled)
+    """
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Booking with ID {booking_id} not found"
+    )
+    row = db.execute(
+        select(models.Booking.time_slot_id, models.TimeSlot.event_id)
+        .join(models.TimeSlot, models.TimeSlot.id == models.Booking.time_slot_id)
+        .where(models.Booking.id == booking_id)
+    ).first()
+    if row is None:
+        raise not_found
+
+    try:
+        _lock_slot(db, row.time_slot_id, -1)
+        # Must run while the booking row still exists.
+        email_service.enqueue_booking_email(db, "cancellation", booking_id)
+        deleted = db.execute(
+            delete(models.Booking)
+            .where(models.Booking.id == booking_id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if deleted == 0:
+            # Cancelled by a concurrent request since the lookup above.
+            db.rollback()
+            raise not_found
+
+        promoted = _promote_next(db, row.time_slot_id)
+        result = schemas.CancellationResult(cancelled_booking_id=booking_id)
+        if promoted is not None:
+            _lock_slot(db, row.time_slot_id, +1)
+            email_service.enqueue_booking_email(db, "confirmation", promoted.id)
+            result.promoted = schemas.Booking.model_validate(promoted)
+        conditional.bump_event_version(db, row.event_id)
+        db.commit()
+        return row.event_id, result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to cancel booking: {str(e)}"
+        )
@@ -0,0 +1,93 @@
+"""
+Hot-slot admission benchmark: many parallel bookings against one slot.
+
+Seeds one event with a single slot of --capacity seats, fires --attempts
+bookings at it from --threads threads through admission.admit_booking, and
+checks that exactly --capacity were admitted (no oversell).
+
+    python benchmarks/bench_admission.py --attempts 2000 --threads 64
+    python benchmarks/bench_admission.py --database-url postgresql://localhost/bench
+
+Prints a JSON report with the outcome counts and the throughput.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=1000)
+    parser.add_argument("--capacity", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--database-url", help="Use this database instead of a temporary SQLite file")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bookmyslot-bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    sys.path.insert(0, ROOT)
+    from fastapi import HTTPException
+    from sqlalchemy import func, select
+
+    import models, schemas
+    from admission import admit_booking
+    from database import SessionLocal, engine
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        event = models.Event(title="Hot slot", max_bookings_per_slot=args.capacity)
+        event.time_slots.append(models.TimeSlot(start_time=datetime.datetime(2030, 1, 1, 9)))
+        db.add(event)
+        db.commit()
+        event_id, slot_id = event.id, event.time_slots[0].id
+
+    def attempt(i):
+        with SessionLocal() as db:
+            try:
+                admit_booking(db, event_id, schemas.BookingCreate(
+                    time_slot_id=slot_id, user_name=f"User {i}", user_email=f"user{i}@example.com"
+                ))
+                return 201
+            except HTTPException as e:
+                return e.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        outcomes = list(pool.map(attempt, range(args.attempts)))
+    elapsed = time.perf_counter() - started
+
+    with SessionLocal() as db:
+        stored = db.scalar(select(func.count(models.Booking.id)).where(models.Booking.time_slot_id == slot_id))
+
+    report = {
+        "database": engine.dialect.name,
+        "attempts": args.attempts,
+        "threads": args.threads,
+        "capacity": args.capacity,
+        "admitted": outcomes.count(201),
+        "rejected_full": outcomes.count(409),
+        "errors": len(outcomes) - outcomes.count(201) - outcomes.count(409),
+        "oversold": max(stored - args.capacity, 0),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(args.attempts / elapsed, 1),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.database_url:
+        models.Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Benchmark suite for the main API endpoints.
+
+Seeds a fresh SQLite database (or the PostgreSQL database given with
+--database-url) with --events events of --slots slots each, holding
+--bookings-per-slot bookings spread over --users users, then drives the
+FastAPI app from main.py in-process through httpx's ASGI transport. Each
+scenario sends --requests requests with at most --concurrency in flight and
+records latency percentiles and throughput:
+
+    get_event           GET /events/{id}
+    get_event_summary   GET /events/{id}?view=summary
+    get_all_events      GET /events/?after_id=...
+    user_bookings       GET /bookings/users/{email}/bookings?include=details
+    create_booking      POST a booking on a random slot
+    hot_slot            POST bookings that all compete for one slot of --hot-capacity seats
+
+    python benchmarks/bench_api.py --events 1000 --slots 20 --bookings-per-slot 5 --output run.json
+    python benchmarks/bench_api.py --output new.json --compare run.json
+
+The JSON report records the data volumes and settings next to the results.
+With --compare, each scenario's p95 latency and throughput are compared with
+an earlier report, and the exit status is 1 if any scenario's p95 got worse
+by more than --threshold percent.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEED_CHUNK = 5000
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, statuses, ok_statuses):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(statuses),
+        "errors": sum(1 for code in statuses if code not in ok_statuses),
+        "status_counts": {str(code): statuses.count(code) for code in sorted(set(statuses))},
+        "seconds": round(elapsed, 3),
+        "rps": round(len(statuses) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def seed(args):
+    """Bulk-insert the benchmark data and return what the scenarios need to address it."""
+    from sqlalchemy import insert
+
+    import models
+    from database import engine
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    # Room for every booking the create_booking scenario adds on top of the seed.
+    capacity = args.bookings_per_slot + args.requests
+    start = datetime.datetime(2030, 1, 1, 8)
+    created_at = datetime.datetime(2025, 1, 1)
+
+    with engine.begin() as conn:
+        for first in range(0, args.events, SEED_CHUNK):
+            conn.execute(insert(models.Event), [
+                {"id": e + 1, "title": f"Bench event {e}", "description": "Seeded", "max_bookings_per_slot": capacity}
+                for e in range(first, min(first + SEED_CHUNK, args.events))
+            ])
+        slot_count = args.events * args.slots
+        for first in range(0, slot_count, SEED_CHUNK):
+            conn.execute(insert(models.TimeSlot), [
+                {
+                    "id": s + 1,
+                    "event_id": s // args.slots + 1,
+                    "start_time": start + datetime.timedelta(hours=s % args.slots),
+                    "booked_count": args.bookings_per_slot,
+                }
+                for s in range(first, min(first + SEED_CHUNK, slot_count))
+            ])
+        booking_count = slot_count * args.bookings_per_slot
+        for first in range(0, booking_count, SEED_CHUNK):
+            rows = []
+            for b in range(first, min(first + SEED_CHUNK, booking_count)):
+                slot, position = divmod(b, args.bookings_per_slot)
+                # Distinct users within a slot as long as users >= bookings per slot.
+                user = (slot + position) % args.users
+                rows.append({
+                    "time_slot_id": slot + 1,
+                    "user_name": f"User {user}",
+                    "user_email": f"user{user}@example.com",
+                    "created_at": created_at + datetime.timedelta(seconds=b),
+                })
+            conn.execute(insert(models.Booking), rows)
+
+        # The hot slot lives in its own event so its capacity is independent.
+        conn.execute(insert(models.Event), [{
+            "id": args.events + 1, "title": "Hot slot", "description": None, "max_bookings_per_slot": args.hot_capacity,
+        }])
+        conn.execute(insert(models.TimeSlot), [{
+            "id": slot_count + 1, "event_id": args.events + 1, "start_time": start, "booked_count": 0,
+        }])
+
+    return {"slots": slot_count, "hot_event": args.events + 1, "hot_slot": slot_count + 1}
+
+
+async def run_scenarios(app, args, data):
+    import httpx
+
+    rng = random.Random(args.seed)
+    # Unhandled errors (e.g. pool timeouts) become 500s and count as errors.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+    def create_booking(i):
+        slot = rng.randrange(data["slots"])
+        return (
+            "POST", f"/bookings/events/{slot // args.slots + 1}/bookings",
+            {"time_slot_id": slot + 1, "user_name": "Bench", "user_email": f"bench{i}@example.com"},
+        )
+
+    scenarios = {
+        "get_event": lambda i: ("GET", f"/events/{rng.randint(1, args.events)}", None),
+        "get_event_summary": lambda i: ("GET", f"/events/{rng.randint(1, args.events)}?view=summary", None),
+        "get_all_events": lambda i: ("GET", f"/events/?after_id={rng.randrange(args.events)}&limit=50", None),
+        "user_bookings": lambda i: (
+            "GET", f"/bookings/users/user{rng.randrange(args.users)}@example.com/bookings?include=details", None
+        ),
+        "create_booking": create_booking,
+        "hot_slot": lambda i: (
+            "POST", f"/bookings/events/{data['hot_event']}/bookings",
+            {"time_slot_id": data["hot_slot"], "user_name": "Hot", "user_email": f"hot{i}@example.com"},
+        ),
+    }
+    # Full slots are an expected outcome of the hot-slot scenario, not an error.
+    ok_statuses = {"create_booking": {201}, "hot_slot": {201, 409}}
+
+    report = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.scenarios:
+            make_request = scenarios[name]
+            semaphore = asyncio.Semaphore(args.concurrency)
+            latencies, statuses = [], []
+
+            async def one(i):
+                method, url, body = make_request(i)
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.request(method, url, json=body)
+                    latencies.append(time.perf_counter() - started)
+                    statuses.append(response.status_code)
+
+            # A few untimed requests first, so connection setup and cold caches
+            # do not land in the percentiles. Writes are not warmed up, they
+            # would change the data being measured.
+            if name in READ_SCENARIOS:
+                for i in range(args.warmup):
+                    method, url, body = make_request(-1 - i)
+                    await client.request(method, url, json=body)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(args.requests)))
+            report[name] = summarize(latencies, time.perf_counter() - started, statuses, ok_statuses.get(name, {200}))
+            if name == "hot_slot":
+                report[name]["admitted"] = statuses.count(201)
+                report[name]["oversold"] = max(statuses.count(201) - args.hot_capacity, 0)
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Print the change against a baseline report; return True if a p95 regressed past threshold."""
+    regressed = False
+    print(f"{'scenario':<20}{'p95 ms':>12}{'was':>12}{'change':>10}{'rps':>10}{'was':>10}", file=sys.stderr)
+    for name, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+        change = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressed = True
+            flag = "  REGRESSION"
+        print(
+            f"{name:<20}{result['p95_ms']:>12}{old['p95_ms']:>12}{change:>+9.1f}%"
+            f"{result['rps']:>10}{old['rps']:>10}{flag}",
+            file=sys.stderr,
+        )
+    return regressed
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+READ_SCENARIOS = ["get_event", "get_event_summary", "get_all_events", "user_bookings"]
+SCENARIOS = READ_SCENARIOS + ["create_booking", "hot_slot"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=10, help="Slots per event")
+    parser.add_argument("--bookings-per-slot", type=int, default=3)
+    parser.add_argument("--users", type=int, default=500, help="Distinct users the seeded bookings belong to")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests before each read scenario")
+    parser.add_argument("--hot-capacity", type=int, default=50)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--cache", choices=["memory", "none"], default="memory", help="CACHE_BACKEND for the run")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the request mix")
+    parser.add_argument("--database-url", help="Use this database instead of a temporary SQLite file")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare with")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed p95 increase in percent with --compare")
+    args = parser.parse_args()
+    if args.users < args.bookings_per_slot:
+        parser.error("--users must be at least --bookings-per-slot")
+
+    tmp = tempfile.mkdtemp(prefix="bookmyslot-bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["CACHE_BACKEND"] = args.cache
+    # Every simulated user shares one client address.
+    os.environ["RATE_LIMIT_BACKEND"] = "none"
+    sys.path.insert(0, ROOT)
+
+    from database import engine
+    from main import app
+
+    data = seed(args)
+    scenarios = asyncio.run(run_scenarios(app, args, data))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "database": engine.dialect.name,
+            "cache": args.cache,
+            "events": args.events,
+            "slots_per_event": args.slots,
+            "bookings_per_slot": args.bookings_per_slot,
+            "users": args.users,
+            "requests_per_scenario": args.requests,
+            "concurrency": args.concurrency,
+            "hot_capacity": args.hot_capacity,
+        },
+        "scenarios": scenarios,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+    if args.database_url:
+        import models
+        models.Base.metadata.drop_all(bind=engine)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Load benchmark comparing the sync (threadpool) and async (DB_ASYNC) data paths.
+
+Each mode runs in its own subprocess against a fresh SQLite database (or the
+PostgreSQL database given with --database-url), with the app driven
+in-process through httpx's ASGI transport. The read-through cache is disabled
+so every request reaches the database, and both modes get a connection pool
+of the same size (--pool-size, passed on as DB_POOL_SIZE with no overflow),
+so the comparison measures the data path rather than the pool configuration. Note that the sync routes run
+on FastAPI's threadpool (40 threads), which caps them at 40 requests in
+flight whatever the pool size.
+
+    python benchmarks/bench_async.py --requests 5000 --concurrency 500
+
+Prints a JSON report with requests per second and latency percentiles.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_load(app, requests, concurrency, events, slots):
+    import httpx
+
+    # Unhandled errors (e.g. pool timeouts) become 500s and count as errors.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        slot_ids = []
+        for e in range(events):
+            response = await client.post("/events/", json={
+                "title": f"Bench event {e}",
+                "time_slots": [f"2030-01-{1 + s % 28:02d}T{8 + s // 28:02d}:00:00" for s in range(slots)],
+                "max_bookings_per_slot": 1_000_000,
+            })
+            event = response.json()
+            slot_ids.extend((event["id"], slot["id"]) for slot in event["time_slots"])
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def one(i):
+            nonlocal errors
+            event_id, slot_id = slot_ids[i % len(slot_ids)]
+            async with semaphore:
+                started = time.perf_counter()
+                if i % 4 == 0:
+                    response = await client.post(f"/bookings/events/{event_id}/bookings", json={
+                        "time_slot_id": slot_id, "user_name": "Bench", "user_email": f"user{i}@example.com",
+                    })
+                else:
+                    response = await client.get(f"/events/{event_id}/availability")
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def worker(args):
+    """Runs inside the subprocess, with DB_ASYNC and DATABASE_URL already set."""
+    sys.path.insert(0, ROOT)
+    import database
+    from main import app
+
+    async def run():
+        try:
+            return await run_load(app, args.requests, args.concurrency, args.events, args.slots)
+        finally:
+            # The ASGI transport does not run the app's shutdown handlers.
+            await database.dispose_async_engine()
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--slots", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=40, help="Connections per pool, for both modes")
+    parser.add_argument("--database-url", help="Use this database instead of a temporary SQLite file")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--worker", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    report = {"pool_size": args.pool_size}
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DB_ASYNC="true" if mode == "async" else "false",
+                DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                CACHE_BACKEND="none",
+                RATE_LIMIT_BACKEND="none",
+                BOOKING_GATE_MAX_CONCURRENCY="0",
+                DB_POOL_SIZE=str(args.pool_size),
+                DB_MAX_OVERFLOW="0",
+            )
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", mode,
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                 "--events", str(args.events), "--slots", str(args.slots)],
+                env=env, cwd=ROOT, check=True, capture_output=True, text=True,
+            ).stdout
+            report[mode] = json.loads(output.strip().splitlines()[-1])
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Micro-benchmark of response serialization for the list endpoints.
+
+Selects --rows rows from an in-memory SQLite database in the shape each
+endpoint selects, then times turning them into the response body two ways:
+
+    pydantic   the previous path: model_validate per row into the page model,
+               then what FastAPI does with a response_model (validate the
+               return value again, dump it to JSON-compatible data) and the
+               json module encode in JSONResponse
+    fast       the dicts built by serialization.py, encoded by FastJSONResponse
+               (orjson when installed)
+
+Times are reported in milliseconds per 10k rows, best of --repeat runs.
+
+    python benchmarks/bench_serialization.py --rows 10000 --repeat 5
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(conn, rows):
+    """Insert one event with a slot per row, and one booking per slot for a single user."""
+    from sqlalchemy import insert
+
+    import models
+
+    start = datetime.datetime(2030, 1, 1, 8)
+    created_at = datetime.datetime(2025, 1, 1, 0, 0, 0, 123456)
+    conn.execute(insert(models.Event), [
+        {"id": e + 1, "title": f"Bench event {e}", "description": "Seeded", "max_bookings_per_slot": 10}
+        for e in range(rows)
+    ])
+    conn.execute(insert(models.TimeSlot), [
+        {"id": s + 1, "event_id": 1, "start_time": start + datetime.timedelta(minutes=s), "booked_count": 3}
+        for s in range(rows)
+    ])
+    conn.execute(insert(models.Booking), [
+        {
+            "time_slot_id": s + 1, "user_name": "Bench", "user_email": "bench@example.com",
+            "created_at": created_at + datetime.timedelta(seconds=s),
+        }
+        for s in range(rows)
+    ])
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, ROOT)
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine, select
+    from typing import List
+
+    import models
+    import schemas
+    import serialization
+
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        seed(conn, args.rows)
+        event_rows = conn.execute(select(
+            models.Event.id, models.Event.title, models.Event.description, models.Event.max_bookings_per_slot,
+        )).all()
+        slot_rows = conn.execute(select(
+            models.TimeSlot.id.label("slot_id"), models.TimeSlot.start_time, models.TimeSlot.booked_count,
+        )).all()
+        booking_rows = conn.execute(
+            select(
+                models.Booking.id, models.Booking.time_slot_id, models.Booking.user_name,
+                models.Booking.user_email, models.Booking.created_at, models.TimeSlot.event_id,
+                models.Event.title.label("event_title"), models.TimeSlot.start_time,
+            )
+            .join(models.TimeSlot, models.TimeSlot.id == models.Booking.time_slot_id)
+            .join(models.Event, models.Event.id == models.TimeSlot.event_id)
+        ).all()
+
+    def pydantic_path(response_model, build):
+        adapter = TypeAdapter(response_model)
+
+        def run():
+            content = build()
+            value = adapter.validate_python(content)
+            json.dumps(adapter.dump_python(value, mode="json"), separators=(",", ":")).encode()
+        return run
+
+    def fast_path(build):
+        return lambda: serialization.FastJSONResponse(build()).body
+
+    scenarios = {
+        "event_list": (
+            pydantic_path(schemas.EventPage, lambda: schemas.EventPage(
+                items=[schemas.Event.model_validate(row) for row in event_rows], next_cursor=None,
+            )),
+            fast_path(lambda: {"items": [serialization.event_item(row) for row in event_rows], "next_cursor": None}),
+        ),
+        "availability": (
+            pydantic_path(List[schemas.SlotAvailability], lambda: [
+                schemas.SlotAvailability(
+                    slot_id=row.slot_id, start_time=row.start_time, booked=row.booked_count,
+                    capacity=10, remaining=10 - row.booked_count,
+                )
+                for row in slot_rows
+            ]),
+            fast_path(lambda: [serialization.slot_availability(row, 10) for row in slot_rows]),
+        ),
+        "user_bookings": (
+            pydantic_path(schemas.BookingDetailPage, lambda: schemas.BookingDetailPage(
+                items=[schemas.BookingDetail.model_validate(row) for row in booking_rows], next_cursor=None,
+            )),
+            fast_path(lambda: {
+                "items": [serialization.booking_detail_item(row) for row in booking_rows], "next_cursor": None,
+            }),
+        ),
+    }
+
+    per_10k = 10000 / args.rows
+    report = {
+        "meta": {"rows": args.rows, "repeat": args.repeat, "orjson": serialization.orjson is not None},
+        "ms_per_10k_rows": {},
+    }
+    for name, (before, after) in scenarios.items():
+        pydantic_ms = best_of(args.repeat, before) * 1000 * per_10k
+        fast_ms = best_of(args.repeat, after) * 1000 * per_10k
+        report["ms_per_10k_rows"][name] = {
+            "pydantic": round(pydantic_ms, 2),
+            "fast": round(fast_ms, 2),
+            "speedup": round(pydantic_ms / fast_ms, 1) if fast_ms else None,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
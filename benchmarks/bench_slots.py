@@ -0,0 +1,150 @@
+"""
+Benchmark of the cross-event slot search (GET /slots) at scale.
+
+Seeds --slots time slots spread over --events events and --days days into a
+temporary SQLite database (or --database-url), with a random share of the
+slots fully booked. Then times the search query directly (routes/slots.py
+query_slots_page) for a set of scenarios and reports p50/p95/p99 in
+milliseconds:
+
+    window      a 3-hour window, first page
+    available   the same window, only slots with free seats
+    day         a whole day, first page
+    deep        a later page of the day, reached through its cursor
+
+Exits with status 1 when a scenario's p95 exceeds --budget-ms (default 10).
+
+    python benchmarks/bench_slots.py --slots 2000000 --events 20000
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+START = datetime.datetime(2030, 1, 1)
+
+
+def seed(engine, slots, events, days, full_share, batch_size=50000):
+    """Insert the events and slots with multi-row inserts, in batches."""
+    from sqlalchemy import insert
+
+    import models
+
+    rng = random.Random(1)
+    with engine.begin() as conn:
+        for first in range(0, events, batch_size):
+            conn.execute(insert(models.Event), [
+                {"id": e + 1, "title": f"Event {e}", "description": None, "max_bookings_per_slot": 10}
+                for e in range(first, min(first + batch_size, events))
+            ])
+    minutes = days * 24 * 60
+    for first in range(0, slots, batch_size):
+        with engine.begin() as conn:
+            conn.execute(insert(models.TimeSlot), [
+                {
+                    "event_id": rng.randrange(events) + 1,
+                    # On the quarter hour, so many slots share a start time.
+                    "start_time": START + datetime.timedelta(minutes=rng.randrange(minutes) // 15 * 15),
+                    "booked_count": 10 if rng.random() < full_share else rng.randrange(10),
+                }
+                for _ in range(first, min(first + batch_size, slots))
+            ])
+        print(f"  seeded {min(first + batch_size, slots)} slots", file=sys.stderr)
+
+
+def measure(fn, requests):
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=1_000_000)
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365, help="Days the slots are spread over")
+    parser.add_argument("--full-share", type=float, default=0.3, help="Share of fully booked slots")
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--requests", type=int, default=200, help="Queries per scenario")
+    parser.add_argument("--budget-ms", type=float, default=10.0, help="Allowed p95 per scenario")
+    parser.add_argument("--database-url", help="Use this database instead of a temporary SQLite file")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bookmyslot-bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    sys.path.insert(0, ROOT)
+
+    import models
+    from database import SessionLocal, engine
+    from routes.slots import _decode_cursor, query_slots_page
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    seed(engine, args.slots, args.events, args.days, args.full_share)
+    seed_seconds = time.perf_counter() - started
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    rng = random.Random(2)
+
+    def window(hours):
+        start = START + datetime.timedelta(days=rng.randrange(args.days - 1), hours=rng.randrange(8, 18))
+        return start, start + datetime.timedelta(hours=hours)
+
+    db = SessionLocal()
+
+    def deep_page():
+        starts_from, starts_to = window(24)
+        cursor = None
+        for _ in range(5):
+            page = query_slots_page(db, starts_from, starts_to, False, cursor, args.limit)
+            cursor = _decode_cursor(page["next_cursor"])
+
+    scenarios = {
+        "window": lambda: query_slots_page(db, *window(3), False, None, args.limit),
+        "available": lambda: query_slots_page(db, *window(3), True, None, args.limit),
+        "day": lambda: query_slots_page(db, *window(24), False, None, args.limit),
+        # Five pages per run; reported per page below.
+        "deep": deep_page,
+    }
+    report = {"slots": args.slots, "events": args.events, "seed_seconds": round(seed_seconds, 1), "scenarios": {}}
+    failed = []
+    try:
+        for name, fn in scenarios.items():
+            result = measure(fn, args.requests)
+            if name == "deep":
+                result = {key: round(value / 5, 3) for key, value in result.items()}
+            report["scenarios"][name] = result
+            if result["p95_ms"] > args.budget_ms:
+                failed.append(name)
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if failed:
+        print(f"p95 over {args.budget_ms} ms: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,21 @@ const EventList: React.FC = () => {
   const [events, setEvents] = useState<Event[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Cursor for the next page, or null when every event has been loaded
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchEvents();
   }, []);
 
+  // Load the first page of events
   const fetchEvents = async () => {
     try {
       setLoading(true);
-      const data = await eventApi.getAllEvents();
-      setEvents(data);
+      const page = await eventApi.getEventsPage();
+      setEvents(page.items);
+      setNextCursor(page.next_cursor);
       setError(null);
     } catch (err) {
       setError('Failed to load events. Please try again.');
@@ -27,6 +32,24 @@ const EventList: React.FC = () => {
     }
   };
 
+  // Append the next page of events
+  const fetchMoreEvents = async () => {
+    if (nextCursor === null) {
+      return;
+    }
+    try {
+      setLoadingMore(true);
+      const page = await eventApi.getEventsPage(nextCursor);
+      setEvents(prev => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      alert('Failed to load more events.');
+      console.error('Error fetching events:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (eventId: number) => {
     if (window.confirm('Are you sure you want to delete this event?')) {
       try {
@@ -100,6 +123,14 @@ const EventList: React.FC = () => {
           ))}
         </div>
       )}
+
+      {nextCursor !== null && (
+        <div className="load-more">
+          <button onClick={fetchMoreEvents} className="retry-btn" disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load More Events'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -1,14 +1,17 @@
 import React, { useState } from 'react';
-import { Booking } from '../types';
+import { BookingDetail } from '../types';
 import { bookingApi, formatDateTime } from '../services/api';
 import './UserBookings.css';
 
 const UserBookings: React.FC = () => {
   const [email, setEmail] = useState('');
-  const [bookings, setBookings] = useState<Booking[]>([]);
+  const [bookings, setBookings] = useState<BookingDetail[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [hasSearched, setHasSearched] = useState(false);
+  const [cancellingId, setCancellingId] = useState<number | null>(null);
 
   const handleSearch = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -21,18 +24,49 @@ const UserBookings: React.FC = () => {
     try {
       setLoading(true);
       setError(null);
-      const data = await bookingApi.getUserBookings(email.trim());
-      setBookings(data);
+      const page = await bookingApi.getUserBookingsPage(email.trim());
+      setBookings(page.items);
+      setNextCursor(page.next_cursor);
       setHasSearched(true);
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Failed to fetch bookings. Please try again.');
       console.error('Error fetching bookings:', err);
       setBookings([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
   };
 
+  const handleLoadMore = async () => {
+    if (nextCursor === null) return;
+    try {
+      setLoadingMore(true);
+      const page = await bookingApi.getUserBookingsPage(email.trim(), nextCursor);
+      setBookings((previous) => [...previous, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err: any) {
+      setError(err.response?.data?.detail || 'Failed to load more bookings. Please try again.');
+      console.error('Error fetching bookings:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const handleCancel = async (bookingId: number) => {
+    if (!window.confirm('Cancel this booking?')) return;
+    try {
+      setCancellingId(bookingId);
+      await bookingApi.cancelBooking(bookingId);
+      setBookings((previous) => previous.filter((booking) => booking.id !== bookingId));
+    } catch (err: any) {
+      setError(err.response?.data?.detail || 'Failed to cancel the booking. Please try again.');
+      console.error('Error cancelling booking:', err);
+    } finally {
+      setCancellingId(null);
+    }
+  };
+
   const handleEmailChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     setEmail(e.target.value);
     if (error) setError(null);
@@ -94,14 +128,30 @@ const UserBookings: React.FC = () => {
                     </span>
                   </div>
                   <div className="booking-details">
+                    <p><strong>Event:</strong> {booking.event_title}</p>
+                    <p><strong>Date & Time:</strong> {formatDateTime(booking.start_time)}</p>
                     <p><strong>Name:</strong> {booking.user_name}</p>
                     <p><strong>Email:</strong> {booking.user_email}</p>
-                    <p><strong>Time Slot ID:</strong> {booking.time_slot_id}</p>
                   </div>
+                  <button
+                    onClick={() => handleCancel(booking.id)}
+                    className="cancel-btn"
+                    disabled={cancellingId === booking.id}
+                  >
+                    {cancellingId === booking.id ? 'Cancelling...' : 'Cancel Booking'}
+                  </button>
                 </div>
               ))}
             </div>
           )}
+
+          {nextCursor !== null && (
+            <div className="load-more">
+              <button onClick={handleLoadMore} className="search-btn" disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load More Bookings'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { Event, EventDetail, EventCreate, Booking, BookingCreate } from '../types';
+import { EventDetail, EventCreate, EventPage, Booking, BookingCreate, BookingDetailPage, CancellationResult } from '../types';
 
 // Configure axios to connect to our FastAPI backend
 // Use environment variable for production, fallback to localhost for development
@@ -10,13 +10,39 @@ const api = axios.create({
   headers: {
     'Content-Type': 'application/json',
   },
+  // Send the API's cookies cross-site (the read-your-writes cookie below)
+  withCredentials: true,
+});
+
+// Read your own writes: after a write the API answers with X-Primary-Until,
+// and until then our reads must go to the primary database, not a replica
+// that may not have the write yet. Echo it back in case the browser blocks
+// the API's cross-site cookie.
+const PRIMARY_UNTIL_HEADER = 'X-Primary-Until';
+let primaryUntil: string | undefined;
+
+api.interceptors.request.use((config) => {
+  if (primaryUntil !== undefined && Number(primaryUntil) * 1000 > Date.now()) {
+    config.headers.set(PRIMARY_UNTIL_HEADER, primaryUntil);
+  }
+  return config;
+});
+
+api.interceptors.response.use((response) => {
+  const until = response.headers[PRIMARY_UNTIL_HEADER.toLowerCase()];
+  if (typeof until === 'string') {
+    primaryUntil = until;
+  }
+  return response;
 });
 
 // Event API functions
 export const eventApi = {
-  // Get all events
-  getAllEvents: async (): Promise<Event[]> => {
-    const response = await api.get('/events/');
+  // Get one page of events (keyset pagination)
+  getEventsPage: async (afterId?: number, limit: number = 50): Promise<EventPage> => {
+    const response = await api.get('/events/', {
+      params: { after_id: afterId, limit },
+    });
     return response.data;
   },
 
@@ -46,9 +72,17 @@ export const bookingApi = {
     return response.data;
   },
 
-  // Get user bookings
-  getUserBookings: async (email: string): Promise<Booking[]> => {
-    const response = await api.get(`/bookings/users/${encodeURIComponent(email)}/bookings`);
+  // Cancel a booking; its seat goes to the first user on the slot's waitlist
+  cancelBooking: async (bookingId: number): Promise<CancellationResult> => {
+    const response = await api.delete(`/bookings/${bookingId}`);
+    return response.data;
+  },
+
+  // Get one page of a user's bookings, newest first, with event and slot details
+  getUserBookingsPage: async (email: string, cursor?: string, limit: number = 20): Promise<BookingDetailPage> => {
+    const response = await api.get(`/bookings/users/${encodeURIComponent(email)}/bookings`, {
+      params: { cursor, limit, include: 'details' },
+    });
     return response.data;
   },
 };
@@ -7,6 +7,11 @@ export interface Event {
   max_bookings_per_slot: number;
 }
 
+export interface EventPage {
+  items: Event[];
+  next_cursor: number | null; // Pass as after_id to fetch the next page
+}
+
 export interface TimeSlot {
   id: number;
   event_id: number;
@@ -33,6 +38,24 @@ export interface Booking {
   created_at: string; // ISO 8601 datetime string
 }
 
+// A booking in a user's history, with the slot and event it is for
+export interface BookingDetail extends Booking {
+  event_id: number;
+  event_title: string;
+  start_time: string; // ISO 8601 datetime string
+}
+
+export interface BookingDetailPage {
+  items: BookingDetail[];
+  next_cursor: string | null; // Pass as cursor to fetch the next page
+}
+
+// Result of cancelling a booking; promoted is the waitlisted booking that took the seat
+export interface CancellationResult {
+  cancelled_booking_id: number;
+  promoted: Booking | null;
+}
+
 export interface BookingCreate {
   time_slot_id: number;
   user_name: string;
@@ -0,0 +1,386 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from database import DB_ASYNC
+
+# Read-through cache for event reads.
+#
+# Event metadata and slot start times change rarely, but they are read on every
+# page view. Responses of get_event, get_all_events and the availability
+# endpoint are cached as plain JSON-compatible values, and the writers
+# (create_event, create_booking, delete_event) invalidate the affected keys.
+#
+# The backend is pluggable: the default in-memory backend is local to one
+# worker process, so with several uvicorn workers an invalidation only reaches
+# the worker that handled the write (others catch up when the TTL expires).
+# Use the Redis backend to share one cache between workers.
+#
+# Invalidation alone is not enough: a reader can load a value, a writer can
+# commit and invalidate, and only then does the reader store what it loaded,
+# leaving a stale entry until the TTL expires. Every invalidation therefore
+# also bumps a generation counter for its scope (one per event, one for the
+# event list). get_or_load() reads the generation before calling the loader
+# and only stores the result if the generation is still the same.
+
+load_dotenv()
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory, redis or none
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+
+class CacheBackend:
+    """
+    Interface every cache backend implements.
+
+    Values must be JSON-compatible (dicts, lists, strings, numbers), so any
+    backend can store them out of process.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[Tuple[str, int]] = None,
+    ) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: JSON-compatible value
+            ttl: Seconds the entry stays valid (default: the backend's TTL)
+            generation: (scope, expected generation); when given, the value is
+                only stored if the scope's generation still matches
+        """
+        raise NotImplementedError
+
+    def generation(self, scope: str) -> int:
+        """Current generation of an invalidation scope (0 if never bumped)."""
+        raise NotImplementedError
+
+    def bump_generation(self, scope: str) -> None:
+        """Advance a scope's generation so in-flight loads are not stored."""
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Optional[Any]],
+        ttl: Optional[float] = None,
+        scope: Optional[str] = None,
+    ) -> Optional[Any]:
+        """
+        Return the cached value for key, or call loader and cache its result.
+
+        A loader result of None (e.g. "event not found") is not cached. With a
+        scope, the result is also not cached if the scope was invalidated
+        while the loader ran.
+        """
+        value = self.get(key)
+        if value is None:
+            # Read the generation before loading: an invalidation that lands
+            # after this point makes the loaded value stale, and the set is skipped.
+            generation = (scope, self.generation(scope)) if scope is not None else None
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl, generation=generation)
+        return value
+
+
+class NullCache(CacheBackend):
+    """Backend that never stores anything (CACHE_BACKEND=none)."""
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None, generation=None):
+        pass
+
+    def generation(self, scope):
+        return 0
+
+    def bump_generation(self, scope):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"hits": 0, "misses": self.misses, "evictions": 0, "expirations": 0, "entries": 0}
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process cache with a per-entry TTL and least-recently-used eviction.
+
+    Args:
+        max_entries: Entries kept before the least recently used one is evicted
+        default_ttl: Seconds an entry stays valid when set() gets no ttl
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, default_ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        # scope -> generation. Kept across clear() so a load that started
+        # before the clear cannot store its result afterwards.
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, generation=None):
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None:
+                scope, expected = generation
+                if self._generations.get(scope, 0) != expected:
+                    return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, scope):
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+    def bump_generation(self, scope):
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+            }
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared between worker processes through Redis.
+
+    Redis handles expiry and eviction itself (configure maxmemory-policy
+    allkeys-lru for LRU behaviour); evictions are read from its INFO stats.
+    The number of entries is not reported: counting them means a SCAN over
+    the whole keyspace. Requires the 'redis' package.
+
+    Args:
+        url: Redis connection URL
+        default_ttl: Seconds an entry stays valid when set() gets no ttl
+        namespace: Prefix for every key, so the cache can share a Redis
+    """
+
+    def __init__(self, url: str = CACHE_URL, default_ttl: float = CACHE_TTL_SECONDS, namespace: str = "bookmyslot:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        # Compare-and-set: store the value only if the scope's generation
+        # still matches, in one round trip and without a WATCH transaction.
+        self._set_if_generation = self._redis.register_script(
+            "if (redis.call('GET', KEYS[2]) or '0') == ARGV[3] then "
+            "redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2]) end"
+        )
+
+    def _generation_key(self, scope):
+        return self.namespace + "generation:" + scope
+
+    def get(self, key):
+        raw = self._redis.get(self.namespace + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None, generation=None):
+        ttl_ms = int((self.default_ttl if ttl is None else ttl) * 1000)
+        if generation is None:
+            self._redis.set(self.namespace + key, json.dumps(value), px=ttl_ms)
+            return
+        scope, expected = generation
+        self._set_if_generation(
+            keys=[self.namespace + key, self._generation_key(scope)],
+            args=[json.dumps(value), ttl_ms, str(expected)],
+        )
+
+    def generation(self, scope):
+        return int(self._redis.get(self._generation_key(scope)) or 0)
+
+    def bump_generation(self, scope):
+        self._redis.incr(self._generation_key(scope))
+
+    def delete(self, *keys):
+        if keys:
+            self._redis.delete(*[self.namespace + key for key in keys])
+
+    def delete_prefix(self, prefix):
+        batch = []
+        for key in self._redis.scan_iter(match=self.namespace + prefix + "*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self._redis.delete(*batch)
+                batch = []
+        if batch:
+            self._redis.delete(*batch)
+
+    def clear(self):
+        # Generations survive a clear, for the same reason as in MemoryCache.
+        batch = []
+        for key in self._redis.scan_iter(match=self.namespace + "*", count=500):
+            if not key.startswith((self.namespace + "generation:").encode()):
+                batch.append(key)
+            if len(batch) >= 500:
+                self._redis.delete(*batch)
+                batch = []
+        if batch:
+            self._redis.delete(*batch)
+
+    def stats(self):
+        info = self._redis.info("stats")
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": int(info.get("evicted_keys", 0)),
+            "expirations": int(info.get("expired_keys", 0)),
+        }
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> CacheBackend:
+    """
+    Create the cache backend selected by CACHE_BACKEND.
+
+    Args:
+        backend: 'memory' (default), 'redis' or 'none'
+    """
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "redis":
+        # The async routes (DB_ASYNC) run the shared handlers on the event loop
+        # thread, and every Redis call is a blocking network round trip that
+        # would stall all requests on the loop.
+        if DB_ASYNC:
+            raise RuntimeError(
+                "DB_ASYNC=true cannot be combined with CACHE_BACKEND=redis: the Redis cache "
+                "blocks the event loop. Use CACHE_BACKEND=memory or none with the async path."
+            )
+        return RedisCache()
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend!r}")
+
+
+# The cache used by the routes.
+cache = create_cache()
+
+
+# ==================================
+#       Keys and invalidation
+# ==================================
+
+def event_key(event_id: int, variant: str) -> str:
+    """Key for one cached representation of an event (detail, summary, ...)."""
+    return f"event:{event_id}:{variant}"
+
+
+def event_list_key(params: str) -> str:
+    """Key for one cached page of the event list, by its query parameters."""
+    return f"events:list:{params}"
+
+
+def event_scope(event_id: int) -> str:
+    """Invalidation scope of an event's cached representations (see get_or_load)."""
+    return f"event:{event_id}"
+
+
+EVENT_LIST_SCOPE = "events:list"
+
+
+def invalidate_event(event_id: int) -> None:
+    """Drop every cached representation of an event. Call after it changes."""
+    cache.bump_generation(event_scope(event_id))
+    # The trailing colon keeps event 1 from matching event 10.
+    cache.delete_prefix(f"event:{event_id}:")
+
+
+def invalidate_event_list() -> None:
+    """Drop every cached page of the event list. Call after events are added or removed."""
+    cache.bump_generation(EVENT_LIST_SCOPE)
+    cache.delete_prefix("events:list:")
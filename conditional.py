@@ -0,0 +1,111 @@
+import hashlib
+from typing import Iterable, Iterator, Optional, Tuple
+
+from fastapi import Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+import models
+import serialization
+
+# Conditional GET for event reads.
+#
+# Every event carries a version counter that is bumped in the same
+# transaction as any change to its slots or bookings (a booking, a slot
+# materialized for a recurrence occurrence). Event reads send a weak ETag
+# derived from it. A client that polls with If-None-Match is answered with
+# 304 Not Modified after one primary-key lookup of the version, without
+# loading slots or bookings and without sending a body. A user's calendar
+# feed has no version row; its ETag comes from one aggregate over the user's
+# bookings instead (see user_bookings_etag).
+
+
+def bump_event_version(db: Session, event_id: int) -> None:
+    """
+    Mark an event as changed, in the caller's transaction.
+
+    On PostgreSQL this locks the event row until the transaction commits, so
+    call it as the last statement before the commit.
+    """
+    db.execute(
+        update(models.Event)
+        .where(models.Event.id == event_id)
+        .values(version=models.Event.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def current_event_version(db: Session, event_id: int) -> Optional[int]:
+    """The event's version, or None if the event does not exist."""
+    return db.scalar(select(models.Event.version).where(models.Event.id == event_id))
+
+
+def event_etag(event_id: int, version: int) -> str:
+    """Weak ETag of an event's representations at a version."""
+    return f'W/"event-{event_id}-{version}"'
+
+
+def list_etag(rows: Iterable[Tuple[int, int]], next_cursor: Optional[int]) -> str:
+    """Weak ETag of an event list page from the (id, version) of its events."""
+    digest = hashlib.sha1(repr((list(rows), next_cursor)).encode()).hexdigest()[:20]
+    return f'W/"events-{digest}"'
+
+
+def user_bookings_etag(db: Session, email: str) -> str:
+    """
+    Weak ETag of the set of bookings held by a user.
+
+    A booking changes the maximum booking ID and a cancellation (or the
+    deletion of an event) the count; the sum of the IDs tells apart the
+    sets SQLite can produce by reusing the highest deleted ID. The aggregate
+    is answered from the (user_email, created_at, id) index.
+    """
+    count, highest, total = db.execute(
+        select(func.count(), func.max(models.Booking.id), func.sum(models.Booking.id))
+        .where(models.Booking.user_email == email)
+    ).one()
+    digest = hashlib.sha1(repr((email, count, highest, total)).encode()).hexdigest()[:20]
+    return f'W/"bookings-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match: the W/
+    prefix is ignored, and "*" matches any current representation.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def _headers(etag: str) -> dict:
+    # no-cache: browsers may keep the body but must revalidate every time,
+    # which is the cheap 304 round trip.
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a representation the client already has."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_headers(etag))
+
+
+def tagged_response(content, etag: str) -> Response:
+    """JSON response (fast path, see serialization.py) carrying an ETag."""
+    return serialization.FastJSONResponse(content, headers=_headers(etag))
+
+
+def tagged_stream(content: Iterator[bytes], etag: str, media_type: str) -> StreamingResponse:
+    """Streamed response carrying an ETag."""
+    return StreamingResponse(content, media_type=media_type, headers=_headers(etag))
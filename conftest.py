@@ -0,0 +1,68 @@
+import os
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway SQLite database before database.py is imported,
+# so the test suite never touches the development bookmyslot.db file.
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="bookmyslot-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DB_DIR, 'test.db')}"
+# Tests book many slots from one client; test_ratelimit.py installs its own limiter.
+os.environ["RATE_LIMIT_BACKEND"] = "none"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import cache  # noqa: E402
+import models  # noqa: E402
+from database import engine, SessionLocal  # noqa: E402
+from main import app  # noqa: E402
+
+
+@pytest.fixture
+def db_session():
+    """Fresh schema and a session bound to the test database."""
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    cache.cache.clear()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(db_session):
+    """TestClient for the FastAPI app, backed by a fresh schema."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class QueryCounter:
+    """Counts the SQL statements sent to the test database."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def reset(self):
+        self.statements.clear()
+
+
+@pytest.fixture
+def count_queries():
+    """Record every statement executed on the engine while the test runs."""
+    from sqlalchemy import event
+
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
@@ -1,8 +1,16 @@
+import itertools
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Connection
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -15,18 +23,193 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./bookmyslot.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Optional read replicas, as a comma-separated list of database URLs. The
+# read-only endpoints spread their queries over them (see get_read_db).
+DATABASE_REPLICA_URLS = [
+    url.strip().replace("postgres://", "postgresql://", 1)
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Seconds a replica that failed to connect is skipped before it is tried again
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+# Seconds after a write during which the writer's reads go to the primary.
+# Should exceed the replication lag.
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+# Set DB_ASYNC=true to serve the main event and booking routes from an
+# asyncio-native data path (AsyncEngine + AsyncSession) instead of running
+# them on the threadpool. Needs an async driver: aiosqlite or asyncpg.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# ==================================
+#       Engine configuration
+# ==================================
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+# Connection pool settings (all engines except in-memory SQLite).
+# The default of 10 + 30 connections matches the 40 worker threads FastAPI
+# runs sync routes on, so a burst of requests cannot starve the pool.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced
+# DB_POOL_PRE_PING (checks each connection before use) defaults to on for
+# PostgreSQL and off for SQLite, where connections cannot go stale.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # PostgreSQL only, 0 = no limit
+
+# SQLite pragmas applied to every new connection. WAL lets readers run
+# alongside a writer, and busy_timeout makes a writer wait for the lock
+# instead of failing immediately with "database is locked".
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+class PoolMetrics:
+    """
+    Counters for one connection pool, filled in by the pool classes below.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 0 if timed_out else 1
+            self.timeouts += 1 if timed_out else 0
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class _TimedPoolMixin:
+    """
+    Measures how long each checkout waits for a free connection.
+    """
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # Keep the metrics when the engine recreates the pool (e.g. dispose()).
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    # SQLite only enforces foreign keys (and ON DELETE actions) when asked to.
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def create_db_engine(url: str, is_async: bool = False):
+    """
+    Create a sync or async engine configured from the DB_* / SQLITE_* settings.
+    
+    The engine's pool records checkout waits and timeouts (see pool_stats),
+    SQLite connections get the pragmas above, and PostgreSQL connections get
+    the statement timeout.
+    
+    Args:
+        url: Database URL (for is_async, with an async driver)
+        is_async: Create an AsyncEngine instead of an Engine
+    """
+    is_sqlite = url.startswith("sqlite")
+    kwargs = {}
+    connect_args = {}
+
+    if is_sqlite:
+        # The 'check_same_thread' argument is specific to SQLite. It's needed to
+        # allow the database connection to be shared across different threads.
+        connect_args["check_same_thread"] = False
+    elif DB_STATEMENT_TIMEOUT_MS:
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    # In-memory SQLite keeps one connection per thread; a pool does not apply.
+    pooled = not (is_sqlite and ":memory:" in url)
+    if pooled:
+        pre_ping = _env_flag("DB_POOL_PRE_PING", "false" if is_sqlite else "true")
+        kwargs.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=pre_ping,
+        )
+
+    if is_async:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        new_engine = create_async_engine(url, connect_args=connect_args, **kwargs)
+        sync_engine = new_engine.sync_engine
+    else:
+        new_engine = create_engine(url, connect_args=connect_args, **kwargs)
+        sync_engine = new_engine
+
+    if pooled:
+        sync_engine.pool.metrics = PoolMetrics()
+    if is_sqlite:
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+def pool_stats(target_engine) -> dict:
+    """
+    Current state and counters of an engine's connection pool.
+    
+    Returns:
+        dict: size, checked_out, overflow and the checkout wait counters
+    """
+    pool = getattr(target_engine, "sync_engine", target_engine).pool
+    metrics = getattr(pool, "metrics", None)
+    if metrics is None:
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "wait_seconds_total": round(metrics.wait_seconds_total, 6),
+        "wait_seconds_max": round(metrics.wait_seconds_max, 6),
+    }
+
+
 # The engine is the entry point to the database.
-# It's configured with the database URL and some settings for connection pooling.
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL, 
-        # The 'connect_args' is specific to SQLite. It's needed to allow
-        # the database connection to be shared across different threads.
-        connect_args={"check_same_thread": False}
-    )
-else:
-    # For PostgreSQL (production)
-    engine = create_engine(DATABASE_URL)
+engine = create_db_engine(DATABASE_URL)
 
 # Each instance of SessionLocal will be a new database session.
 # The session is the primary interface for all database operations.
@@ -47,4 +230,210 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# ==================================
+#          Read replicas
+# ==================================
+
+# Name of the cookie that sends a client's reads to the primary after it wrote
+READ_YOUR_WRITES_COOKIE = "bms_primary_until"
+# The same deadline as a response header, for cross-site clients that cannot
+# rely on cookies; they send it back as a request header of the same name.
+READ_YOUR_WRITES_HEADER = "X-Primary-Until"
+
+class ReplicaSet:
+    """
+    The read replicas, picked in turn (round robin).
+    
+    A replica whose connection fails is skipped for DB_REPLICA_RETRY_SECONDS,
+    so an unreachable replica costs one failed connect per retry period
+    instead of one per request.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.engines = [create_db_engine(url) for url in urls]
+        self._turn = itertools.count()
+        self._down_until = {}
+        self.fallbacks = 0
+
+    def connect(self) -> Optional[Connection]:
+        """
+        A connection to the next available replica, or None if none is available.
+        """
+        if not self.engines:
+            return None
+        start = next(self._turn)
+        now = time.monotonic()
+        for offset in range(len(self.engines)):
+            replica = self.engines[(start + offset) % len(self.engines)]
+            if self._down_until.get(replica, 0) > now:
+                continue
+            try:
+                return replica.connect()
+            except exc.DBAPIError:
+                self._down_until[replica] = now + DB_REPLICA_RETRY_SECONDS
+        self.fallbacks += 1
+        return None
+
+    def stats(self) -> List[dict]:
+        """pool_stats of every replica, and whether it is being skipped."""
+        now = time.monotonic()
+        return [
+            {**pool_stats(replica), "down": self._down_until.get(replica, 0) > now}
+            for replica in self.engines
+        ]
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+def _reads_own_writes(request: Request) -> bool:
+    now = time.time()
+    for value in (request.cookies.get(READ_YOUR_WRITES_COOKIE), request.headers.get(READ_YOUR_WRITES_HEADER)):
+        try:
+            # A deadline further away than one write grants is not trusted.
+            if value is not None and now < float(value) <= now + DB_READ_YOUR_WRITES_SECONDS:
+                return True
+        except ValueError:
+            pass
+    return False
+
+def get_read_db(request: Request):
+    """
+    FastAPI dependency to get a database session for read-only endpoints.
+    
+    The session reads from a replica when one is configured and reachable,
+    otherwise from the primary. A client that wrote within the last
+    DB_READ_YOUR_WRITES_SECONDS (see ReadYourWritesMiddleware), as shown by
+    its cookie or READ_YOUR_WRITES_HEADER, always reads the primary, so it
+    sees its own write even if the replicas lag behind.
+    Never write through this session.
+    """
+    connection = None if _reads_own_writes(request) else replicas.connect()
+    if connection is None:
+        yield from get_db()
+        return
+    db = SessionLocal(bind=connection, info={"replica": True})
+    try:
+        yield db
+    finally:
+        db.close()
+        connection.close()
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """
+    db itself if it reads the primary, else a primary session for the block.
+    
+    Values stored in the shared cache must be loaded from the primary: a
+    value loaded from a lagging replica right after a write would be cached
+    as current, even for the writer.
+    """
+    if not db.info.get("replica"):
+        yield db
+        return
+    primary = SessionLocal()
+    try:
+        yield primary
+    finally:
+        primary.close()
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware that marks a client as a recent writer.
+    
+    A successful request with a method other than GET, HEAD or OPTIONS sets
+    the READ_YOUR_WRITES_COOKIE to the time until which get_read_db reads
+    the primary for that client, and returns the same time in the
+    READ_YOUR_WRITES_HEADER. Does nothing without replicas.
+    
+    The frontend is served from another site, where a SameSite=Lax cookie is
+    never sent with API calls; over HTTPS (behind a proxy, with uvicorn's
+    --proxy-headers) the cookie is SameSite=None; Secure
+    so that credentialed cross-site requests carry it. Browsers that block
+    third-party cookies still get the header, which the client echoes back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas.engines or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        # Secure cookies are dropped over plain HTTP (local development).
+        same_site = "SameSite=None; Secure" if scope.get("scheme") == "https" else "SameSite=Lax"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = f"{time.time() + DB_READ_YOUR_WRITES_SECONDS:.3f}"
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={until}; Max-Age={int(DB_READ_YOUR_WRITES_SECONDS) + 1}; "
+                    f"Path=/; HttpOnly; {same_site}"
+                )
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode()),
+                    (READ_YOUR_WRITES_HEADER.lower().encode(), until.encode()),
+                ]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+# ==================================
+#       Async data path
+# ==================================
+
+def async_database_url(url: str) -> str:
+    """
+    Translate a database URL to its asyncio driver.
+    sqlite:// uses aiosqlite and postgresql:// uses asyncpg.
+    """
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+# The async engine is created on first use, so the async drivers are only
+# needed when the async path is actually enabled.
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    """
+    The AsyncEngine counterpart of 'engine', for the same DATABASE_URL.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_db_engine(async_database_url(DATABASE_URL), is_async=True)
+    return _async_engine
+
+def get_async_sessionmaker():
+    """
+    The async_sessionmaker counterpart of SessionLocal.
+    """
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _async_sessionmaker = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=True
+        )
+    return _async_sessionmaker
+
+async def get_async_db():
+    """
+    FastAPI dependency to get an async database session.
+    Yields a SQLAlchemy AsyncSession and ensures it's closed after use.
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def dispose_async_engine():
+    """
+    Close the async engine's pooled connections. Run it on shutdown.
+    aiosqlite runs every open connection on a non-daemon thread, so
+    connections left in the pool keep the interpreter from exiting.
+    """
+    if _async_engine is not None:
+        await _async_engine.dispose()
@@ -1,147 +1,352 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
-from typing import Optional
+import asyncio
+import datetime
+import html
+import logging
 import os
+import smtplib
+import string
+import time
+from email.message import EmailMessage
+from typing import Callable, List, Optional
+
 from dotenv import load_dotenv
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+
+import models
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Booking emails go through an outbox.
+#
+# Sending inline would add an SMTP round trip (seconds, with TLS and login)
+# to every booking, and a crash between commit and send would lose the email.
+# Instead, the booking transaction also inserts a row into email_outbox
+# (enqueue_booking_email), and a worker drains the outbox in batches over one
+# long-lived SMTP connection, retrying failures with exponential backoff.
+#
+# The worker runs as an asyncio task inside the app (EMAIL_WORKER=inprocess)
+# or as a separate process:
+#
+#     python email_service.py
+
 # Email configuration
 # For development, you can use services like Mailtrap or Gmail SMTP
 # You'll need to set these environment variables in a .env file
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("MAIL_USERNAME", "your-email@gmail.com"),
-    MAIL_PASSWORD=os.getenv("MAIL_PASSWORD", "your-app-password"),
-    MAIL_FROM=os.getenv("MAIL_FROM", "your-email@gmail.com"),
-    MAIL_PORT=int(os.getenv("MAIL_PORT", "587")),
-    MAIL_SERVER=os.getenv("MAIL_SERVER", "smtp.gmail.com"),
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
-
-fastmail = FastMail(conf)
-
-async def send_booking_confirmation_email(
-    user_email: str,
-    user_name: str,
-    event_title: str,
-    time_slot_start: str,
-    booking_id: int
-):
-    """
-    Send a booking confirmation email to the user.
-    
-    Args:
-        user_email: The email address of the user
-        user_name: The name of the user
-        event_title: The title of the event
-        time_slot_start: The start time of the booked slot
-        booking_id: The ID of the booking
-    """
-    try:
-        # Format the email content
-        subject = f"Booking Confirmation - {event_title}"
-        
-        html_content = f"""
+EMAIL_ENABLED = os.getenv("EMAIL_ENABLED", "false").lower() in ("1", "true", "yes")
+EMAIL_WORKER = os.getenv("EMAIL_WORKER", "inprocess")  # inprocess or external
+MAIL_USERNAME = os.getenv("MAIL_USERNAME", "your-email@gmail.com")
+MAIL_PASSWORD = os.getenv("MAIL_PASSWORD", "your-app-password")
+MAIL_FROM = os.getenv("MAIL_FROM", "your-email@gmail.com")
+MAIL_PORT = int(os.getenv("MAIL_PORT", "587"))
+MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "true").lower() in ("1", "true", "yes")
+MAIL_USE_CREDENTIALS = os.getenv("MAIL_USE_CREDENTIALS", "true").lower() in ("1", "true", "yes")
+
+# Outbox worker settings
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))  # Doubles after every failed attempt
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+# Seconds an idle SMTP connection is kept before it is closed
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+
+# ==================================
+#           Templates
+# ==================================
+
+# Templates are compiled once at import. Values are HTML-escaped before
+# substitution, since names and titles are user input.
+_FOOTER = """
+            <hr>
+            <p style="color: #666; font-size: 12px;">
+                $footer
+            </p>
+        </body>
+        </html>
+"""
+
+TEMPLATES = {
+    "confirmation": (
+        string.Template("Booking Confirmation - $event_title"),
+        string.Template("""
         <html>
         <body>
             <h2>🎉 Booking Confirmed!</h2>
-            <p>Dear {user_name},</p>
+            <p>Dear $user_name,</p>
             <p>Your booking has been successfully confirmed!</p>
-            
+
             <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
                 <h3>Booking Details:</h3>
-                <p><strong>Event:</strong> {event_title}</p>
-                <p><strong>Date & Time:</strong> {time_slot_start}</p>
-                <p><strong>Booking ID:</strong> #{booking_id}</p>
-                <p><strong>Your Name:</strong> {user_name}</p>
+                <p><strong>Event:</strong> $event_title</p>
+                <p><strong>Date & Time:</strong> $time_slot_start</p>
+                <p><strong>Booking ID:</strong> #$booking_id</p>
+                <p><strong>Your Name:</strong> $user_name</p>
             </div>
-            
+
             <p>Please arrive a few minutes before your scheduled time.</p>
             <p>If you need to cancel or reschedule, please contact us as soon as possible.</p>
-            
-            <p>Thank you for choosing our service!</p>
-            
-            <hr>
-            <p style="color: #666; font-size: 12px;">
-                This is an automated confirmation email. Please do not reply to this message.
-            </p>
-        </body>
-        </html>
-        """
-        
-        message = MessageSchema(
-            subject=subject,
-            recipients=[user_email],
-            body=html_content,
-            subtype="html"
-        )
-        
-        await fastmail.send_message(message)
-        print(f"Confirmation email sent to {user_email}")
-        
-    except Exception as e:
-        print(f"Failed to send confirmation email to {user_email}: {str(e)}")
-        # Don't raise the exception - we don't want email failures to break the booking process
-        pass
 
-async def send_booking_cancellation_email(
-    user_email: str,
-    user_name: str,
-    event_title: str,
-    time_slot_start: str,
-    booking_id: int
-):
-    """
-    Send a booking cancellation email to the user.
-    
-    Args:
-        user_email: The email address of the user
-        user_name: The name of the user
-        event_title: The title of the event
-        time_slot_start: The start time of the cancelled slot
-        booking_id: The ID of the booking
-    """
-    try:
-        subject = f"Booking Cancelled - {event_title}"
-        
-        html_content = f"""
+            <p>Thank you for choosing our service!</p>
+""" + _FOOTER.replace("$footer", "This is an automated confirmation email. Please do not reply to this message.")),
+    ),
+    "cancellation": (
+        string.Template("Booking Cancelled - $event_title"),
+        string.Template("""
         <html>
         <body>
             <h2>❌ Booking Cancelled</h2>
-            <p>Dear {user_name},</p>
+            <p>Dear $user_name,</p>
             <p>Your booking has been cancelled.</p>
-            
+
             <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
                 <h3>Cancelled Booking Details:</h3>
-                <p><strong>Event:</strong> {event_title}</p>
-                <p><strong>Date & Time:</strong> {time_slot_start}</p>
-                <p><strong>Booking ID:</strong> #{booking_id}</p>
+                <p><strong>Event:</strong> $event_title</p>
+                <p><strong>Date & Time:</strong> $time_slot_start</p>
+                <p><strong>Booking ID:</strong> #$booking_id</p>
             </div>
-            
+
             <p>If you have any questions, please contact us.</p>
-            
+
             <p>Thank you for your understanding.</p>
-            
-            <hr>
-            <p style="color: #666; font-size: 12px;">
-                This is an automated email. Please do not reply to this message.
-            </p>
-        </body>
-        </html>
-        """
-        
-        message = MessageSchema(
-            subject=subject,
-            recipients=[user_email],
-            body=html_content,
-            subtype="html"
+""" + _FOOTER.replace("$footer", "This is an automated email. Please do not reply to this message.")),
+    ),
+}
+
+
+def render(item: models.EmailOutbox) -> EmailMessage:
+    """
+    Build the message for an outbox row from the precompiled templates.
+
+    Args:
+        item: The outbox row
+
+    Returns:
+        EmailMessage: Message with subject, sender, recipient and HTML body
+    """
+    subject, body = TEMPLATES[item.kind]
+    values = {
+        "user_name": item.user_name or "",
+        "event_title": item.event_title or "",
+        "time_slot_start": item.slot_start.strftime("%Y-%m-%d %H:%M UTC") if item.slot_start else "",
+        "booking_id": item.booking_id,
+    }
+    message = EmailMessage()
+    message["Subject"] = subject.substitute(values)
+    message["From"] = MAIL_FROM
+    message["To"] = item.recipient
+    message.set_content(
+        body.substitute({key: html.escape(str(value)) for key, value in values.items()}),
+        subtype="html",
+    )
+    return message
+
+
+# ==================================
+#            Enqueueing
+# ==================================
+
+def enqueue_booking_email(db: Session, kind: str, booking_id: int) -> None:
+    """
+    Add the email for a booking to the outbox, in the caller's transaction.
+
+    The row is built with a single INSERT ... SELECT from the booking, its
+    slot and its event, so enqueueing costs one statement and no round trip
+    to load the event. Must run before the booking row is deleted.
+    Does nothing unless EMAIL_ENABLED is set.
+
+    Args:
+        db: Database session (the booking's transaction)
+        kind: 'confirmation' or 'cancellation'
+        booking_id: The ID of the booking
+    """
+    enqueue_booking_emails(db, kind, [booking_id])
+
+
+def enqueue_booking_emails(db: Session, kind: str, booking_ids: List[int]) -> None:
+    """
+    Add the emails for several bookings to the outbox in one statement (see enqueue_booking_email).
+    """
+    if not EMAIL_ENABLED:
+        return
+    source = (
+        select(
+            literal(kind),
+            models.Booking.id,
+            models.Booking.user_email,
+            models.Booking.user_name,
+            models.Event.title,
+            models.TimeSlot.start_time,
+        )
+        .join(models.TimeSlot, models.TimeSlot.id == models.Booking.time_slot_id)
+        .join(models.Event, models.Event.id == models.TimeSlot.event_id)
+        .where(models.Booking.id.in_(booking_ids))
+    )
+    db.execute(
+        insert(models.EmailOutbox).from_select(
+            ["kind", "booking_id", "recipient", "user_name", "event_title", "slot_start"], source
         )
-        
-        await fastmail.send_message(message)
-        print(f"Cancellation email sent to {user_email}")
-        
-    except Exception as e:
-        print(f"Failed to send cancellation email to {user_email}: {str(e)}")
-        pass 
\ No newline at end of file
+    )
+
+
+# ==================================
+#        SMTP and the worker
+# ==================================
+
+class SMTPSender:
+    """
+    Sends messages over one SMTP connection that is kept open between calls.
+
+    Connecting, STARTTLS and login happen once; a dropped or idle connection
+    is reopened on the next send.
+    """
+
+    def __init__(
+        self,
+        host: str = MAIL_SERVER,
+        port: int = MAIL_PORT,
+        username: Optional[str] = MAIL_USERNAME if MAIL_USE_CREDENTIALS else None,
+        password: Optional[str] = MAIL_PASSWORD,
+        starttls: bool = MAIL_STARTTLS,
+        idle_seconds: float = SMTP_IDLE_SECONDS,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.idle_seconds = idle_seconds
+        self.connections_opened = 0
+        self._smtp = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self.connections_opened += 1
+        return smtp
+
+    def send(self, message: EmailMessage) -> None:
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_seconds:
+            self.close()
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed the connection since the last message; retry once.
+            self._smtp = self._connect()
+            self._smtp.send_message(message)
+        except smtplib.SMTPException:
+            # Rejected by the server (e.g. bad recipient); the connection is still good.
+            raise
+        except OSError:
+            # Broken socket: reconnect on the next send.
+            self._smtp = None
+            raise
+        self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except OSError:  # includes SMTPException
+                pass
+            self._smtp = None
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before the next attempt after the given number of failed attempts."""
+    return min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS)
+
+
+def drain_outbox(
+    session_factory: Callable[[], Session],
+    sender,
+    batch_size: int = OUTBOX_BATCH_SIZE,
+    now: Optional[Callable[[], datetime.datetime]] = None,
+) -> int:
+    """
+    Send one batch of due outbox emails.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED on PostgreSQL, so several
+    workers can drain the same outbox without sending an email twice.
+    A failed send is retried after backoff_seconds(attempts); after
+    OUTBOX_MAX_ATTEMPTS the row is marked 'failed' and left for inspection.
+
+    Args:
+        session_factory: Creates a database session (e.g. SessionLocal)
+        sender: Object with a send(EmailMessage) method (e.g. SMTPSender)
+        batch_size: Maximum number of emails to send
+        now: Clock returning naive UTC, for tests
+
+    Returns:
+        int: Number of rows processed (sent or failed)
+    """
+    now = now or datetime.datetime.utcnow
+    db = session_factory()
+    try:
+        items: List[models.EmailOutbox] = db.scalars(
+            select(models.EmailOutbox)
+            .where(models.EmailOutbox.status == "pending", models.EmailOutbox.next_attempt_at <= now())
+            .order_by(models.EmailOutbox.next_attempt_at, models.EmailOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        for item in items:
+            try:
+                sender.send(render(item))
+            except Exception as e:
+                item.attempts += 1
+                item.last_error = str(e)
+                if item.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    item.status = "failed"
+                    logger.error("Giving up on email %d to %s: %s", item.id, item.recipient, e)
+                else:
+                    item.next_attempt_at = now() + datetime.timedelta(seconds=backoff_seconds(item.attempts))
+                    logger.warning("Email %d to %s failed (attempt %d): %s", item.id, item.recipient, item.attempts, e)
+            else:
+                item.status = "sent"
+                item.sent_at = now()
+        db.commit()
+        return len(items)
+    finally:
+        db.close()
+
+
+def run_worker_once(session_factory: Callable[[], Session], sender) -> None:
+    """Drain every due email, batch after batch, then return."""
+    while drain_outbox(session_factory, sender) == OUTBOX_BATCH_SIZE:
+        pass
+
+
+async def outbox_worker(session_factory: Callable[[], Session], sender=None) -> None:
+    """
+    Asyncio task that drains the outbox every OUTBOX_POLL_SECONDS.
+
+    The blocking SMTP and database work runs in a thread, so the event loop
+    keeps serving requests. Cancel the task to stop the worker.
+    """
+    sender = sender or SMTPSender()
+    try:
+        while True:
+            try:
+                await asyncio.to_thread(run_worker_once, session_factory, sender)
+            except Exception:
+                logger.exception("Email outbox worker failed; retrying")
+            await asyncio.sleep(OUTBOX_POLL_SECONDS)
+    finally:
+        sender.close()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(outbox_worker(SessionLocal))
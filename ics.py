@@ -0,0 +1,248 @@
+import datetime
+import os
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+import models
+import recurrence
+
+# iCalendar (RFC 5545) feeds for calendar subscriptions.
+#
+# GET /events/{id}.ics publishes the slots of an event, and
+# GET /bookings/users/{email}/bookings.ics the slots a user has booked.
+# Calendar clients poll these feeds often, so both are conditional (see
+# conditional.py): an unchanged feed costs one small query and a 304.
+#
+# A feed is rendered while it is read. Its rows come from a single query,
+# joined with the event, that is fetched in batches of ICS_BATCH_SIZE rows
+# (yield_per); each batch is encoded and sent before the next is fetched, so
+# no feed is ever built as one string. The stream runs in its own session
+# because it outlives the request's handler.
+#
+# A recurrence rule is published as one VEVENT with an RRULE, so its
+# occurrences do not have to be expanded; the slots materialized for it are
+# covered by that RRULE and left out. Slots have no end time, so every
+# VEVENT lasts ICS_SLOT_MINUTES.
+
+load_dotenv()
+
+ICS_SLOT_MINUTES = int(os.getenv("ICS_SLOT_MINUTES", "60"))
+ICS_BATCH_SIZE = int(os.getenv("ICS_BATCH_SIZE", "500"))
+
+MEDIA_TYPE = "text/calendar"
+PRODID = "-//BookMySlot//BookMySlot//EN"
+# Right-hand side of every UID, which must be globally unique
+UID_DOMAIN = "bookmyslot"
+
+# Longest content line in octets, without the line break
+_LINE_OCTETS = 75
+_WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+def escape_text(value: str) -> str:
+    """A value of the TEXT type, with its special characters escaped."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+        .replace("\r", "")
+    )
+
+
+def format_utc(moment: datetime.datetime) -> str:
+    """A naive UTC datetime as an iCalendar UTC DATE-TIME."""
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def fold(line: str) -> bytes:
+    """
+    Encode a content line, folded into lines of at most 75 octets.
+
+    Continuation lines start with a space, and a UTF-8 character is never
+    split across two lines.
+    """
+    data = line.encode("utf-8")
+    parts = []
+    start, limit = 0, _LINE_OCTETS
+    while len(data) - start > limit:
+        end = start + limit
+        while data[end] & 0xC0 == 0x80:  # inside a multi-byte character
+            end -= 1
+        parts.append(data[start:end])
+        # The leading space of a continuation line counts towards its length.
+        start, limit = end, _LINE_OCTETS - 1
+    parts.append(data[start:])
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def _encode(lines: Iterable[str]) -> bytes:
+    return b"".join(fold(line) for line in lines)
+
+
+def _calendar_header(name: Optional[str]) -> List[str]:
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN", "METHOD:PUBLISH"]
+    if name:
+        lines.append(f"X-WR-CALNAME:{escape_text(name)}")
+    return lines
+
+
+def _vevent(
+    uid: str,
+    stamp: datetime.datetime,
+    schedule: List[str],
+    title: Optional[str],
+    description: Optional[str],
+    extra: Iterable[str] = (),
+) -> List[str]:
+    """A VEVENT; schedule is its DTSTART line, followed by any RRULE and EXDATE lines."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@{UID_DOMAIN}",
+        f"DTSTAMP:{format_utc(stamp)}",
+        *schedule,
+        f"DURATION:PT{ICS_SLOT_MINUTES}M",
+        f"SUMMARY:{escape_text(title or '')}",
+    ]
+    if description:
+        lines.append(f"DESCRIPTION:{escape_text(description)}")
+    lines.extend(extra)
+    lines.append("END:VEVENT")
+    return lines
+
+
+def rrule_lines(rule: models.RecurrenceRule) -> Optional[List[str]]:
+    """
+    DTSTART, RRULE and EXDATE lines describing a recurrence rule.
+
+    DTSTART is the rule's first occurrence (see recurrence.nth_occurrence),
+    which is where RFC 5545 starts counting. RRULE may not carry both UNTIL
+    and COUNT, so only the one that ends the rule first is written.
+
+    Returns:
+        List[str]: The lines, or None if the rule has no occurrence at all
+    """
+    first = recurrence.nth_occurrence(rule, 0)
+    if rule.until is not None and rule.until < first:
+        return None
+    parts = [f"FREQ={rule.frequency.upper()}", f"INTERVAL={rule.interval}"]
+    if rule.frequency == "weekly":
+        weekdays = sorted(set(rule.weekdays or [rule.starts_at.weekday()]))
+        parts.append("BYDAY=" + ",".join(_WEEKDAYS[day] for day in weekdays))
+    last_counted = recurrence.nth_occurrence(rule, rule.count - 1) if rule.count is not None else None
+    if last_counted is not None and (rule.until is None or last_counted <= rule.until):
+        parts.append(f"COUNT={rule.count}")
+    elif rule.until is not None:
+        parts.append(f"UNTIL={format_utc(rule.until)}")
+    lines = [f"DTSTART:{format_utc(first)}", "RRULE:" + ";".join(parts)]
+    lines.extend(f"EXDATE:{format_utc(moment)}" for moment in rule.exclusion_datetimes)
+    return lines
+
+
+def _event_rule_vevent(row, stamp: datetime.datetime) -> List[str]:
+    schedule = rrule_lines(row.RecurrenceRule) if row.RecurrenceRule is not None else None
+    if schedule is None:
+        return []
+    return _vevent(f"event-{row.id}-recurrence", stamp, schedule, row.title, row.description)
+
+
+def stream_event_calendar(session_factory: Callable[[], Session], event_id: int) -> Iterator[bytes]:
+    """
+    Yield the calendar of an event's slots, one chunk per fetched batch.
+
+    The event, its recurrence rule and its explicit slots are read with one
+    outer-joined query; the rule becomes one recurring VEVENT, every
+    explicit slot a VEVENT of its own.
+
+    Args:
+        session_factory: Callable returning a new database session
+        event_id: The ID of the event
+    """
+    stamp = datetime.datetime.utcnow().replace(microsecond=0)
+    query = (
+        select(
+            models.Event.id,
+            models.Event.title,
+            models.Event.description,
+            models.RecurrenceRule,
+            models.TimeSlot.id.label("slot_id"),
+            models.TimeSlot.start_time,
+        )
+        .outerjoin(models.RecurrenceRule, models.RecurrenceRule.event_id == models.Event.id)
+        .outerjoin(
+            models.TimeSlot,
+            and_(models.TimeSlot.event_id == models.Event.id, models.TimeSlot.recurrence_rule_id.is_(None)),
+        )
+        .where(models.Event.id == event_id)
+        .order_by(models.TimeSlot.start_time, models.TimeSlot.id)
+        .execution_options(yield_per=ICS_BATCH_SIZE)
+    )
+
+    def slot_vevents(rows) -> List[str]:
+        lines = []
+        for row in rows:
+            if row.slot_id is not None:
+                schedule = [f"DTSTART:{format_utc(row.start_time)}"]
+                lines += _vevent(f"slot-{row.slot_id}", stamp, schedule, row.title, row.description)
+        return lines
+
+    db = session_factory()
+    try:
+        batches = db.execute(query).partitions()
+        first = next(batches, [])
+        # The event and its rule come with every row; the first one names the calendar.
+        head = first[0] if first else None
+        lines = _calendar_header(head.title if head is not None else None)
+        if head is not None:
+            lines += _event_rule_vevent(head, stamp)
+        yield _encode(lines + slot_vevents(first))
+        for rows in batches:
+            yield _encode(slot_vevents(rows))
+    finally:
+        db.close()
+    yield _encode(["END:VCALENDAR"])
+
+
+def stream_user_calendar(session_factory: Callable[[], Session], email: str) -> Iterator[bytes]:
+    """
+    Yield the calendar of a user's bookings, one chunk per fetched batch.
+
+    Each booking becomes a VEVENT at its slot's start time, titled with its
+    event; bookings, slots and events are joined in one query that the
+    (user_email, created_at, id) index serves in order.
+
+    Args:
+        session_factory: Callable returning a new database session
+        email: The email address of the user
+    """
+    stamp = datetime.datetime.utcnow().replace(microsecond=0)
+    query = (
+        select(
+            models.Booking.id,
+            models.TimeSlot.start_time,
+            models.Event.title,
+            models.Event.description,
+        )
+        .join(models.TimeSlot, models.TimeSlot.id == models.Booking.time_slot_id)
+        .join(models.Event, models.Event.id == models.TimeSlot.event_id)
+        .where(models.Booking.user_email == email)
+        .order_by(models.Booking.created_at, models.Booking.id)
+        .execution_options(yield_per=ICS_BATCH_SIZE)
+    )
+
+    yield _encode(_calendar_header("BookMySlot bookings"))
+    db = session_factory()
+    try:
+        for rows in db.execute(query).partitions():
+            lines = []
+            for row in rows:
+                schedule = [f"DTSTART:{format_utc(row.start_time)}"]
+                lines += _vevent(f"booking-{row.id}", stamp, schedule, row.title, row.description, ["STATUS:CONFIRMED"])
+            yield _encode(lines)
+    finally:
+        db.close()
+    yield _encode(["END:VCALENDAR"])
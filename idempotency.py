@@ -0,0 +1,126 @@
+import datetime
+import hashlib
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Response, status
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+import models
+import serialization
+
+# Idempotency keys for booking creation.
+#
+# A client that retries POST /bookings/events/{id}/bookings after a timeout
+# sends the same Idempotency-Key header with every attempt. The response of
+# the first successful attempt is stored with the key in the same transaction
+# as the booking, so there is never a booking without its key or a key without
+# its booking. A retry is answered from the stored response after one
+# primary-key lookup, without running the admission queries again. A key
+# reused with a different request is rejected. Keys expire after
+# IDEMPOTENCY_TTL_SECONDS; purge.py deletes the expired rows.
+
+load_dotenv()
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+# Longest accepted key; clients usually send a UUID
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# Header marking a response that was replayed from a stored one
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def check_key(key: str) -> str:
+    """Validate an Idempotency-Key header value; 400 if it is empty or too long."""
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters",
+        )
+    return key
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    """Hash identifying a request, so a key cannot be reused for a different one."""
+    return hashlib.sha256(b"\n".join([method.encode(), path.encode(), body])).hexdigest()
+
+
+def replay(db: Session, key: str, request_hash: str) -> Optional[Response]:
+    """
+    The stored response for a key, or None if the key is new or expired.
+
+    Raises:
+        HTTPException: 422 if the key was used for a different request
+    """
+    row = db.execute(
+        select(
+            models.IdempotencyKey.request_hash,
+            models.IdempotencyKey.status_code,
+            models.IdempotencyKey.response_body,
+        ).where(
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.expires_at > datetime.datetime.utcnow(),
+        )
+    ).first()
+    if row is None:
+        return None
+    if row.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="This Idempotency-Key was already used for a different request",
+        )
+    return Response(
+        content=row.response_body,
+        status_code=row.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def store(db: Session, key: str, request_hash: str, status_code: int, content) -> None:
+    """
+    Save the response for a key, in the caller's transaction.
+
+    An expired row for the same key is replaced. If a concurrent request
+    stored the key first, the caller's commit fails on the primary key.
+    """
+    now = datetime.datetime.utcnow()
+    db.execute(
+        delete(models.IdempotencyKey)
+        .where(models.IdempotencyKey.key == key, models.IdempotencyKey.expires_at <= now)
+        .execution_options(synchronize_session=False)
+    )
+    db.add(models.IdempotencyKey(
+        key=key,
+        request_hash=request_hash,
+        status_code=status_code,
+        response_body=serialization.dumps(content).decode("utf-8"),
+        created_at=now,
+        expires_at=now + datetime.timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    ))
+
+
+def purge_expired_keys(db: Session, batch_size: int = 1000) -> int:
+    """
+    Delete expired keys, batch_size rows per transaction.
+
+    Returns:
+        int: Number of keys deleted
+    """
+    purged = 0
+    while True:
+        keys = db.scalars(
+            select(models.IdempotencyKey.key)
+            .where(models.IdempotencyKey.expires_at <= datetime.datetime.utcnow())
+            .limit(batch_size)
+        ).all()
+        if not keys:
+            return purged
+        db.execute(
+            delete(models.IdempotencyKey)
+            .where(models.IdempotencyKey.key.in_(keys))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        purged += len(keys)
@@ -0,0 +1,296 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request-level performance instrumentation.
+#
+# InstrumentationMiddleware times every HTTP request, and SQLAlchemy hooks on
+# every Engine attribute the statements it runs to the request being served
+# (through a context variable, which FastAPI carries into the threadpool and
+# the async path carries into run_sync). Per request this yields the route,
+# the latency, the number of SQL statements, the time spent in them and the
+# rows they touched (rows fetched from result sets, whether by the ORM or by
+# Core/column selects, plus rows written). These are
+# aggregated into Prometheus metrics served at GET /metrics.
+#
+# The same SELECT repeated many times within one request is the signature of
+# an N+1 query pattern; such requests are counted and logged. Requests slower
+# than SLOW_REQUEST_MS are logged with their per-statement breakdown.
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# Times the same SELECT may run in one request before it is flagged as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """
+    SQL activity of one request, filled in by the engine hooks below.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        # statement text -> [executions, seconds]
+        self.by_statement: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float, rows: int) -> None:
+        with self._lock:
+            self.statements += 1
+            self.sql_seconds += seconds
+            self.rows += max(rows, 0)
+            entry = self.by_statement[statement]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def record_rows(self, rows: int) -> None:
+        with self._lock:
+            self.rows += rows
+
+    def repeated_selects(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """SELECT statements that ran at least threshold times (likely N+1)."""
+        return [
+            (statement, int(count))
+            for statement, (count, _) in self.by_statement.items()
+            if count >= threshold and statement.lstrip().upper().startswith("SELECT")
+        ]
+
+    def breakdown(self, limit: int = 5) -> List[Tuple[str, int, float]]:
+        """The statements that took the most time: (statement, executions, milliseconds)."""
+        slowest = sorted(self.by_statement.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [(statement, int(count), round(seconds * 1000, 2)) for statement, (count, seconds) in slowest]
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats of the request being served, or None outside a request."""
+    return _current.get()
+
+
+# ==================================
+#          SQLAlchemy hooks
+# ==================================
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("instrumentation_started", []).append(time.perf_counter())
+
+
+class _CountingCursor:
+    """
+    DBAPI cursor proxy that counts the rows fetched through it.
+
+    Results read rows through fetchone/fetchmany/fetchall, whether they are
+    ORM objects, plain column rows or a yield_per stream, so counting here
+    sees every row a request reads.
+    """
+
+    def __init__(self, cursor, stats: RequestStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.record_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._stats.record_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.record_rows(len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("instrumentation_started")
+    if stats is None or not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    if cursor.description is None:
+        # No result set: rowcount is the number of rows written.
+        stats.record(statement, seconds, cursor.rowcount)
+        return
+    # A result set (SELECT, RETURNING). Its rows are counted as the result
+    # fetches them; rowcount is -1 here on most drivers, and the row count
+    # on psycopg2, which would count them twice.
+    stats.record(statement, seconds, 0)
+    if context is not None and context.cursor is cursor:
+        context.cursor = _CountingCursor(cursor, stats)
+
+
+# ==================================
+#             Metrics
+# ==================================
+
+# Latency buckets in seconds, as in the Prometheus client defaults.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """
+    In-process metric store rendered in the Prometheus text format.
+
+    Every series is labelled by method, route template and status code; the
+    route template (e.g. /events/{event_id}) keeps the label set bounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.requests = defaultdict(int)
+        self.duration_buckets = defaultdict(lambda: [0] * len(BUCKETS))
+        self.duration_sum = defaultdict(float)
+        self.statements = defaultdict(int)
+        self.sql_seconds = defaultdict(float)
+        self.rows = defaultdict(int)
+        self.n_plus_one = defaultdict(int)
+        self.slow = defaultdict(int)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def observe(self, labels: Tuple[str, str, str], seconds: float, stats: RequestStats, n_plus_one: bool, slow: bool) -> None:
+        with self._lock:
+            self.requests[labels] += 1
+            self.duration_sum[labels] += seconds
+            buckets = self.duration_buckets[labels]
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+            self.statements[labels] += stats.statements
+            self.sql_seconds[labels] += stats.sql_seconds
+            self.rows[labels] += stats.rows
+            self.n_plus_one[labels] += 1 if n_plus_one else 0
+            self.slow[labels] += 1 if slow else 0
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format (version 0.0.4)."""
+        def label_text(labels, extra=""):
+            method, route, status = (value.replace("\\", "\\\\").replace('"', '\\"') for value in labels)
+            return f'{{method="{method}",route="{route}",status="{status}"{extra}}}'
+
+        lines = []
+
+        def counter(name, help_text, values, fmt="{}"):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{label_text(labels)} {fmt.format(value)}")
+
+        with self._lock:
+            counter("http_requests_total", "HTTP requests served.", self.requests)
+            lines.append("# HELP http_request_duration_seconds Time to serve an HTTP request.")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for labels, buckets in sorted(self.duration_buckets.items()):
+                total = self.requests[labels]
+                for bound, count in zip(BUCKETS + ("+Inf",), buckets + [total]):
+                    le = ',le="%s"' % bound
+                    lines.append(f"http_request_duration_seconds_bucket{label_text(labels, le)} {count}")
+                lines.append(f"http_request_duration_seconds_sum{label_text(labels)} {self.duration_sum[labels]:.6f}")
+                lines.append(f"http_request_duration_seconds_count{label_text(labels)} {total}")
+            counter("db_statements_total", "SQL statements executed while serving requests.", self.statements)
+            counter("db_statement_seconds_total", "Time spent executing SQL while serving requests.", self.sql_seconds, "{:.6f}")
+            counter("db_rows_total", "Rows fetched from result sets plus rows written while serving requests.", self.rows)
+            counter("http_requests_n_plus_one_total", "Requests that repeated a SELECT at least N_PLUS_ONE_THRESHOLD times.", self.n_plus_one)
+            counter("http_requests_slow_total", "Requests slower than SLOW_REQUEST_MS.", self.slow)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+# ==================================
+#            Middleware
+# ==================================
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware that measures every HTTP request (see the top of this module).
+
+    It is a plain ASGI middleware rather than a BaseHTTPMiddleware, so it
+    does not buffer streaming responses or add a task per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        event_stream = False
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                event_stream = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            # The router stores the matched route in the scope; unmatched
+            # paths share one label instead of one per URL.
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            self._observe(scope["method"], route_path, status_code, elapsed, stats, event_stream)
+
+    def _observe(
+        self, method: str, route: str, status_code: int, elapsed: float, stats: RequestStats, event_stream: bool
+    ) -> None:
+        repeated = stats.repeated_selects()
+        # Server-sent event streams stay open by design; they are never "slow".
+        slow = not event_stream and elapsed * 1000 >= SLOW_REQUEST_MS
+        metrics.observe((method, route, str(status_code)), elapsed, stats, bool(repeated), slow)
+
+        for statement, count in repeated:
+            logger.warning(
+                "Possible N+1 query in %s %s: statement ran %d times: %s",
+                method, route, count, " ".join(statement.split())[:300],
+            )
+        if slow:
+            logger.warning(
+                "Slow request %s %s: %.1f ms, %d statements, %.1f ms in SQL. Top statements: %s",
+                method, route, elapsed * 1000, stats.statements, stats.sql_seconds * 1000,
+                "; ".join(
+                    f"{count}x {ms} ms {' '.join(statement.split())[:200]}"
+                    for statement, count, ms in stats.breakdown()
+                ),
+            )
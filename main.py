@@ -1,15 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine
-import models
-from routes import events, bookings
+from fastapi.responses import PlainTextResponse
+import asyncio
+from database import engine, pool_stats, replicas, ReadYourWritesMiddleware, SessionLocal, DB_ASYNC, READ_YOUR_WRITES_HEADER
+import cache
+import email_service
+import instrumentation
+import migrations
+import ratelimit
+from routes import events, bookings, slots
 
 # This line creates the database tables.
 # It checks if the tables defined in models.py exist in the database 
-# specified by the engine, and if they don't, it creates them.
-# This is great for development, but for production, you would typically
-# use a database migration tool like Alembic.
-models.Base.metadata.create_all(bind=engine)
+# specified by the engine, and if they don't, it creates them. It then
+# applies the in-place upgrades in migrations.py (new columns, constraints
+# and indexes on existing tables), which create_all alone would skip.
+# For larger schema changes you would typically use a migration tool like Alembic.
+migrations.upgrade(engine)
 
 # Create an instance of the FastAPI class.
 # This instance will be the main point of interaction for creating all your API.
@@ -25,18 +32,56 @@ app.add_middleware(
     allow_origins=[
         "http://localhost:3000",  # React dev server
         "http://127.0.0.1:3000",  # React dev server alternative
-        "https://*.vercel.app",   # Vercel frontend
-        "https://*.onrender.com", # Render frontend (if needed)
     ],
+    # Vercel frontend, and Render frontend (if needed); allow_origins does
+    # not expand wildcards, so subdomains are matched here.
+    allow_origin_regex=r"https://[a-z0-9-]+\.(vercel\.app|onrender\.com)",
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend read the read-your-writes deadline (see database.ReadYourWritesMiddleware).
+    expose_headers=[READ_YOUR_WRITES_HEADER],
 )
 
+# Send a client's reads to the primary right after it writes (see database.get_read_db).
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Record latency and SQL activity per request for /metrics (see instrumentation.py).
+# Added last, so it is the outermost middleware and times everything below it.
+app.add_middleware(instrumentation.InstrumentationMiddleware)
+
 # Include the routers from the routes module.
 # This makes the endpoints defined in events.py and bookings.py available.
+# With DB_ASYNC enabled, the async versions of the main routes are included
+# first, so they take precedence over the sync routes with the same path.
+# (cache.create_cache refuses the Redis cache in that mode, see there.)
+if DB_ASYNC:
+    from database import dispose_async_engine
+    from routes import events_async, bookings_async
+    app.include_router(events_async.router)
+    app.include_router(bookings_async.router)
+    app.add_event_handler("shutdown", dispose_async_engine)
 app.include_router(events.router)
 app.include_router(bookings.router)
+app.include_router(slots.router)
+
+# Stop the tasks behind the live availability streams (see pubsub.py).
+app.add_event_handler("shutdown", events.availability_hub.stop)
+
+# Drain the email outbox in the background (see email_service.py). With
+# EMAIL_WORKER=external, run `python email_service.py` as its own process instead.
+if email_service.EMAIL_ENABLED and email_service.EMAIL_WORKER == "inprocess":
+    _outbox_task = None
+
+    @app.on_event("startup")
+    async def start_outbox_worker():
+        global _outbox_task
+        _outbox_task = asyncio.create_task(email_service.outbox_worker(SessionLocal))
+
+    @app.on_event("shutdown")
+    async def stop_outbox_worker():
+        if _outbox_task is not None:
+            _outbox_task.cancel()
 
 # Define a root endpoint.
 # This is a simple GET request that returns a welcome message.
@@ -46,4 +91,36 @@ def read_root():
     """
     Root endpoint to welcome users to the API.
     """
-    return {"message": "Welcome to the BookMySlot API!"} 
\ No newline at end of file
+    return {"message": "Welcome to the BookMySlot API!"}
+
+@app.get("/stats/cache")
+def read_cache_stats():
+    """
+    Hit, miss and eviction counters of the read-through cache (see cache.py).
+    """
+    return cache.cache.stats()
+
+@app.get("/stats/pool")
+def read_pool_stats():
+    """
+    State and checkout wait counters of the connection pools (see database.pool_stats).
+    """
+    stats = {"sync": pool_stats(engine)}
+    if replicas.engines:
+        stats["replicas"] = replicas.stats()
+        stats["replica_fallbacks"] = replicas.fallbacks
+    if DB_ASYNC:
+        from database import get_async_engine
+        stats["async"] = pool_stats(get_async_engine())
+    return stats
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """
+    Request latency and SQL metrics in the Prometheus text format (see
+    instrumentation.py), plus the booking gate and rejections (see ratelimit.py).
+    """
+    return PlainTextResponse(
+        instrumentation.metrics.render() + ratelimit.render_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,217 @@
+"""
+In-place schema upgrades for databases created by older versions.
+
+models.Base.metadata.create_all() creates missing tables but never alters
+existing ones, so columns, constraints and indexes added to existing tables
+are applied here. Every step checks the live schema first, so running the
+upgrade again (it runs on every startup from main.py) is a no-op.
+
+    python migrations.py   # upgrade the database in DATABASE_URL
+"""
+import logging
+import re
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+import models
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(conn: Connection, table: str) -> set:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def _has_unique(conn: Connection, table: str, name: str) -> bool:
+    inspector = inspect(conn)
+    names = {c["name"] for c in inspector.get_unique_constraints(table)}
+    names |= {i["name"] for i in inspector.get_indexes(table) if i.get("unique")}
+    return name in names
+
+
+def _add_booked_count(conn: Connection) -> None:
+    """Add time_slots.booked_count and backfill it from the existing bookings."""
+    if "booked_count" in _columns(conn, "time_slots"):
+        return
+    logger.info("Adding time_slots.booked_count")
+    conn.execute(text("ALTER TABLE time_slots ADD COLUMN booked_count INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(text(
+        "UPDATE time_slots SET booked_count = "
+        "(SELECT COUNT(*) FROM bookings WHERE bookings.time_slot_id = time_slots.id)"
+    ))
+
+
+def _add_booking_uniqueness(conn: Connection) -> None:
+    """Create the (time_slot_id, user_email) unique index for bookings."""
+    name = "uq_bookings_time_slot_user_email"
+    if _has_unique(conn, "bookings", name):
+        return
+    duplicates = conn.execute(text(
+        "SELECT COUNT(*) FROM (SELECT time_slot_id, user_email FROM bookings "
+        "GROUP BY time_slot_id, user_email HAVING COUNT(*) > 1) AS duplicated"
+    )).scalar()
+    if duplicates:
+        # Deleting bookings is not something a startup step should decide.
+        logger.error(
+            "Not creating %s: %d (time_slot_id, user_email) pairs are booked more than once. "
+            "Remove the duplicate bookings and restart.", name, duplicates
+        )
+        return
+    logger.info("Creating unique index %s", name)
+    conn.execute(text(f"CREATE UNIQUE INDEX {name} ON bookings (time_slot_id, user_email)"))
+
+
+def _add_recurrence_rule_link(conn: Connection) -> None:
+    """Add time_slots.recurrence_rule_id and its (rule, start_time) unique index."""
+    if "recurrence_rule_id" not in _columns(conn, "time_slots"):
+        logger.info("Adding time_slots.recurrence_rule_id")
+        conn.execute(text(
+            "ALTER TABLE time_slots ADD COLUMN recurrence_rule_id INTEGER REFERENCES recurrence_rules (id)"
+        ))
+    name = "uq_time_slots_rule_start_time"
+    if not _has_unique(conn, "time_slots", name):
+        # Existing slots all have a NULL rule, so there is nothing to deduplicate.
+        logger.info("Creating unique index %s", name)
+        conn.execute(text(f"CREATE UNIQUE INDEX {name} ON time_slots (recurrence_rule_id, start_time)"))
+
+
+def _add_event_version(conn: Connection) -> None:
+    """Add events.version, the counter behind the ETags of event reads."""
+    if "version" in _columns(conn, "events"):
+        return
+    logger.info("Adding events.version")
+    conn.execute(text("ALTER TABLE events ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+def _foreign_key_actions(conn: Connection, table: str) -> dict:
+    """
+    The foreign keys of a table as {(column, referred table): (name, ON DELETE action)}.
+
+    SQLAlchemy does not reflect the action of an inline SQLite REFERENCES
+    clause (as written by _add_recurrence_rule_link), so SQLite is asked directly.
+    """
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"PRAGMA foreign_key_list({table})")).mappings()
+        return {(row["from"], row["table"]): (None, row["on_delete"].upper()) for row in rows}
+    actions = {}
+    for fk in inspect(conn).get_foreign_keys(table):
+        ondelete = (fk["options"].get("ondelete") or "NO ACTION").upper()
+        actions[(fk["constrained_columns"][0], fk["referred_table"])] = (fk["name"], ondelete)
+    return actions
+
+
+def _rebuild_sqlite_table(conn: Connection, table: str, create_sql: str) -> None:
+    """
+    Replace a SQLite table by one created with create_sql, keeping its rows and indexes.
+
+    SQLite cannot alter a constraint in place, so this is the rebuild from
+    https://www.sqlite.org/lang_altertable.html. It runs with foreign keys
+    off (see upgrade), so dropping the old table neither fails nor fires the
+    ON DELETE actions of the tables that reference it.
+    """
+    new_table = f"_new_{table}"
+    indexes = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+        {"table": table},
+    ).scalars().all()
+    conn.execute(text(f"DROP TABLE IF EXISTS {new_table}"))  # left over by an interrupted run
+    conn.execute(text(re.sub(rf'^CREATE TABLE\s+"?{table}"?', f"CREATE TABLE {new_table}", create_sql)))
+    conn.execute(text(f"INSERT INTO {new_table} SELECT * FROM {table}"))
+    conn.execute(text(f"DROP TABLE {table}"))
+    conn.execute(text(f"ALTER TABLE {new_table} RENAME TO {table}"))
+    for index_sql in indexes:
+        conn.execute(text(index_sql))
+
+
+def _add_foreign_key_cascades(conn: Connection) -> None:
+    """
+    Make the foreign keys declared with ondelete="CASCADE" in models.py cascade in the database.
+
+    Deleting an event then removes its slots, bookings, waitlist entries and
+    recurrence rule in the same statement, without the ORM loading them.
+    """
+    for table in models.Base.metadata.sorted_tables:
+        wanted = {
+            (fk.parent.name, fk.column.table.name): fk.ondelete
+            for fk in table.foreign_keys
+            if fk.ondelete
+        }
+        live = _foreign_key_actions(conn, table.name)
+        missing = [key for key in wanted if key in live and live[key][1] != wanted[key]]
+        if not missing:
+            continue
+        logger.info("Adding ON DELETE actions to the foreign keys of %s", table.name)
+        if conn.dialect.name == "sqlite":
+            create_sql = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :table"), {"table": table.name}
+            ).scalar()
+            for column, parent in missing:
+                # Matches both 'FOREIGN KEY(col) REFERENCES parent (id)' and
+                # an inline 'col INTEGER REFERENCES parent (id)'.
+                create_sql = re.sub(
+                    rf'(\bREFERENCES\s+"?{parent}"?\s*\(\s*"?id"?\s*\))(?!\s*ON\s+DELETE)',
+                    rf"\1 ON DELETE {wanted[(column, parent)]}",
+                    create_sql,
+                )
+            _rebuild_sqlite_table(conn, table.name, create_sql)
+            continue
+        for column, parent in missing:
+            name = live[(column, parent)][0]
+            # NOT VALID skips the scan of existing rows while the table is
+            # locked; VALIDATE then checks them under a weaker lock.
+            conn.execute(text(
+                f"ALTER TABLE {table.name} DROP CONSTRAINT {name}, "
+                f"ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {parent} (id) "
+                f"ON DELETE {wanted[(column, parent)]} NOT VALID"
+            ))
+            conn.execute(text(f"ALTER TABLE {table.name} VALIDATE CONSTRAINT {name}"))
+
+
+def _add_missing_indexes(conn: Connection) -> None:
+    """Create every index declared in models.py that the database lacks."""
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+STEPS = [
+    _add_booked_count,
+    _add_booking_uniqueness,
+    _add_recurrence_rule_link,
+    _add_event_version,
+    _add_foreign_key_cascades,
+    _add_missing_indexes,
+]
+
+
+def upgrade(engine: Engine) -> None:
+    """
+    Bring an existing database up to the schema in models.py.
+
+    Args:
+        engine: Engine of the database to upgrade
+    """
+    models.Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            # Needed by _rebuild_sqlite_table. The pragma has no effect inside
+            # a transaction, so it is set before the steps begin theirs.
+            conn.execute(text("PRAGMA foreign_keys=OFF"))
+            conn.commit()
+        try:
+            for step in STEPS:
+                with conn.begin():
+                    step(conn)
+        finally:
+            if sqlite:
+                conn.execute(text("PRAGMA foreign_keys=ON"))
+                conn.commit()
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    upgrade(engine)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, JSON, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -9,17 +9,62 @@ class Event(Base):
     This maps to the 'events' table in the database.
     """
     __tablename__ = "events"
+    # The plain index on title serves equality lookups; on PostgreSQL the
+    # pattern-ops index lets `title LIKE 'prefix%'` (the list endpoint's
+    # title_prefix filter) use an index scan under any collation.
+    __table_args__ = (
+        Index(
+            "ix_events_title_pattern",
+            "title",
+            postgresql_ops={"title": "text_pattern_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(String)
     max_bookings_per_slot = Column(Integer, default=1)
+    # Bumped whenever the event's slots or bookings change; the source of the
+    # ETag on event reads (see conditional.py).
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # This creates a one-to-many relationship with the TimeSlot model.
     # The 'back_populates' argument establishes a bidirectional relationship.
     # 'cascade="all, delete-orphan"' means that if an Event is deleted,
     # all its associated TimeSlots will also be deleted.
-    time_slots = relationship("TimeSlot", back_populates="event", cascade="all, delete-orphan")
+    # The foreign keys below delete the rows of a deleted parent in the
+    # database (ON DELETE CASCADE). 'passive_deletes=True' lets the ORM rely
+    # on that instead of loading every child row just to delete it.
+    time_slots = relationship("TimeSlot", back_populates="event", cascade="all, delete-orphan", passive_deletes=True)
+    # Optional recurring schedule; see RecurrenceRule.
+    recurrence = relationship(
+        "RecurrenceRule", back_populates="event", uselist=False, cascade="all, delete-orphan", passive_deletes=True
+    )
+
+class RecurrenceRule(Base):
+    """
+    SQLAlchemy model for a recurring schedule of an Event.
+    This maps to the 'recurrence_rules' table in the database.
+    Occurrences are computed from the rule at read time (see recurrence.py);
+    a TimeSlot row is only created when an occurrence is first booked.
+    """
+    __tablename__ = "recurrence_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), unique=True)
+    frequency = Column(String, nullable=False)  # "daily" or "weekly"
+    interval = Column(Integer, nullable=False, default=1)
+    weekdays = Column(JSON)  # Weekly rules: list of weekdays, 0 = Monday
+    starts_at = Column(DateTime, nullable=False)  # First occurrence
+    until = Column(DateTime)  # Last possible occurrence (inclusive)
+    count = Column(Integer)  # Maximum number of occurrences
+    exclusions = Column(JSON, default=list)  # ISO 8601 start times to skip
+
+    event = relationship("Event", back_populates="recurrence")
+
+    @property
+    def exclusion_datetimes(self):
+        return [datetime.datetime.fromisoformat(value) for value in self.exclusions or []]
 
 class TimeSlot(Base):
     """
@@ -28,15 +73,34 @@ class TimeSlot(Base):
     Each time slot belongs to a specific event.
     """
     __tablename__ = "time_slots"
+    # Slots are almost always looked up per event, often within a date range
+    # (e.g. the availability and date filters on the event list).
+    # The cross-event search (GET /slots) scans a time window across all
+    # events in (start_time, event_id, id) order, which is also its cursor.
+    # Materialized occurrences of a recurrence rule are unique per start time.
+    # Explicit slots have no rule (NULL), so they are not affected.
+    __table_args__ = (
+        Index("ix_time_slots_event_id_start_time", "event_id", "start_time"),
+        Index("ix_time_slots_start_time_event_id", "start_time", "event_id", "id"),
+        UniqueConstraint("recurrence_rule_id", "start_time", name="uq_time_slots_rule_start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    event_id = Column(Integer, ForeignKey("events.id"))
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"))
     start_time = Column(DateTime)
+    # Set when the slot is a materialized occurrence of a recurrence rule
+    recurrence_rule_id = Column(Integer, ForeignKey("recurrence_rules.id", ondelete="CASCADE"))
+    # Number of bookings currently held for this slot. It is maintained by the
+    # admission path in admission.py with a conditional increment, so checking
+    # capacity never needs a COUNT(*) over the bookings table.
+    booked_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationship back to the Event model
     event = relationship("Event", back_populates="time_slots")
     # Relationship to the Booking model
-    bookings = relationship("Booking", back_populates="time_slot", cascade="all, delete-orphan")
+    bookings = relationship("Booking", back_populates="time_slot", cascade="all, delete-orphan", passive_deletes=True)
+    # People waiting for a seat to free up, first come first served
+    waitlist = relationship("WaitlistEntry", back_populates="time_slot", cascade="all, delete-orphan", passive_deletes=True)
 
 class Booking(Base):
     """
@@ -45,12 +109,87 @@ class Booking(Base):
     Each booking is for a specific time slot and user.
     """
     __tablename__ = "bookings"
+    # A user can hold at most one booking per time slot. The database enforces
+    # this, so concurrent duplicate requests cannot both succeed.
+    # A user's booking history is read newest first, a page at a time; the
+    # composite index serves both the filter and the (created_at, id) order.
+    __table_args__ = (
+        UniqueConstraint("time_slot_id", "user_email", name="uq_bookings_time_slot_user_email"),
+        Index("ix_bookings_user_email_created_at", "user_email", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    time_slot_id = Column(Integer, ForeignKey("time_slots.id"))
+    time_slot_id = Column(Integer, ForeignKey("time_slots.id", ondelete="CASCADE"))
     user_name = Column(String)
     user_email = Column(String, index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     # Relationship back to the TimeSlot model
-    time_slot = relationship("TimeSlot", back_populates="bookings") 
\ No newline at end of file
+    time_slot = relationship("TimeSlot", back_populates="bookings") 
+
+class WaitlistEntry(Base):
+    """
+    SQLAlchemy model for a place on the waitlist of a full TimeSlot.
+    This maps to the 'waitlist_entries' table in the database.
+    When a booking of the slot is cancelled, the oldest entry is turned into
+    a booking in the same transaction (see admission.cancel_and_promote).
+    """
+    __tablename__ = "waitlist_entries"
+    # One place per user and slot; entries are promoted in id order per slot.
+    __table_args__ = (
+        UniqueConstraint("time_slot_id", "user_email", name="uq_waitlist_time_slot_user_email"),
+        Index("ix_waitlist_entries_time_slot_id_id", "time_slot_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    time_slot_id = Column(Integer, ForeignKey("time_slots.id", ondelete="CASCADE"), nullable=False)
+    user_name = Column(String)
+    user_email = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    time_slot = relationship("TimeSlot", back_populates="waitlist")
+
+class EmailOutbox(Base):
+    """
+    SQLAlchemy model for an email waiting to be sent.
+    This maps to the 'email_outbox' table in the database.
+    Rows are written in the same transaction as the booking they describe and
+    sent later by the outbox worker in email_service.py, so a booking never
+    waits on the mail server and is never committed without its email.
+    """
+    __tablename__ = "email_outbox"
+    # The worker polls for pending rows that are due, oldest first.
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # 'confirmation' or 'cancellation'
+    status = Column(String, nullable=False, default="pending", server_default="pending")  # pending, sent or failed
+    # A snapshot of what the email shows, so it can still be sent after the
+    # booking is gone (e.g. a cancellation)
+    booking_id = Column(Integer)
+    recipient = Column(String, nullable=False)
+    user_name = Column(String)
+    event_title = Column(String)
+    slot_start = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    sent_at = Column(DateTime)
+
+class IdempotencyKey(Base):
+    """
+    SQLAlchemy model for the stored response of an idempotent request.
+    This maps to the 'idempotency_keys' table in the database.
+    Written in the same transaction as the booking it answers; see idempotency.py.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)  # The client's Idempotency-Key header
+    request_hash = Column(String, nullable=False)  # Method, path and body of the first request
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
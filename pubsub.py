@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+
+from database import DATABASE_URL, DB_ASYNC
+import serialization
+
+# Live availability updates.
+#
+# GET /events/{id}/availability/stream is a server-sent events stream. It
+# pushes the remaining capacity of every slot of the event whenever a booking
+# or cancellation changes it. Writers publish the ID of the changed event to
+# a broker after they commit. In every worker process, one dispatcher task
+# listens to the broker and wakes the watcher task of that event. That one
+# coroutine per event reloads the availability from the database (not the
+# cache, which may be per worker and not yet invalidated there) and fans the
+# snapshot out to every client streaming that event. The database therefore
+# sees one read per change per worker instead of one poll per viewer.
+#
+# The broker is pluggable. The default in-memory broker only reaches streams
+# served by the worker that handled the write. With several uvicorn workers,
+# use Redis pub/sub or PostgreSQL LISTEN/NOTIFY.
+
+load_dotenv()
+
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory")  # memory, redis or postgres
+PUBSUB_URL = os.getenv("PUBSUB_URL", "redis://localhost:6379/0")
+PUBSUB_CHANNEL = os.getenv("PUBSUB_CHANNEL", "bookmyslot_availability")
+# Comment line sent on an idle stream, so proxies do not close it
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# A stream ends after this long; EventSource reconnects by itself
+SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", "300"))
+# Client reconnection delay announced in the stream
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+# Delay before the dispatcher listens again after the broker failed
+PUBSUB_RECONNECT_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class Broker:
+    """
+    Interface every broker implements: carries IDs of changed events.
+    """
+
+    def publish(self, event_id: int) -> None:
+        """Announce that an event's availability changed. Call after the commit."""
+        raise NotImplementedError
+
+    def listen(self) -> AsyncIterator[int]:
+        """Async iterator over the IDs published from now on, by any process the broker reaches."""
+        raise NotImplementedError
+
+
+class MemoryBroker(Broker):
+    """
+    In-process broker. publish() may be called from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    def publish(self, event_id):
+        with self._lock:
+            listeners = list(self._listeners)
+        for loop, queue in listeners:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event_id)
+            except RuntimeError:
+                # The listener's event loop has been closed.
+                pass
+
+    async def listen(self):
+        listener = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._listeners.append(listener)
+        try:
+            while True:
+                yield await listener[1].get()
+        finally:
+            with self._lock:
+                self._listeners.remove(listener)
+
+
+class RedisBroker(Broker):
+    """
+    Redis pub/sub broker, shared by every worker connected to the same Redis.
+
+    Requires the 'redis' package.
+    """
+
+    def __init__(self, url: str = PUBSUB_URL, channel: str = PUBSUB_CHANNEL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("PUBSUB_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.url = url
+        self.channel = channel
+        self._redis = redis.Redis.from_url(url)
+
+    def publish(self, event_id):
+        self._redis.publish(self.channel, str(event_id))
+
+    async def listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        subscription = client.pubsub()
+        await subscription.subscribe(self.channel)
+        try:
+            async for message in subscription.listen():
+                if message["type"] == "message":
+                    yield int(message["data"])
+        finally:
+            await subscription.reset()
+            await client.close()
+
+
+class PostgresBroker(Broker):
+    """
+    PostgreSQL LISTEN/NOTIFY broker, for deployments already on PostgreSQL.
+
+    Notifications are sent with pg_notify over the app's engine and received
+    on a dedicated asyncpg connection. Requires 'asyncpg'.
+    """
+
+    def __init__(self, url: str = DATABASE_URL, channel: str = PUBSUB_CHANNEL):
+        from sqlalchemy.engine import make_url
+
+        from database import engine
+
+        self.channel = channel
+        self._engine = engine
+        # asyncpg takes a plain libpq URL, without SQLAlchemy's driver suffix.
+        self._dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+    def publish(self, event_id):
+        from sqlalchemy import func, select
+
+        with self._engine.connect() as conn:
+            conn.execute(select(func.pg_notify(self.channel, str(event_id))))
+            conn.commit()
+
+    async def listen(self):
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("PUBSUB_BACKEND=postgres requires the 'asyncpg' package (pip install asyncpg)")
+
+        received: asyncio.Queue = asyncio.Queue()
+        conn = await asyncpg.connect(self._dsn)
+        await conn.add_listener(self.channel, lambda _conn, _pid, _channel, payload: received.put_nowait(int(payload)))
+        # None marks a lost connection, so the dispatcher reconnects.
+        conn.add_termination_listener(lambda _conn: received.put_nowait(None))
+        try:
+            while True:
+                event_id = await received.get()
+                if event_id is None:
+                    raise ConnectionError("LISTEN connection to PostgreSQL was lost")
+                yield event_id
+        finally:
+            if not conn.is_closed():
+                await conn.close()
+
+
+def create_broker(backend: str = PUBSUB_BACKEND) -> Broker:
+    """
+    Create the broker selected by PUBSUB_BACKEND.
+
+    Args:
+        backend: 'memory' (default), 'redis' or 'postgres'
+    """
+    if backend == "memory":
+        return MemoryBroker()
+    if backend in ("redis", "postgres"):
+        # publish() is a blocking network call, made by the shared handlers
+        # on the event loop thread in async mode (see cache.create_cache).
+        if DB_ASYNC:
+            raise RuntimeError(
+                f"DB_ASYNC=true cannot be combined with PUBSUB_BACKEND={backend}: publishing "
+                "blocks the event loop. Use PUBSUB_BACKEND=memory with the async path."
+            )
+        return RedisBroker() if backend == "redis" else PostgresBroker()
+    raise ValueError(f"Unknown PUBSUB_BACKEND: {backend!r}")
+
+
+# The broker the writers publish to.
+broker = create_broker()
+
+
+# ==================================
+#        Fan-out to streams
+# ==================================
+
+class _Watcher:
+    """The streams of one event and the task that feeds them."""
+
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+def _offer(queue: asyncio.Queue, snapshot) -> None:
+    # A slow client only needs the newest snapshot, so an unread one is replaced.
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(snapshot)
+
+
+class AvailabilityHub:
+    """
+    Fans availability snapshots out to the streams of each event (see top).
+
+    Snapshots are {"version": int, "time_slots": [...]} dicts from the
+    loader, or None once the event no longer exists. Tasks start with the
+    first subscription and run on the loop that serves the streams.
+
+    Args:
+        broker: Where changed event IDs are received from
+        loader: Blocking function returning the snapshot of an event ID
+    """
+
+    def __init__(self, broker: Broker, loader: Callable[[int], Optional[dict]]):
+        self.broker = broker
+        self.loader = loader
+        self._watchers: Dict[int, _Watcher] = {}
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def subscribe(self, event_id: int) -> asyncio.Queue:
+        """Register a stream of an event; returns the queue its snapshots arrive on."""
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        watcher = self._watchers.get(event_id)
+        if watcher is None:
+            watcher = self._watchers[event_id] = _Watcher()
+            watcher.task = asyncio.create_task(self._watch(event_id, watcher))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        watcher.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, event_id: int, queue: asyncio.Queue) -> None:
+        """Remove a stream; the event's watcher stops with its last stream."""
+        watcher = self._watchers.get(event_id)
+        if watcher is None:
+            return
+        watcher.subscribers.discard(queue)
+        if not watcher.subscribers:
+            del self._watchers[event_id]
+            watcher.task.cancel()
+
+    def subscriber_count(self, event_id: int) -> int:
+        watcher = self._watchers.get(event_id)
+        return len(watcher.subscribers) if watcher else 0
+
+    async def stop(self) -> None:
+        """Cancel every task (app shutdown)."""
+        tasks = [watcher.task for watcher in self._watchers.values()]
+        if self._dispatcher is not None:
+            tasks.append(self._dispatcher)
+        self._watchers.clear()
+        self._dispatcher = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _dispatch(self) -> None:
+        while True:
+            try:
+                async for event_id in self.broker.listen():
+                    watcher = self._watchers.get(event_id)
+                    if watcher is not None:
+                        watcher.changed.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Availability broker failed; listening again")
+                await asyncio.sleep(PUBSUB_RECONNECT_SECONDS)
+
+    async def _watch(self, event_id: int, watcher: _Watcher) -> None:
+        while True:
+            await watcher.changed.wait()
+            # Changes that arrive while loading are covered by the next load.
+            watcher.changed.clear()
+            try:
+                snapshot = await run_in_threadpool(self.loader, event_id)
+            except Exception:
+                logger.exception("Could not load the availability of event %d", event_id)
+                continue
+            for queue in list(watcher.subscribers):
+                _offer(queue, snapshot)
+            if snapshot is None:
+                return
+
+    async def stream(self, event_id: int, queue: asyncio.Queue, first: dict) -> AsyncIterator[bytes]:
+        """
+        Server-sent events for one client, starting with the snapshot it was opened with.
+
+        Each message is an 'availability' event whose id is the event version
+        and whose data is the list of SlotAvailability. A snapshot older than
+        the last one sent is skipped. A 'deleted' event ends the stream when
+        the event is removed. The stream also ends after SSE_MAX_SECONDS.
+        Unsubscribes when it ends or the client disconnects.
+        """
+        def message(snapshot):
+            return (
+                f"id: {snapshot['version']}\nevent: availability\ndata: ".encode()
+                + serialization.dumps(snapshot["time_slots"])
+                + b"\n\n"
+            )
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SSE_MAX_SECONDS
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n".encode() + message(first)
+            version = first["version"]
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), timeout=min(SSE_HEARTBEAT_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if snapshot is None:
+                    yield b"event: deleted\ndata: {}\n\n"
+                    return
+                if snapshot["version"] <= version:
+                    continue
+                version = snapshot["version"]
+                yield message(snapshot)
+        finally:
+            self.unsubscribe(event_id, queue)
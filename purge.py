@@ -0,0 +1,162 @@
+"""
+Deletes expired events: events whose every slot, and every occurrence of
+their recurrence rule, started before a cutoff. Also deletes expired
+idempotency keys (see idempotency.py).
+
+Events are deleted a batch at a time, each batch in its own short
+transaction, so a large purge never holds its locks for long. The ON DELETE
+CASCADE foreign keys remove the slots, bookings and waitlist entries of each
+event in the database.
+
+This runs in its own process, so it can only reach the running servers'
+caches and live availability streams through shared backends: set
+CACHE_BACKEND=redis and PUBSUB_BACKEND=redis or postgres, as the servers do.
+With the default memory backends, the servers keep serving purged events
+from their caches for up to CACHE_TTL_SECONDS, and open streams of those
+events are not ended; a warning is logged.
+
+    python purge.py                          # events that ended before now
+    python purge.py --before 2024-01-01 --batch-size 200 --pause 0.5
+"""
+import argparse
+import datetime
+import logging
+import time
+from typing import Callable, List
+
+from sqlalchemy import delete, exists, or_, select
+from sqlalchemy.orm import Session
+
+import cache
+import idempotency
+import models
+import pubsub
+
+logger = logging.getLogger(__name__)
+
+# Events deleted per transaction
+PURGE_BATCH_SIZE = 100
+
+
+def _expired(cutoff: datetime.datetime):
+    """Conditions an event matches when nothing of it starts at or after cutoff."""
+    slots = exists().where(models.TimeSlot.event_id == models.Event.id)
+    rule = exists().where(models.RecurrenceRule.event_id == models.Event.id)
+    upcoming_slot = exists().where(
+        models.TimeSlot.event_id == models.Event.id,
+        models.TimeSlot.start_time >= cutoff,
+    )
+    # A rule without an end date can always produce another occurrence.
+    open_rule = exists().where(
+        models.RecurrenceRule.event_id == models.Event.id,
+        or_(models.RecurrenceRule.until.is_(None), models.RecurrenceRule.until >= cutoff),
+    )
+    # Events without any slot or rule have never been scheduled; keep them.
+    return [or_(slots, rule), ~upcoming_slot, ~open_rule]
+
+
+def purge_expired_events(
+    session_factory: Callable[[], Session],
+    before: datetime.datetime,
+    batch_size: int = PURGE_BATCH_SIZE,
+    pause: float = 0.0,
+) -> int:
+    """
+    Delete every expired event, batch_size events per transaction.
+
+    The conditions are checked again by each DELETE, so an event that gets a
+    new slot after its batch was selected is kept.
+
+    Args:
+        session_factory: Callable returning a new database session
+        before: Events with nothing starting at or after this time are deleted
+        batch_size: Events deleted per transaction
+        pause: Seconds to wait between batches, to leave room for other writers
+
+    Returns:
+        int: Number of events deleted
+    """
+    conditions = _expired(before)
+    last_id = 0
+    purged = 0
+    while True:
+        db = session_factory()
+        try:
+            ids = db.scalars(
+                select(models.Event.id)
+                .where(models.Event.id > last_id, *conditions)
+                .order_by(models.Event.id)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                return purged
+            deleted: List[int] = db.scalars(
+                delete(models.Event).where(models.Event.id.in_(ids), *conditions).returning(models.Event.id)
+            ).all()
+            db.commit()
+        finally:
+            db.close()
+
+        last_id = ids[-1]
+        purged += len(deleted)
+        for event_id in deleted:
+            cache.invalidate_event(event_id)
+            pubsub.broker.publish(event_id)
+        if deleted:
+            cache.invalidate_event_list()
+        logger.info("Purged %d expired events (%d so far)", len(deleted), purged)
+        if pause:
+            time.sleep(pause)
+
+
+def check_shared_backends() -> List[str]:
+    """
+    Warn about backends this process does not share with the servers (see top).
+
+    Returns:
+        List[str]: The warnings that were logged
+    """
+    warnings = []
+    if cache.CACHE_BACKEND == "memory":
+        warnings.append(
+            "CACHE_BACKEND=memory: the servers' caches are not invalidated and may serve "
+            f"purged events for up to {cache.CACHE_TTL_SECONDS:g} seconds; use CACHE_BACKEND=redis"
+        )
+    if pubsub.PUBSUB_BACKEND == "memory":
+        warnings.append(
+            "PUBSUB_BACKEND=memory: live availability streams of purged events are not "
+            "notified; use PUBSUB_BACKEND=redis or postgres"
+        )
+    for warning in warnings:
+        logger.warning(warning)
+    return warnings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--before",
+        type=datetime.datetime.fromisoformat,
+        default=None,
+        help="Cutoff as an ISO 8601 UTC datetime (default: now)",
+    )
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE, help="Events deleted per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between batches")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    check_shared_backends()
+    before = args.before or datetime.datetime.utcnow()
+    purged = purge_expired_events(SessionLocal, before, batch_size=args.batch_size, pause=args.pause)
+    print(f"Purged {purged} events that ended before {before.isoformat()}")
+    db = SessionLocal()
+    try:
+        print(f"Purged {idempotency.purge_expired_keys(db)} expired idempotency keys")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+import asyncio
+import collections
+import math
+import os
+import threading
+import time
+from typing import AsyncIterator, Deque, Dict, Iterable, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, status
+
+from database import DB_POOL_SIZE
+
+# Load shedding for the booking endpoint.
+#
+# When a popular event opens, booking requests arrive far faster than the
+# database can admit them. Without a limit, every request takes a threadpool
+# worker and then queues for a pooled connection, and latency grows until
+# clients time out and retry. Two checks now run on the event loop, before
+# the request takes a worker:
+#
+# 1. A token bucket per client IP and per user email. Each bucket holds up to
+#    RATE_LIMIT_BURST tokens and refills at RATE_LIMIT_PER_SECOND. A request
+#    that finds a bucket empty gets 429 with the seconds until the next token
+#    in Retry-After. Buckets are per worker process by default; the Redis
+#    backend shares them between workers.
+#    Behind a reverse proxy (Render, nginx), request.client is the proxy, so
+#    every client would share one IP bucket. Start uvicorn with
+#    --proxy-headers and --forwarded-allow-ips set to the proxy's address
+#    ('*' where only the proxy can reach the app, as on Render; see
+#    render.yaml) so the client IP is taken from X-Forwarded-For.
+# 2. A concurrency gate. At most BOOKING_GATE_MAX_CONCURRENCY bookings run at
+#    once (by default the pool size, so other endpoints keep connections).
+#    Up to BOOKING_GATE_MAX_WAITING more wait for a turn, each for at most
+#    BOOKING_GATE_TIMEOUT_SECONDS. Any further request, or one that waited too
+#    long, gets 503 with Retry-After.
+#
+# Both report to GET /metrics (see render_metrics).
+
+load_dotenv()
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory, redis or none
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "redis://localhost:6379/0")
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "2"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+# Buckets kept by the memory backend; the least recently used is dropped first
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# 0 disables the gate
+BOOKING_GATE_MAX_CONCURRENCY = int(os.getenv("BOOKING_GATE_MAX_CONCURRENCY", str(DB_POOL_SIZE)))
+BOOKING_GATE_MAX_WAITING = int(os.getenv("BOOKING_GATE_MAX_WAITING", "50"))
+BOOKING_GATE_TIMEOUT_SECONDS = float(os.getenv("BOOKING_GATE_TIMEOUT_SECONDS", "2"))
+# Retry-After sent with a 503 from the gate
+BOOKING_GATE_RETRY_AFTER_SECONDS = int(os.getenv("BOOKING_GATE_RETRY_AFTER_SECONDS", "1"))
+
+
+class RateLimiter:
+    """
+    Interface every rate limiter backend implements.
+    """
+
+    async def acquire(self, keys: Iterable[str]) -> float:
+        """
+        Take one token from the bucket of every key.
+
+        Returns:
+            float: 0 if the request may proceed, otherwise the seconds until
+                every bucket has a token again (nothing is taken then)
+        """
+        raise NotImplementedError
+
+
+class NullRateLimiter(RateLimiter):
+    """Lets every request through (RATE_LIMIT_BACKEND=none)."""
+
+    async def acquire(self, keys):
+        return 0.0
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    Token buckets in this worker process.
+
+    Args:
+        rate: Tokens added per second
+        burst: Bucket size
+        max_keys: Buckets kept before the least recently used is dropped
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: int = RATE_LIMIT_BURST,
+        max_keys: int = RATE_LIMIT_MAX_KEYS,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (tokens, time of the last refill)
+        self._buckets: "collections.OrderedDict[str, Tuple[float, float]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    async def acquire(self, keys):
+        keys = list(keys)
+        now = time.monotonic()
+        with self._lock:
+            levels = {key: self._tokens(key, now) for key in keys}
+            short = max((1 - tokens for tokens in levels.values()), default=0)
+            if short > 0:
+                return short / self.rate if self.rate > 0 else float("inf")
+            for key, tokens in levels.items():
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0.0
+
+
+# Refills and takes from every bucket in KEYS atomically; returns 0 or the
+# wait in milliseconds. Buckets are hashes that expire once they are full again.
+_REDIS_TOKEN_BUCKET = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local levels, wait = {}, 0
+for i, key in ipairs(KEYS) do
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or burst
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + (now - updated) / 1000 * rate)
+    levels[i] = tokens
+    if tokens < 1 then wait = math.max(wait, math.ceil((1 - tokens) / rate * 1000)) end
+end
+if wait > 0 then return wait end
+local ttl = math.ceil(burst / rate * 1000)
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'updated', now)
+    redis.call('PEXPIRE', key, ttl)
+end
+return 0
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Token buckets in Redis, shared by every worker connected to it.
+
+    Requires the 'redis' package. Uses its asyncio client, so it is safe on
+    the event loop with or without DB_ASYNC.
+    """
+
+    def __init__(
+        self,
+        url: str = RATE_LIMIT_URL,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: int = RATE_LIMIT_BURST,
+        namespace: str = "bookmyslot:ratelimit:",
+    ):
+        try:
+            import redis.asyncio
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.rate = rate
+        self.burst = burst
+        self.namespace = namespace
+        self._redis = redis.asyncio.Redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def acquire(self, keys):
+        wait_ms = await self._script(
+            keys=[self.namespace + key for key in keys],
+            args=[self.rate, self.burst, int(time.time() * 1000)],
+        )
+        return int(wait_ms) / 1000
+
+
+def create_rate_limiter(backend: str = RATE_LIMIT_BACKEND) -> RateLimiter:
+    """
+    Create the rate limiter selected by RATE_LIMIT_BACKEND.
+
+    Args:
+        backend: 'memory' (default), 'redis' or 'none'
+    """
+    if backend == "memory":
+        return MemoryRateLimiter()
+    if backend == "redis":
+        return RedisRateLimiter()
+    if backend == "none":
+        return NullRateLimiter()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend!r}")
+
+
+class ConcurrencyGate:
+    """
+    Bounded concurrency with a bounded, time-limited wait (see top).
+
+    The counters are guarded by a thread lock and waiters are futures of
+    their own event loop, so one gate can serve requests on any loop.
+
+    Args:
+        max_concurrency: Requests let through at once; 0 lets every request through
+        max_waiting: Requests that may wait for a turn
+        timeout: Seconds a request may wait
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = BOOKING_GATE_MAX_CONCURRENCY,
+        max_waiting: int = BOOKING_GATE_MAX_WAITING,
+        timeout: float = BOOKING_GATE_TIMEOUT_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        # Waiters given a turn by release() that have not woken up yet
+        self._granted: Set[asyncio.Future] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Wait for a turn; False if the gate is full or the wait timed out."""
+        if self.max_concurrency <= 0:
+            return True
+        with self._lock:
+            if self.in_flight < self.max_concurrency and not self._waiters:
+                self.in_flight += 1
+                return True
+            if len(self._waiters) >= self.max_waiting:
+                return False
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+        try:
+            # release() hands its turn over without changing the count.
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.timeout)
+            with self._lock:
+                self._granted.discard(waiter)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            with self._lock:
+                handed_over = waiter in self._granted
+                if handed_over:
+                    self._granted.discard(waiter)
+                else:
+                    self._waiters.remove(waiter)
+                    waiter.cancel()
+            if handed_over:
+                # The turn arrived just as the wait ended; pass it on.
+                self.release()
+            if isinstance(error, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self) -> None:
+        """End a turn taken with acquire(), handing it to the oldest waiter."""
+        if self.max_concurrency <= 0:
+            return
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                self._granted.add(waiter)
+                waiter.get_loop().call_soon_threadsafe(_hand_over, waiter)
+                return
+            self.in_flight -= 1
+
+
+def _hand_over(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _Counters:
+    def __init__(self):
+        self.rejected: Dict[str, int] = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    def reject(self, reason: str) -> None:
+        with self._lock:
+            self.rejected[reason] += 1
+
+
+# The limiter and gate used by the booking routes.
+limiter = create_rate_limiter()
+booking_gate = ConcurrencyGate()
+counters = _Counters()
+
+
+def _client_keys(request: Request, body) -> list:
+    keys = [f"ip:{request.client.host if request.client else 'unknown'}"]
+    email = body.get("user_email") if isinstance(body, dict) else None
+    if isinstance(email, str):
+        keys.append(f"email:{email.strip().lower()}")
+    return keys
+
+
+async def booking_admission_control(request: Request) -> AsyncIterator[None]:
+    """
+    FastAPI dependency applying the rate limit and the gate to a booking request.
+
+    Async, so it runs on the event loop before the sync route takes a
+    threadpool worker; the turn in the gate is held until the route is done.
+
+    Raises:
+        HTTPException: 429 when a bucket is empty, 503 when the gate is full
+    """
+    # FastAPI already read the body for the route; Starlette caches it.
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    wait = await limiter.acquire(_client_keys(request, body))
+    if wait > 0:
+        counters.reject("rate_limited")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many booking requests. Try again later.",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+    if not await booking_gate.acquire():
+        counters.reject("overloaded")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Bookings are busy right now. Try again shortly.",
+            headers={"Retry-After": str(BOOKING_GATE_RETRY_AFTER_SECONDS)},
+        )
+    try:
+        yield
+    finally:
+        booking_gate.release()
+
+
+def render_metrics(gate: Optional[ConcurrencyGate] = None) -> str:
+    """The gate and rejection metrics in the Prometheus text format."""
+    gate = gate or booking_gate
+    with counters._lock:
+        rejected = dict(counters.rejected)
+    lines = [
+        "# HELP booking_gate_in_flight Booking requests being served.",
+        "# TYPE booking_gate_in_flight gauge",
+        f"booking_gate_in_flight {gate.in_flight}",
+        "# HELP booking_gate_waiting Booking requests waiting for a turn.",
+        "# TYPE booking_gate_waiting gauge",
+        f"booking_gate_waiting {gate.waiting}",
+        "# HELP booking_requests_rejected_total Booking requests turned away before admission.",
+        "# TYPE booking_requests_rejected_total counter",
+    ]
+    for reason in ("rate_limited", "overloaded"):
+        lines.append(f'booking_requests_rejected_total{{reason="{reason}"}} {rejected.get(reason, 0)}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,234 @@
+import datetime
+from typing import Iterator, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import conditional
+import models
+
+# Recurring schedules.
+#
+# An event can carry a recurrence rule (frequency, interval, weekdays,
+# until/count and exclusions, a subset of iCalendar RRULE) instead of an
+# explicit list of slots. Occurrences are computed on demand for the window a
+# client asks for, and a TimeSlot row is only created ("materialized") the
+# first time somebody books an occurrence. An always-open schedule therefore
+# costs one rule row instead of one row per slot.
+
+# Largest window (and number of occurrences) expanded in one request.
+MAX_WINDOW = datetime.timedelta(days=366)
+MAX_OCCURRENCES = 1000
+
+
+def _first_index_at_or_after(origin: datetime.datetime, moment: datetime.datetime, step: datetime.timedelta) -> int:
+    """Smallest k >= 0 such that origin + k * step >= moment."""
+    if moment <= origin:
+        return 0
+    return -(-(moment - origin) // step)
+
+
+def occurrences(
+    rule: models.RecurrenceRule,
+    window_start: datetime.datetime,
+    window_end: datetime.datetime,
+) -> Iterator[datetime.datetime]:
+    """
+    Yield the occurrences of a rule that start in [window_start, window_end).
+
+    The expansion jumps straight to the window instead of iterating from the
+    rule's start, so its cost depends only on the size of the window. 'count'
+    counts occurrences before exclusions are removed, as in RFC 5545.
+
+    Args:
+        rule: The recurrence rule
+        window_start: Start of the window (inclusive)
+        window_end: End of the window (exclusive)
+    """
+    excluded = set(rule.exclusion_datetimes)
+    if rule.until is not None:
+        window_end = min(window_end, rule.until + datetime.timedelta(microseconds=1))
+    window_start = max(window_start, rule.starts_at)
+
+    if rule.frequency == "daily":
+        step = datetime.timedelta(days=rule.interval)
+        index = _first_index_at_or_after(rule.starts_at, window_start, step)
+        while True:
+            moment = rule.starts_at + index * step
+            if moment >= window_end or (rule.count is not None and index >= rule.count):
+                return
+            if moment not in excluded:
+                yield moment
+            index += 1
+
+    # Weekly: each period is a week (Monday based) containing one occurrence per weekday.
+    weekdays = sorted(set(rule.weekdays or [rule.starts_at.weekday()]))
+    step = datetime.timedelta(weeks=rule.interval)
+    first_monday = datetime.datetime.combine(
+        rule.starts_at.date() - datetime.timedelta(days=rule.starts_at.weekday()),
+        rule.starts_at.time(),
+    )
+    # Occurrences in the first period that fall before starts_at do not exist.
+    skipped_in_first_period = sum(
+        1 for day in weekdays if first_monday + datetime.timedelta(days=day) < rule.starts_at
+    )
+    period = max(_first_index_at_or_after(first_monday, window_start, step) - 1, 0)
+    while True:
+        monday = first_monday + period * step
+        if monday >= window_end:
+            return
+        for position, day in enumerate(weekdays):
+            moment = monday + datetime.timedelta(days=day)
+            if moment < rule.starts_at or moment < window_start:
+                continue
+            index = period * len(weekdays) + position - skipped_in_first_period
+            if moment >= window_end or (rule.count is not None and index >= rule.count):
+                return
+            if moment not in excluded:
+                yield moment
+        period += 1
+
+
+def nth_occurrence(rule: models.RecurrenceRule, index: int) -> datetime.datetime:
+    """
+    Start of the occurrence at a 0-based index, ignoring until.
+
+    Excluded occurrences keep their index, as for 'count'. For a weekly rule
+    whose weekdays do not include the weekday of starts_at, occurrence 0 is
+    the first listed weekday after starts_at.
+    """
+    if rule.frequency == "daily":
+        return rule.starts_at + index * datetime.timedelta(days=rule.interval)
+    weekdays = sorted(set(rule.weekdays or [rule.starts_at.weekday()]))
+    first_monday = datetime.datetime.combine(
+        rule.starts_at.date() - datetime.timedelta(days=rule.starts_at.weekday()),
+        rule.starts_at.time(),
+    )
+    # Same numbering as occurrences() above.
+    skipped_in_first_period = sum(
+        1 for day in weekdays if first_monday + datetime.timedelta(days=day) < rule.starts_at
+    )
+    period, position = divmod(index + skipped_in_first_period, len(weekdays))
+    return first_monday + period * datetime.timedelta(weeks=rule.interval) + datetime.timedelta(days=weekdays[position])
+
+
+def is_occurrence(rule: models.RecurrenceRule, moment: datetime.datetime) -> bool:
+    """Whether a rule has an occurrence starting exactly at moment."""
+    return next(occurrences(rule, moment, moment + datetime.timedelta(microseconds=1)), None) == moment
+
+
+def has_matching_occurrence(
+    rule: models.RecurrenceRule,
+    window_start: Optional[datetime.datetime] = None,
+    window_end: Optional[datetime.datetime] = None,
+    full: frozenset = frozenset(),
+) -> bool:
+    """
+    Whether a rule has an occurrence in a window that is not fully booked.
+
+    An open-ended window is searched for at most MAX_OCCURRENCES occurrences
+    (or MAX_WINDOW without an end), the same bound a client listing the
+    occurrences would hit.
+
+    Args:
+        rule: The recurrence rule
+        window_start: Start of the window (inclusive), None for the rule's start
+        window_end: End of the window (exclusive), None for MAX_WINDOW later
+        full: Start times of materialized occurrences that are fully booked
+    """
+    window_start = max(window_start or rule.starts_at, rule.starts_at)
+    if window_end is None:
+        window_end = window_start + MAX_WINDOW
+    for seen, moment in enumerate(occurrences(rule, window_start, window_end)):
+        if seen >= MAX_OCCURRENCES:
+            return False
+        if moment not in full:
+            return True
+    return False
+
+
+def check_window(window_start: datetime.datetime, window_end: datetime.datetime) -> None:
+    """
+    Validate a requested occurrence window.
+
+    Raises:
+        HTTPException: 400 if the window is empty or larger than MAX_WINDOW
+    """
+    if window_end <= window_start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must be after 'from'")
+    if window_end - window_start > MAX_WINDOW:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The window can span at most {MAX_WINDOW.days} days"
+        )
+
+
+def expand_window(
+    rule: models.RecurrenceRule,
+    window_start: datetime.datetime,
+    window_end: datetime.datetime,
+) -> List[datetime.datetime]:
+    """
+    Occurrences of a rule in a window, at most MAX_OCCURRENCES of them.
+
+    Raises:
+        HTTPException: 400 if the window is invalid (see check_window)
+    """
+    check_window(window_start, window_end)
+    result = []
+    for moment in occurrences(rule, window_start, window_end):
+        if len(result) >= MAX_OCCURRENCES:
+            break
+        result.append(moment)
+    return result
+
+
+def materialize_occurrence(db: Session, event_id: int, start_time: datetime.datetime) -> int:
+    """
+    Get or create the TimeSlot row for one occurrence of an event's rule.
+
+    Concurrent first bookings of the same occurrence are safe: the unique
+    constraint on (recurrence_rule_id, start_time) lets only one insert win,
+    and the others pick up the winner's row.
+
+    Args:
+        db: Database session
+        event_id: The ID of the event
+        start_time: Start of the occurrence to book
+
+    Returns:
+        int: The ID of the time slot
+
+    Raises:
+        HTTPException: 404 if the event has no rule or the rule has no such occurrence
+    """
+    rule = db.scalar(select(models.RecurrenceRule).where(models.RecurrenceRule.event_id == event_id))
+    if rule is None or not is_occurrence(rule, start_time):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event with ID {event_id} has no occurrence starting at {start_time.isoformat()}"
+        )
+
+    def existing_slot_id() -> Optional[int]:
+        return db.scalar(
+            select(models.TimeSlot.id).where(
+                models.TimeSlot.recurrence_rule_id == rule.id,
+                models.TimeSlot.start_time == start_time,
+            )
+        )
+
+    slot_id = existing_slot_id()
+    if slot_id is not None:
+        return slot_id
+    try:
+        slot = models.TimeSlot(event_id=event_id, recurrence_rule_id=rule.id, start_time=start_time)
+        db.add(slot)
+        db.flush()
+        slot_id = slot.id
+        conditional.bump_event_version(db, event_id)
+        db.commit()
+        return slot_id
+    except IntegrityError:
+        db.rollback()
+        return existing_slot_id()
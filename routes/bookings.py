@@ -1,8 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from typing import List, Literal, Optional, Tuple, Union
+import base64
+import datetime
+from database import get_db, get_read_db, SessionLocal
+from admission import admit_booking, admit_booking_batch, cancel_and_promote, join_waitlist, leave_waitlist
+import cache
+import conditional
+import ics
+import idempotency
+import pubsub
+import ratelimit
+import recurrence
+import serialization
 import models, schemas
+from routes.events import MAX_PAGE_SIZE
 
 # Create a new router object for bookings.
 router = APIRouter(
@@ -10,120 +24,319 @@ router = APIRouter(
     tags=["bookings"],
 )
 
-@router.post("/events/{event_id}/bookings", response_model=schemas.Booking, status_code=status.HTTP_201_CREATED)
-def create_booking(event_id: int, booking: schemas.BookingCreate, db: Session = Depends(get_db)):
+@router.post(
+    "/events/{event_id}/bookings",
+    response_model=schemas.Booking,
+    status_code=status.HTTP_201_CREATED,
+    # Rate limit and concurrency gate, checked before a worker is taken
+    dependencies=[Depends(ratelimit.booking_admission_control)],
+)
+def create_booking(
+    event_id: int,
+    booking: schemas.BookingCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None),
+):
     """
     Book a time slot for a specific event.
     
-    This endpoint handles the booking logic with several validations:
-    1. Checks if the event exists
-    2. Checks if the time slot exists and belongs to the event
-    3. Prevents double booking by the same user for the same slot
-    4. Prevents overbooking (respects max_bookings_per_slot limit)
+    The slot is given either by time_slot_id, or by the start_time of an
+    occurrence of the event's recurrence rule, whose slot row is created on
+    its first booking (see recurrence.py).
+    
+    Admission happens in a single transaction (see admission.py):
+    1. A seat is claimed with a conditional increment of the slot's booked_count,
+       which also checks that the slot exists, belongs to the event and
+       respects the max_bookings_per_slot limit
+    2. The booking is inserted; a unique constraint on (time_slot_id, user_email)
+       prevents double booking by the same user for the same slot
+    
+    With an Idempotency-Key header, a retry of a successful request gets the
+    original 201 response back without running admission again (see
+    idempotency.py).
+    
+    Requests over a client's rate limit get 429, and requests beyond what
+    the booking gate admits get 503 (see ratelimit.py).
     
     Args:
         event_id: The ID of the event to book
         booking: The booking data (user name, email, time slot ID)
         db: Database session (automatically provided by FastAPI)
+        idempotency_key: Optional client-chosen key identifying this request
     
     Returns:
         Booking: The created booking with confirmation details
         
     Raises:
-        HTTPException: If validation fails or booking is not allowed
+        HTTPException: If validation fails or booking is not allowed, 422 if
+            the idempotency key was used for a different request
     """
-    # First, check if the event exists
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Event with ID {event_id} not found"
+    request_hash = None
+    if idempotency_key is not None:
+        idempotency.check_key(idempotency_key)
+        request_hash = idempotency.fingerprint(
+            "POST", f"/bookings/events/{event_id}/bookings", booking.model_dump_json().encode()
         )
+        replayed = idempotency.replay(db, idempotency_key, request_hash)
+        if replayed is not None:
+            return replayed
+
+    try:
+        if booking.time_slot_id is None:
+            slot_id = recurrence.materialize_occurrence(db, event_id, booking.start_time)
+            booking = booking.model_copy(update={"time_slot_id": slot_id})
+        db_booking = admit_booking(db, event_id, booking, idempotency_key, request_hash)
+    except HTTPException as error:
+        # A concurrent attempt with the same key may have won the race (this
+        # one then sees the duplicate booking); answer like a retry would.
+        if idempotency_key is None or error.status_code != status.HTTP_409_CONFLICT:
+            raise
+        replayed = idempotency.replay(db, idempotency_key, request_hash)
+        if replayed is None:
+            raise
+        return replayed
+    # The event's cached detail and availability now show a stale count.
+    cache.invalidate_event(event_id)
+    # Push the new counts to the event's live availability streams.
+    pubsub.broker.publish(event_id)
+    return db_booking
+
+@router.post(
+    "/events/{event_id}/bookings/batch",
+    response_model=List[schemas.Booking],
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(ratelimit.booking_admission_control)],
+)
+def create_booking_batch(event_id: int, batch: schemas.BatchBookingCreate, db: Session = Depends(get_db)):
+    """
+    Book several time slots of an event for one user, all or nothing.
     
-    # Check if the time slot exists and belongs to this event
-    time_slot = db.query(models.TimeSlot).filter(
-        models.TimeSlot.id == booking.time_slot_id,
-        models.TimeSlot.event_id == event_id
-    ).first()
+    Capacity and earlier bookings are checked for all slots at once, and
+    the bookings are inserted together in one transaction (see
+    admission.admit_booking_batch). If any slot cannot be booked, none is,
+    and the 409 response lists the blocking slots with the reason for each
+    ('not_found', 'full' or 'already_booked').
     
-    if not time_slot:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Time slot with ID {booking.time_slot_id} not found for this event"
-        )
+    Args:
+        event_id: The ID of the event to book
+        batch: The user and the IDs of the slots to book (at most 100)
+        db: Database session (automatically provided by FastAPI)
     
-    # Check for double booking by the same user for the same slot
-    existing_booking = db.query(models.Booking).filter(
-        models.Booking.time_slot_id == booking.time_slot_id,
-        models.Booking.user_email == booking.user_email
-    ).first()
+    Returns:
+        List[Booking]: The created bookings, in the order the slots were given
     
-    if existing_booking:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="You have already booked this time slot"
-        )
+    Raises:
+        HTTPException: 404 if the event does not exist, 409 if any slot is blocked
+    """
+    created = admit_booking_batch(db, event_id, batch)
+    cache.invalidate_event(event_id)
+    pubsub.broker.publish(event_id)
+    return created
+
+@router.delete("/{booking_id}", response_model=schemas.CancellationResult)
+def cancel_booking(booking_id: int, db: Session = Depends(get_db)):
+    """
+    Cancel a booking and free its seat.
     
-    # Check for overbooking (count existing bookings for this slot)
-    current_bookings_count = db.query(models.Booking).filter(
-        models.Booking.time_slot_id == booking.time_slot_id
-    ).count()
+    If people are waiting for the slot, the seat goes straight to the first
+    of them in the same transaction (see admission.cancel_and_promote), so it is
+    never up for grabs by other booking requests. A cancellation email is
+    queued for the cancelled booking and a confirmation for the promoted one.
     
-    if current_bookings_count >= event.max_bookings_per_slot:
+    Args:
+        booking_id: The ID of the booking to cancel
+        db: Database session (automatically provided by FastAPI)
+    
+    Returns:
+        CancellationResult: The cancelled booking ID and the promoted booking, if any
+        
+    Raises:
+        HTTPException: If the booking is not found
+    """
+    event_id, result = cancel_and_promote(db, booking_id)
+    cache.invalidate_event(event_id)
+    pubsub.broker.publish(event_id)
+    return result
+
+@router.post("/events/{event_id}/waitlist", response_model=schemas.WaitlistEntry, status_code=status.HTTP_201_CREATED)
+def join_slot_waitlist(event_id: int, booking: schemas.BookingCreate, db: Session = Depends(get_db)):
+    """
+    Join the waitlist of a fully booked time slot.
+    
+    When a booking of the slot is cancelled, the first person on the
+    waitlist gets the seat automatically and is emailed a confirmation.
+    
+    Args:
+        event_id: The ID of the event
+        booking: The user name, email and time_slot_id to wait for
+        db: Database session (automatically provided by FastAPI)
+    
+    Returns:
+        WaitlistEntry: The entry and its position in the queue
+        
+    Raises:
+        HTTPException: If the slot is not full, or the user already booked
+            it or waits for it
+    """
+    if booking.time_slot_id is None:
+        # Unbooked recurrence occurrences have no slot row and are never full.
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"This time slot is already fully booked (max {event.max_bookings_per_slot} bookings allowed)"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide the time_slot_id of a fully booked slot"
         )
+    return join_waitlist(db, event_id, booking)
+
+@router.delete("/waitlist/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
+def leave_slot_waitlist(entry_id: int, db: Session = Depends(get_db)):
+    """
+    Leave the waitlist of a time slot.
     
+    Args:
+        entry_id: The ID of the waitlist entry
+        db: Database session (automatically provided by FastAPI)
+        
+    Raises:
+        HTTPException: If the entry is not found
+    """
+    leave_waitlist(db, entry_id)
+
+def _encode_cursor(created_at: datetime.datetime, booking_id: int) -> str:
+    """Opaque cursor for the booking that ends a page."""
+    raw = f"{created_at.isoformat()}|{booking_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """
+    Decode a cursor made by _encode_cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
     try:
-        # Create the booking
-        db_booking = models.Booking(
-            time_slot_id=booking.time_slot_id,
-            user_name=booking.user_name,
-            user_email=booking.user_email
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, booking_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(created_at), int(booking_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
         )
-        
-        db.add(db_booking)
-        db.commit()
-        db.refresh(db_booking)
-        
-        return db_booking
-        
-    except Exception as e:
-        db.rollback()
+
+def _check_email(email: str) -> None:
+    # Basic email validation (Pydantic EmailStr would be better, but this is simpler)
+    if "@" not in email or "." not in email:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to create booking: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid email format"
         )
 
-@router.get("/users/{email}/bookings", response_model=List[schemas.Booking])
-def get_user_bookings(email: str, db: Session = Depends(get_db)):
+@router.get("/users/{email}/bookings.ics", response_class=StreamingResponse)
+def get_user_calendar(
+    email: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """
-    Get all bookings made by a specific user (identified by email).
+    Get the bookings of a user as an iCalendar feed, for calendar subscriptions.
     
-    This endpoint returns all bookings for a user across all events,
-    which is useful for users to see their booking history.
+    Each booking is a VEVENT at its slot's start time, titled with its event
+    (see ics.py). The feed is streamed as it is rendered. Its ETag comes
+    from one aggregate over the user's bookings, so a client polling with
+    If-None-Match gets a 304 without any booking being read.
     
     Args:
         email: The email address of the user
+        if_none_match: ETag of the feed the client already has
         db: Database session (automatically provided by FastAPI)
     
     Returns:
-        List[Booking]: All bookings made by the user
+        StreamingResponse: A text/calendar feed (or 304 Not Modified)
         
     Raises:
         HTTPException: If the email format is invalid
     """
-    # Basic email validation (Pydantic EmailStr would be better, but this is simpler)
-    if "@" not in email or "." not in email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid email format"
-        )
+    _check_email(email)
+    etag = conditional.user_bookings_etag(db, email)
+    if conditional.etag_matches(if_none_match, etag):
+        return conditional.not_modified(etag)
+    return conditional.tagged_stream(ics.stream_user_calendar(SessionLocal, email), etag, ics.MEDIA_TYPE)
+
+@router.get("/users/{email}/bookings", response_model=Union[schemas.BookingDetailPage, schemas.BookingPage])
+def get_user_bookings(
+    email: str,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    include: Optional[Literal["details"]] = Query(None, description="'details' adds each booking's event and slot start time"),
+    when: Optional[Literal["upcoming", "past"]] = Query(None, description="Only bookings for slots that start after / before now"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get a page of the bookings made by a specific user (identified by email).
     
-    # Query all bookings for this user
-    bookings = db.query(models.Booking).filter(
-        models.Booking.user_email == email
-    ).all()
+    Bookings are returned newest first and paginated with a keyset on
+    (created_at, id), which the (user_email, created_at, id) index serves
+    directly, so every page costs the same. With include=details each
+    booking carries its event ID, event title and slot start time, joined in
+    the same query, so the client does not have to fetch every event. The
+    upcoming/past filter compares the slot start time in SQL. Rows are
+    encoded by the fast JSON path (serialization.py), not through Pydantic.
+    
+    Args:
+        email: The email address of the user
+        cursor: Cursor from the previous page's next_cursor
+        limit: Maximum number of bookings to return
+        include: 'details' to join the event title and slot start time
+        when: 'upcoming' or 'past' to filter on the slot start time
+        db: Read-only database session, on a replica if one is configured (see database.get_read_db)
     
-    return bookings 
\ No newline at end of file
+    Returns:
+        BookingPage or BookingDetailPage: The bookings on this page and the
+            cursor for the next one
+        
+    Raises:
+        HTTPException: If the email format or the cursor is invalid
+    """
+    _check_email(email)
+
+    columns = [
+        models.Booking.id,
+        models.Booking.time_slot_id,
+        models.Booking.user_name,
+        models.Booking.user_email,
+        models.Booking.created_at,
+    ]
+    if include == "details":
+        columns += [
+            models.TimeSlot.event_id,
+            models.Event.title.label("event_title"),
+            models.TimeSlot.start_time,
+        ]
+    query = select(*columns).where(models.Booking.user_email == email)
+
+    if include == "details" or when is not None:
+        query = query.join(models.TimeSlot, models.TimeSlot.id == models.Booking.time_slot_id)
+    if include == "details":
+        query = query.join(models.Event, models.Event.id == models.TimeSlot.event_id)
+    if when == "upcoming":
+        query = query.where(models.TimeSlot.start_time >= datetime.datetime.utcnow())
+    elif when == "past":
+        query = query.where(models.TimeSlot.start_time < datetime.datetime.utcnow())
+    if cursor is not None:
+        query = query.where(
+            tuple_(models.Booking.created_at, models.Booking.id) < tuple_(*_decode_cursor(cursor))
+        )
+
+    # Fetch one extra row to know whether another page exists.
+    rows = db.execute(
+        query.order_by(models.Booking.created_at.desc(), models.Booking.id.desc()).limit(limit + 1)
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_cursor(last.created_at, last.id)
+
+    item = serialization.booking_detail_item if include == "details" else serialization.booking_item
+    return serialization.FastJSONResponse({
+        "items": [item(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    })
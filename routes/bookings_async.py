@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, Header, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
+from database import get_async_db
+from routes import bookings
+from routes.events import MAX_PAGE_SIZE
+import ratelimit
+import schemas
+
+# Async versions of the booking routes, used when DB_ASYNC is enabled.
+# See events_async.py for how they share the handlers of the sync routes.
+router = APIRouter(
+    prefix="/bookings",
+    tags=["bookings"],
+    include_in_schema=False,
+)
+
+@router.post(
+    "/events/{event_id}/bookings",
+    response_model=schemas.Booking,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(ratelimit.booking_admission_control)],
+)
+async def create_booking(
+    event_id: int,
+    booking: schemas.BookingCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(None),
+):
+    """
+    Book a time slot for a specific event (see bookings.create_booking).
+    """
+    return await db.run_sync(lambda session: bookings.create_booking(event_id, booking, session, idempotency_key))
+
+@router.post(
+    "/events/{event_id}/bookings/batch",
+    response_model=List[schemas.Booking],
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(ratelimit.booking_admission_control)],
+)
+async def create_booking_batch(
+    event_id: int, batch: schemas.BatchBookingCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Book several time slots of an event at once (see bookings.create_booking_batch).
+    """
+    return await db.run_sync(lambda session: bookings.create_booking_batch(event_id, batch, session))
+
+@router.delete("/{booking_id}", response_model=schemas.CancellationResult)
+async def cancel_booking(booking_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cancel a booking and free its seat (see bookings.cancel_booking).
+    """
+    return await db.run_sync(lambda session: bookings.cancel_booking(booking_id, session))
+
+@router.post("/events/{event_id}/waitlist", response_model=schemas.WaitlistEntry, status_code=status.HTTP_201_CREATED)
+async def join_slot_waitlist(event_id: int, booking: schemas.BookingCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Join the waitlist of a fully booked time slot (see bookings.join_slot_waitlist).
+    """
+    return await db.run_sync(lambda session: bookings.join_slot_waitlist(event_id, booking, session))
+
+@router.delete("/waitlist/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def leave_slot_waitlist(entry_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Leave the waitlist of a time slot (see bookings.leave_slot_waitlist).
+    """
+    await db.run_sync(lambda session: bookings.leave_slot_waitlist(entry_id, session))
+
+@router.get("/users/{email}/bookings.ics", response_class=StreamingResponse)
+async def get_user_calendar(
+    email: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get the bookings of a user as an iCalendar feed (see bookings.get_user_calendar).
+    """
+    return await db.run_sync(lambda session: bookings.get_user_calendar(email, if_none_match, session))
+
+@router.get("/users/{email}/bookings", response_model=Union[schemas.BookingDetailPage, schemas.BookingPage])
+async def get_user_bookings(
+    email: str,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    include: Optional[Literal["details"]] = Query(None, description="'details' adds each booking's event and slot start time"),
+    when: Optional[Literal["upcoming", "past"]] = Query(None, description="Only bookings for slots that start after / before now"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get a page of the bookings made by a user (see bookings.get_user_bookings).
+    """
+    return await db.run_sync(
+        lambda session: bookings.get_user_bookings(email, cursor, limit, include, when, session)
+    )
@@ -1,7 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session, selectinload
+from typing import Any, AsyncIterator, List, Literal, Optional, Tuple, Union
+import datetime
+import json
+from database import get_db, get_read_db, primary_session, SessionLocal
+import cache
+import conditional
+import export
+import ics
+import pubsub
+import recurrence
+import serialization
 import models, schemas
 
 # Create a new router object.
@@ -11,6 +24,94 @@ router = APIRouter(
     tags=["events"],   # Tag for OpenAPI documentation
 )
 
+# Upper bound for the 'limit' query parameter on list endpoints.
+MAX_PAGE_SIZE = 200
+
+# Number of events written per transaction by the bulk endpoint.
+BULK_BATCH_SIZE = 100
+
+def insert_events(db: Session, events: List[schemas.EventCreate]) -> List[schemas.EventDetail]:
+    """
+    Insert events with all their time slots and recurrence rules in bulk.
+    
+    One executemany inserts every slot of every event, batched into
+    multi-row INSERT ... RETURNING statements, so the number of statements
+    does not depend on how many slots are created. Events are inserted the
+    same way with RETURNING in parameter order; that is batched as well on
+    PostgreSQL, while SQLite falls back to one INSERT per event to keep the
+    order guaranteed. The caller commits.
+    
+    Args:
+        db: Database session
+        events: The events to create
+    
+    Returns:
+        List[EventDetail]: The created events, in the same order as the input
+    """
+    if not events:
+        return []
+
+    event_ids = db.scalars(
+        insert(models.Event).returning(models.Event.id, sort_by_parameter_order=True),
+        [
+            {
+                "title": event.title,
+                "description": event.description,
+                "max_bookings_per_slot": event.max_bookings_per_slot,
+            }
+            for event in events
+        ],
+    ).all()
+
+    slot_params = [
+        {"event_id": event_id, "start_time": slot_time}
+        for event_id, event in zip(event_ids, events)
+        for slot_time in event.time_slots
+    ]
+    slots_by_event = {event_id: [] for event_id in event_ids}
+    if slot_params:
+        slot_rows = db.execute(
+            insert(models.TimeSlot).returning(
+                models.TimeSlot.id,
+                models.TimeSlot.event_id,
+                models.TimeSlot.start_time,
+            ),
+            slot_params,
+        ).all()
+        # RETURNING rows of a batched insert are not guaranteed to come back
+        # in parameter order; they carry their event_id, and ids increase
+        # in insertion order.
+        for row in sorted(slot_rows, key=lambda row: row.id):
+            slots_by_event[row.event_id].append(
+                schemas.TimeSlot(id=row.id, event_id=row.event_id, start_time=row.start_time)
+            )
+
+    rule_params = [
+        {
+            **event.recurrence.model_dump(),
+            "event_id": event_id,
+            "exclusions": [moment.isoformat() for moment in event.recurrence.exclusions],
+        }
+        for event_id, event in zip(event_ids, events)
+        if event.recurrence is not None
+    ]
+    rules_by_event = {}
+    if rule_params:
+        for rule in db.scalars(insert(models.RecurrenceRule).returning(models.RecurrenceRule), rule_params):
+            rules_by_event[rule.event_id] = schemas.RecurrenceRule.model_validate(rule)
+
+    return [
+        schemas.EventDetail(
+            id=event_id,
+            title=event.title,
+            description=event.description,
+            max_bookings_per_slot=event.max_bookings_per_slot,
+            time_slots=slots_by_event[event_id],
+            recurrence=rules_by_event.get(event_id),
+        )
+        for event_id, event in zip(event_ids, events)
+    ]
+
 @router.post("/", response_model=schemas.EventDetail, status_code=status.HTTP_201_CREATED)
 def create_event(event: schemas.EventCreate, db: Session = Depends(get_db)):
     """
@@ -18,7 +119,7 @@ def create_event(event: schemas.EventCreate, db: Session = Depends(get_db)):
     
     This endpoint:
     1. Creates a new Event record in the database
-    2. Creates TimeSlot records for each provided time slot
+    2. Creates all TimeSlot records with a single multi-row insert
     3. Returns the complete event details including all time slots
     
     Args:
@@ -32,34 +133,15 @@ def create_event(event: schemas.EventCreate, db: Session = Depends(get_db)):
         HTTPException: If validation fails or database operation fails
     """
     try:
-        # Create the event object
-        db_event = models.Event(
-            title=event.title,
-            description=event.description,
-            max_bookings_per_slot=event.max_bookings_per_slot
-        )
-        
-        # Add the event to the database session
-        db.add(db_event)
-        
-        # Flush to get the event ID (needed for creating time slots)
-        db.flush()
-        
-        # Create time slot objects for each provided time
-        for slot_time in event.time_slots:
-            db_time_slot = models.TimeSlot(
-                event_id=db_event.id,
-                start_time=slot_time
-            )
-            db.add(db_time_slot)
+        # The new event has no bookings yet, so the response is built from
+        # the inserted rows instead of being reloaded from the database
+        created = insert_events(db, [event])[0]
         
         # Commit all changes to the database
         db.commit()
+        cache.invalidate_event_list()
         
-        # Refresh the event object to load the time slots
-        db.refresh(db_event)
-        
-        return db_event
+        return created
         
     except Exception as e:
         # Rollback the transaction if something goes wrong
@@ -69,65 +151,766 @@ def create_event(event: schemas.EventCreate, db: Session = Depends(get_db)):
             detail=f"Failed to create event: {str(e)}"
         )
 
-@router.get("/", response_model=List[schemas.Event])
-def get_all_events(db: Session = Depends(get_db)):
+def _write_bulk_batch(db: Session, batch: List[Tuple[int, schemas.EventCreate]]) -> Tuple[list, list]:
+    """
+    Write one batch of the bulk endpoint in its own transaction.
+    
+    If the batch fails as a whole, its items are retried one by one so that a
+    single bad item only fails itself.
+    
+    Returns:
+        tuple: (created items, per-item errors) for the batch
+    """
+    try:
+        created = insert_events(db, [event for _, event in batch])
+        db.commit()
+        return [
+            schemas.BulkCreatedEvent(index=index, id=event.id)
+            for (index, _), event in zip(batch, created)
+        ], []
+    except Exception:
+        db.rollback()
+
+    created, errors = [], []
+    for index, event in batch:
+        try:
+            event_id = insert_events(db, [event])[0].id
+            db.commit()
+            created.append(schemas.BulkCreatedEvent(index=index, id=event_id))
+        except Exception as e:
+            db.rollback()
+            errors.append(schemas.BulkItemError(index=index, detail=f"Failed to create event: {str(e)}"))
+    return created, errors
+
+async def _iter_bulk_items(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (index, raw item) pairs from a JSON array or an NDJSON body.
+    
+    NDJSON bodies are read incrementally from the request stream, so a
+    large import is never held in memory as a whole. A raw item is either a
+    decoded JSON value, or an exception for a line that is not valid JSON.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" not in content_type:
+        try:
+            items = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not valid JSON")
+        if not isinstance(items, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Body must be a JSON array of events (or NDJSON, one event per line)"
+            )
+        for index, item in enumerate(items):
+            yield index, item
+        return
+
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, _decode_ndjson_line(line)
+                index += 1
+    if buffer.strip():
+        yield index, _decode_ndjson_line(buffer)
+
+def _decode_ndjson_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+@router.post("/bulk", response_model=schemas.BulkCreateResult)
+async def create_events_bulk(request: Request, db: Session = Depends(get_db)):
+    """
+    Create many events (with their time slots) in one request.
+    
+    The body is either a JSON array of events, or NDJSON (Content-Type:
+    application/x-ndjson) with one event per line, which is streamed.
+    Events are written in batches of BULK_BATCH_SIZE, each batch in its own
+    short transaction with one multi-row insert for events and one for
+    slots. Invalid items do not stop the import; they are reported by their
+    position in the input.
+    
+    Args:
+        request: The incoming request, read as a stream
+        db: Database session (automatically provided by FastAPI)
+    
+    Returns:
+        BulkCreateResult: IDs of the created events and per-item errors
+    """
+    created, errors = [], []
+    batch = []
+
+    async def flush():
+        batch_created, batch_errors = await run_in_threadpool(_write_bulk_batch, db, list(batch))
+        created.extend(batch_created)
+        errors.extend(batch_errors)
+        batch.clear()
+
+    async for index, item in _iter_bulk_items(request):
+        if isinstance(item, Exception):
+            errors.append(schemas.BulkItemError(index=index, detail=f"Invalid JSON: {item}"))
+            continue
+        try:
+            batch.append((index, schemas.EventCreate.model_validate(item)))
+        except ValidationError as e:
+            errors.append(schemas.BulkItemError(index=index, detail=e.errors(include_url=False)))
+            continue
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    if created:
+        cache.invalidate_event_list()
+    return schemas.BulkCreateResult(created=created, errors=sorted(errors, key=lambda e: e.index))
+
+def query_events_page(
+    db: Session,
+    after_id: Optional[int],
+    limit: int,
+    title_prefix: Optional[str] = None,
+    has_availability: bool = False,
+    starts_after: Optional[datetime.datetime] = None,
+    starts_before: Optional[datetime.datetime] = None,
+) -> Tuple[dict, str]:
+    """
+    Run the keyset-paginated event list query (see get_all_events).
+
+    Returns:
+        Tuple[dict, str]: The page in the EventPage shape, built straight
+        from the rows, and its ETag
+    """
+    query = select(
+        models.Event.id,
+        models.Event.title,
+        models.Event.description,
+        models.Event.max_bookings_per_slot,
+        models.Event.version,
+    )
+
+    if title_prefix:
+        query = query.where(models.Event.title.startswith(title_prefix, autoescape=True))
+
+    # All slot filters go into one EXISTS, so combining them means
+    # "has a slot that matches every condition".
+    slot_conditions = []
+    if has_availability:
+        slot_conditions.append(models.TimeSlot.booked_count < models.Event.max_bookings_per_slot)
+    if starts_after is not None:
+        slot_conditions.append(models.TimeSlot.start_time >= starts_after)
+    if starts_before is not None:
+        slot_conditions.append(models.TimeSlot.start_time < starts_before)
+
+    if not slot_conditions:
+        if after_id is not None:
+            query = query.where(models.Event.id > after_id)
+        # Fetch one extra row to know whether another page exists.
+        rows = db.execute(query.order_by(models.Event.id).limit(limit + 1)).all()
+    else:
+        rows = _filtered_rows(db, query, after_id, limit, slot_conditions, has_availability, starts_after, starts_before)
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+
+    page = {
+        "items": [serialization.event_item(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    }
+    return page, conditional.list_etag([(row.id, row.version) for row in rows[:limit]], next_cursor)
+
+def _filtered_rows(
+    db: Session,
+    query,
+    after_id: Optional[int],
+    limit: int,
+    slot_conditions: list,
+    has_availability: bool,
+    starts_after: Optional[datetime.datetime],
+    starts_before: Optional[datetime.datetime],
+) -> list:
+    """
+    Up to limit + 1 event rows that match the slot filters.
+
+    Occurrences of a recurrence rule mostly have no slot row yet, so an
+    event also matches when its rule could have an occurrence in the
+    window. That part of the filter cannot be decided exactly in SQL (count,
+    exclusions, fully booked occurrences), so such candidates are checked
+    with recurrence.has_matching_occurrence, and another batch is fetched
+    when some of them are dropped.
+    """
+    matching_slot = select(models.TimeSlot.id).where(
+        models.TimeSlot.event_id == models.Event.id, *slot_conditions
+    ).exists()
+    rule_conditions = []
+    if starts_before is not None:
+        rule_conditions.append(models.RecurrenceRule.starts_at < starts_before)
+    if starts_after is not None:
+        rule_conditions.append(
+            (models.RecurrenceRule.until.is_(None)) | (models.RecurrenceRule.until >= starts_after)
+        )
+    candidate_rule = select(models.RecurrenceRule.id).where(
+        models.RecurrenceRule.event_id == models.Event.id, *rule_conditions
+    ).exists()
+    query = query.add_columns(matching_slot.label("has_matching_slot")).where(matching_slot | candidate_rule)
+
+    rows = []
+    cursor = after_id
+    while len(rows) <= limit:
+        batch_query = query if cursor is None else query.where(models.Event.id > cursor)
+        batch = db.execute(batch_query.order_by(models.Event.id).limit(limit + 1)).all()
+        candidates = [row.id for row in batch if not row.has_matching_slot]
+        confirmed = _events_with_matching_occurrence(
+            db, candidates, has_availability, starts_after, starts_before
+        ) if candidates else set()
+        rows.extend(row for row in batch if row.has_matching_slot or row.id in confirmed)
+        if len(batch) <= limit:
+            break
+        cursor = batch[-1].id
+    return rows[:limit + 1]
+
+def _events_with_matching_occurrence(
+    db: Session,
+    event_ids: List[int],
+    has_availability: bool,
+    starts_after: Optional[datetime.datetime],
+    starts_before: Optional[datetime.datetime],
+) -> set:
+    """IDs of the events whose recurrence rule has a (bookable) occurrence in the window."""
+    rules = db.scalars(
+        select(models.RecurrenceRule).where(models.RecurrenceRule.event_id.in_(event_ids))
+    ).all()
+    full = {}
+    if has_availability and rules:
+        # Materialized occurrences that are fully booked do not count.
+        rows = db.execute(
+            select(models.TimeSlot.recurrence_rule_id, models.TimeSlot.start_time)
+            .join(models.Event, models.Event.id == models.TimeSlot.event_id)
+            .where(
+                models.TimeSlot.recurrence_rule_id.in_([rule.id for rule in rules]),
+                models.TimeSlot.booked_count >= models.Event.max_bookings_per_slot,
+            )
+        ).all()
+        for row in rows:
+            full.setdefault(row.recurrence_rule_id, set()).add(row.start_time)
+    return {
+        rule.event_id
+        for rule in rules
+        if recurrence.has_matching_occurrence(
+            rule, starts_after, starts_before, frozenset(full.get(rule.id, ()))
+        )
+    }
+
+@router.get("/", response_model=schemas.EventPage)
+def get_all_events(
+    after_id: Optional[int] = Query(None, description="Return events with an ID greater than this cursor"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    title_prefix: Optional[str] = Query(None, min_length=1),
+    has_availability: bool = Query(False, description="Only events with at least one slot that is not fully booked"),
+    starts_after: Optional[datetime.datetime] = Query(None, description="Only events with a slot starting at or after this time"),
+    starts_before: Optional[datetime.datetime] = Query(None, description="Only events with a slot starting before this time"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get a page of events with basic information.
+    
+    Events are paginated by ID (keyset pagination), so every page costs the
+    same no matter how deep the client scrolls. Only the event columns are
+    selected; time slots are never loaded, they are only consulted through
+    an EXISTS subquery when a slot filter is given. Occurrences of a
+    recurrence rule count as slots whether or not they were booked yet.
+    Pages are served from the read-through cache unless they filter on
+    availability, and are encoded by the fast JSON path (serialization.py)
+    without a round trip through the Pydantic models. The ETag of a page
+    covers the versions of its events; a matching If-None-Match gets a 304.
+    
+    Args:
+        after_id: Cursor from the previous page's next_cursor
+        limit: Maximum number of events to return
+        title_prefix: Only events whose title starts with this text
+        has_availability: Only events that still have a bookable slot
+        starts_after: Only events with a slot starting at or after this time
+        starts_before: Only events with a slot starting before this time
+        if_none_match: ETag of the page the client already has
+        db: Read-only database session, on a replica if one is configured (see database.get_read_db)
+    
+    Returns:
+        EventPage: The events on this page and the cursor for the next one
+        (or 304 Not Modified)
+    """
+    starts_after = schemas.to_naive_utc(starts_after)
+    starts_before = schemas.to_naive_utc(starts_before)
+
+    def load_page(session: Session):
+        page, etag = query_events_page(
+            session, after_id, limit, title_prefix, has_availability, starts_after, starts_before
+        )
+        return {"etag": etag, "page": page}
+
+    # Availability changes with every booking, so pages filtered on it are
+    # not cached; everything else only changes when events are added or removed.
+    if has_availability:
+        loaded = load_page(db)
+    else:
+        key = cache.event_list_key(
+            f"after_id={after_id}&limit={limit}&title_prefix={title_prefix}"
+            f"&starts_after={starts_after}&starts_before={starts_before}"
+        )
+
+        def load_cached_page():
+            # Cached pages are loaded from the primary (see database.primary_session).
+            with primary_session(db) as primary:
+                return load_page(primary)
+
+        loaded = cache.cache.get_or_load(key, load_cached_page, scope=cache.EVENT_LIST_SCOPE)
+    if conditional.etag_matches(if_none_match, loaded["etag"]):
+        return conditional.not_modified(loaded["etag"])
+    return conditional.tagged_response(loaded["page"], loaded["etag"])
+
+def load_event_detail(db: Session, event_id: int) -> Optional[models.Event]:
+    """
+    Load an event together with its time slots and their bookings.
+    
+    The relationships are fetched with selectinload chains, so serializing
+    the result as EventDetail always takes four SELECTs (event, recurrence
+    rule, slots, bookings) no matter how many slots and bookings the event
+    has. Use this for every response that nests slots and bookings.
+    
+    Args:
+        db: Database session
+        event_id: The ID of the event
+    
+    Returns:
+        Event: The event with slots and bookings loaded, or None if not found
+    """
+    return db.execute(
+        select(models.Event)
+        .where(models.Event.id == event_id)
+        .options(
+            selectinload(models.Event.recurrence),
+            selectinload(models.Event.time_slots).selectinload(models.TimeSlot.bookings),
+        )
+    ).scalar_one_or_none()
+
+def load_availability(db: Session, event_id: int) -> Optional[Tuple[dict, int]]:
+    """
+    Load an event and the availability of each of its slots in one query.
+    
+    Availability comes from the booked_count counter maintained by the
+    admission path, so no bookings are read. The event is outer-joined to its
+    slots so that an event without slots still returns one row.
+    
+    Args:
+        db: Database session
+        event_id: The ID of the event
+    
+    Returns:
+        Tuple[dict, int]: The event with per-slot availability in the
+        EventAvailability shape (JSON-compatible, ready to cache) and the
+        event's version, or None if the event does not exist
+    """
+    rows = db.execute(
+        select(
+            models.Event.id,
+            models.Event.title,
+            models.Event.description,
+            models.Event.max_bookings_per_slot,
+            models.Event.version,
+            models.TimeSlot.id.label("slot_id"),
+            models.TimeSlot.start_time,
+            models.TimeSlot.booked_count,
+        )
+        .outerjoin(models.TimeSlot, models.TimeSlot.event_id == models.Event.id)
+        .where(models.Event.id == event_id)
+        .order_by(models.TimeSlot.start_time, models.TimeSlot.id)
+    ).all()
+
+    if not rows:
+        return None
+
+    first = rows[0]
+    capacity = first.max_bookings_per_slot
+    event = serialization.event_item(first)
+    event["time_slots"] = [
+        serialization.slot_availability(row, capacity)
+        for row in rows
+        if row.slot_id is not None
+    ]
+    return event, first.version
+
+def _cached_event(db: Session, event_id: int, view: str) -> Optional[dict]:
+    """
+    Read-through cache lookup for the 'full' or 'summary' view of an event.
+    
+    The version is cached together with the body it was read with, so the
+    ETag sent with a cached body always describes that body.
+    
+    Returns:
+        dict: {"version": ..., "event": JSON-compatible event}, or None if
+        the event does not exist
+    """
+    def load(session: Session):
+        if view == "summary":
+            loaded = load_availability(session, event_id)
+            if loaded is None:
+                return None
+            event, version = loaded
+            return {"version": version, "event": event}
+        event = load_event_detail(session, event_id)
+        if event is None:
+            return None
+        return {"version": event.version, "event": schemas.EventDetail.model_validate(event).model_dump(mode="json")}
+
+    def load_from_primary():
+        # Cached values are loaded from the primary (see database.primary_session).
+        with primary_session(db) as primary:
+            return load(primary)
+
+    return cache.cache.get_or_load(
+        cache.event_key(event_id, view), load_from_primary, scope=cache.event_scope(event_id)
+    )
+
+def _conditional_event_read(db: Session, event_id: int, view: str, if_none_match: Optional[str], body):
     """
-    Get a list of all events with basic information.
+    Answer a read of an event's cached view, honouring If-None-Match.
     
-    This endpoint returns all events but excludes the detailed time slots
-    to keep the response lightweight for list views.
+    With If-None-Match, the event's current version is looked up first (one
+    primary-key read); if the client's ETag is current, the answer is a 304
+    and no slots or bookings are loaded.
     
     Args:
+        db: Database session
+        event_id: The ID of the event
+        view: The cached view to serve ('full' or 'summary')
+        if_none_match: The request's If-None-Match header
+        body: Picks the response body out of the cached event
+    
+    Raises:
+        HTTPException: If the event is not found
+    """
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Event with ID {event_id} not found"
+    )
+    if if_none_match:
+        version = conditional.current_event_version(db, event_id)
+        if version is None:
+            raise not_found
+        etag = conditional.event_etag(event_id, version)
+        if conditional.etag_matches(if_none_match, etag):
+            return conditional.not_modified(etag)
+
+    cached = _cached_event(db, event_id, view)
+    if cached is None:
+        raise not_found
+    return conditional.tagged_response(body(cached["event"]), conditional.event_etag(event_id, cached["version"]))
+
+# Declared before /{event_id}, which would otherwise match '5.ics' and reject it.
+@router.get("/{event_id}.ics", response_class=StreamingResponse)
+def get_event_calendar(
+    event_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Get the slots of an event as an iCalendar feed, for calendar subscriptions.
+    
+    Each explicit slot is a VEVENT, and a recurrence rule one recurring
+    VEVENT (see ics.py). The feed is streamed as it is rendered. It carries
+    the event's ETag, so a client polling with If-None-Match gets a 304
+    after one primary-key lookup while nothing changed.
+    
+    Args:
+        event_id: The ID of the event
+        if_none_match: ETag of the feed the client already has
         db: Database session (automatically provided by FastAPI)
     
     Returns:
-        List[Event]: List of all events with basic metadata
+        StreamingResponse: A text/calendar feed (or 304 Not Modified)
+        
+    Raises:
+        HTTPException: If the event is not found
     """
-    events = db.query(models.Event).options(joinedload(models.Event.time_slots)).all()
-    result = [schemas.Event.from_orm(event) for event in events]
-    print("DEBUG: Returning events:", result)
-    print("DEBUG: Type of first event:", type(result[0]) if result else "No events")
-    return result
+    version = conditional.current_event_version(db, event_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event with ID {event_id} not found"
+        )
+    etag = conditional.event_etag(event_id, version)
+    if conditional.etag_matches(if_none_match, etag):
+        return conditional.not_modified(etag)
+    return conditional.tagged_stream(ics.stream_event_calendar(SessionLocal, event_id), etag, ics.MEDIA_TYPE)
 
-@router.get("/{event_id}", response_model=schemas.EventDetail)
-def get_event(event_id: int, db: Session = Depends(get_db)):
+@router.get("/{event_id}", response_model=Union[schemas.EventDetail, schemas.EventAvailability])
+def get_event(
+    event_id: int,
+    view: Literal["full", "summary"] = Query("full", description="'summary' returns per-slot availability instead of bookings"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+):
     """
     Get detailed information about a specific event including all time slots.
     
+    With view=summary, each slot carries only its availability counts
+    (the same shape as the availability endpoint) instead of the list of
+    bookings, which keeps booking details out of the response and is
+    answered with a single query. Both views are served from the
+    read-through cache, which create_booking and delete_event invalidate.
+    Responses carry a weak ETag from the event's version, so polling
+    clients can send If-None-Match and get a 304 while nothing changed.
+    
     Args:
         event_id: The ID of the event to retrieve
+        view: 'full' (default) for bookings per slot, 'summary' for counts only
+        if_none_match: ETag of the representation the client already has
+        db: Read-only database session, on a replica if one is configured (see database.get_read_db)
+    
+    Returns:
+        EventDetail | EventAvailability: The event with all its time slots
+        (or 304 Not Modified)
+        
+    Raises:
+        HTTPException: If the event is not found
+    """
+    return _conditional_event_read(db, event_id, view, if_none_match, lambda event: event)
+
+@router.get("/{event_id}/availability", response_model=List[schemas.SlotAvailability])
+def get_event_availability(
+    event_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Get the availability of every time slot of an event.
+    
+    This is what clients need to show which slots are still open. It is
+    answered with one query regardless of the number of slots, contains
+    no booking details, and is encoded by the fast JSON path. Like
+    get_event, it carries an ETag and answers If-None-Match with a 304.
+    
+    Args:
+        event_id: The ID of the event
+        if_none_match: ETag of the representation the client already has
         db: Database session (automatically provided by FastAPI)
     
     Returns:
-        EventDetail: The event with all its time slots and booking information
+        List[SlotAvailability]: Booked, capacity and remaining seats per slot
+        (or 304 Not Modified)
         
     Raises:
         HTTPException: If the event is not found
     """
-    # Query the event by ID, including all related time slots
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+    # Shares the cached summary view of the event.
+    return _conditional_event_read(db, event_id, "summary", if_none_match, lambda event: event["time_slots"])
+
+def load_availability_snapshot(event_id: int) -> Optional[dict]:
+    """
+    Availability of an event for the live stream, in its own session.
     
-    if event is None:
+    Read from the database rather than the cache: a change published by
+    another worker only invalidates that worker's cache when the cache is
+    per process (CACHE_BACKEND=memory), so a cached snapshot could predate
+    the very change that triggered the load.
+    
+    Returns:
+        dict: {"version": ..., "time_slots": [SlotAvailability...]}, or None
+        if the event does not exist
+    """
+    db = SessionLocal()
+    try:
+        loaded = load_availability(db, event_id)
+    finally:
+        db.close()
+    if loaded is None:
+        return None
+    event, version = loaded
+    return {"version": version, "time_slots": event["time_slots"]}
+
+# One watcher per streamed event, fed by the broker (see pubsub.py).
+availability_hub = pubsub.AvailabilityHub(pubsub.broker, load_availability_snapshot)
+
+@router.get("/{event_id}/availability/stream", response_class=StreamingResponse)
+async def stream_event_availability(event_id: int):
+    """
+    Stream the availability of every time slot of an event as server-sent events.
+    
+    The first message is the current availability; a new one follows every
+    time a booking or cancellation changes it. Messages are 'availability'
+    events whose data is the same list as GET /events/{event_id}/availability
+    and whose id is the event version. Clients should use EventSource, which
+    reconnects when the server ends the stream (after SSE_MAX_SECONDS).
+    
+    Args:
+        event_id: The ID of the event
+    
+    Returns:
+        StreamingResponse: A text/event-stream of availability updates
+        
+    Raises:
+        HTTPException: If the event is not found
+    """
+    # Subscribe before loading, so a change in between is not missed.
+    queue = availability_hub.subscribe(event_id)
+    try:
+        first = await run_in_threadpool(load_availability_snapshot, event_id)
+    except BaseException:
+        availability_hub.unsubscribe(event_id, queue)
+        raise
+    if first is None:
+        availability_hub.unsubscribe(event_id, queue)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Event with ID {event_id} not found"
         )
+    return StreamingResponse(
+        availability_hub.stream(event_id, queue, first),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{event_id}/bookings/export", response_class=StreamingResponse)
+def export_event_bookings(
+    event_id: int,
+    format: Literal["csv", "ndjson"] = Query("csv", description="'csv' (with a header line) or 'ndjson'"),
+    db: Session = Depends(get_db),
+):
+    """
+    Download every booking of an event as CSV or NDJSON.
+    
+    This is the attendee list without the EventDetail tree: the rows are
+    streamed from the database in batches as they are read (see export.py),
+    so memory stays flat and the first bytes are sent right away however
+    many bookings the event has. Rows are ordered by slot start time.
     
-    return event
+    Args:
+        event_id: The ID of the event
+        format: Output format, 'csv' (default) or 'ndjson'
+        db: Database session (automatically provided by FastAPI)
+    
+    Returns:
+        StreamingResponse: The bookings, one per line
+        
+    Raises:
+        HTTPException: If the event is not found
+    """
+    if conditional.current_event_version(db, event_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event with ID {event_id} not found"
+        )
+    return StreamingResponse(
+        export.stream_bookings(SessionLocal, event_id, format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="event-{event_id}-bookings.{format}"'},
+    )
+
+@router.get("/{event_id}/occurrences", response_model=List[schemas.Occurrence])
+def get_event_occurrences(
+    event_id: int,
+    window_start: datetime.datetime = Query(..., alias="from"),
+    window_end: datetime.datetime = Query(..., alias="to"),
+    db: Session = Depends(get_db),
+):
+    """
+    Get every bookable occurrence of an event within a time window.
+    
+    This merges the event's explicit time slots with the occurrences of its
+    recurrence rule, which are expanded for the requested window only.
+    Occurrences that have not been booked yet have no slot row; they are
+    returned with slot_id None and can be booked by start_time.
+    
+    Args:
+        event_id: The ID of the event
+        window_start: Start of the window (inclusive), query parameter 'from'
+        window_end: End of the window (exclusive), query parameter 'to'
+        db: Database session (automatically provided by FastAPI)
+    
+    Returns:
+        List[Occurrence]: Occurrences with their availability, ordered by start time
+        
+    Raises:
+        HTTPException: If the event is not found or the window is invalid
+    """
+    window_start = schemas.to_naive_utc(window_start)
+    window_end = schemas.to_naive_utc(window_end)
+    recurrence.check_window(window_start, window_end)
+    event = db.execute(
+        select(models.Event.max_bookings_per_slot, models.RecurrenceRule)
+        .outerjoin(models.RecurrenceRule, models.RecurrenceRule.event_id == models.Event.id)
+        .where(models.Event.id == event_id)
+    ).first()
+    if event is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event with ID {event_id} not found"
+        )
+    capacity = event.max_bookings_per_slot
+
+    def occurrence(slot_id, start_time, booked):
+        return schemas.Occurrence(
+            slot_id=slot_id,
+            start_time=start_time,
+            booked=booked,
+            capacity=capacity,
+            remaining=max(capacity - booked, 0),
+        )
+
+    slots = db.execute(
+        select(
+            models.TimeSlot.id,
+            models.TimeSlot.start_time,
+            models.TimeSlot.booked_count,
+            models.TimeSlot.recurrence_rule_id,
+        ).where(
+            models.TimeSlot.event_id == event_id,
+            models.TimeSlot.start_time >= window_start,
+            models.TimeSlot.start_time < window_end,
+        )
+    ).all()
+    result = [
+        occurrence(slot.id, slot.start_time, slot.booked_count)
+        for slot in slots
+        if slot.recurrence_rule_id is None
+    ]
+
+    rule = event.RecurrenceRule
+    if rule is not None:
+        materialized = {slot.start_time: slot for slot in slots if slot.recurrence_rule_id == rule.id}
+        for start_time in recurrence.expand_window(rule, window_start, window_end):
+            slot = materialized.get(start_time)
+            if slot is not None:
+                result.append(occurrence(slot.id, start_time, slot.booked_count))
+            else:
+                result.append(occurrence(None, start_time, 0))
+
+    return sorted(result, key=lambda o: o.start_time)
 
 @router.delete("/{event_id}", status_code=204)
 def delete_event(event_id: int, db: Session = Depends(get_db)):
     """
     Delete an event by its ID. Also deletes all related time slots and bookings (cascade).
+    
+    The rows are deleted by one DELETE statement; the ON DELETE CASCADE
+    foreign keys remove the slots, bookings, waitlist entries and recurrence
+    rule in the database, so none of them is loaded.
+    
     Args:
         event_id: The ID of the event to delete
         db: Database session (automatically provided by FastAPI)
     Returns:
         204 No Content on success, 404 if not found
     """
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if not event:
+    deleted = db.execute(delete(models.Event).where(models.Event.id == event_id))
+    if deleted.rowcount == 0:
         raise HTTPException(status_code=404, detail="Event not found")
-    db.delete(event)
     db.commit()
+    cache.invalidate_event(event_id)
+    cache.invalidate_event_list()
+    # Ends the event's live availability streams.
+    pubsub.broker.publish(event_id)
     return {"detail": "Event deleted"} 
\ No newline at end of file
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, Header, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
+import datetime
+from database import get_async_db
+from routes import events
+import schemas
+
+# Async versions of the event routes, used when DB_ASYNC is enabled.
+#
+# Each route has the same contract as its counterpart in events.py and runs
+# the same handler through AsyncSession.run_sync: the handler's ORM calls are
+# executed in a greenlet whose database I/O is awaited on the event loop, so
+# waiting on the database does not hold a threadpool worker. Routes that are
+# not listed here (e.g. the bulk import) keep using the sync path.
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+    # The sync routes document the same contracts.
+    include_in_schema=False,
+)
+
+@router.post("/", response_model=schemas.EventDetail, status_code=status.HTTP_201_CREATED)
+async def create_event(event: schemas.EventCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Create a new event with multiple time slots (see events.create_event).
+    """
+    return await db.run_sync(lambda session: events.create_event(event, session))
+
+@router.get("/", response_model=schemas.EventPage)
+async def get_all_events(
+    after_id: Optional[int] = Query(None, description="Return events with an ID greater than this cursor"),
+    limit: int = Query(50, ge=1, le=events.MAX_PAGE_SIZE),
+    title_prefix: Optional[str] = Query(None, min_length=1),
+    has_availability: bool = Query(False, description="Only events with at least one slot that is not fully booked"),
+    starts_after: Optional[datetime.datetime] = Query(None, description="Only events with a slot starting at or after this time"),
+    starts_before: Optional[datetime.datetime] = Query(None, description="Only events with a slot starting before this time"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get a page of events with basic information (see events.get_all_events).
+    """
+    return await db.run_sync(lambda session: events.get_all_events(
+        after_id, limit, title_prefix, has_availability, starts_after, starts_before, if_none_match, session
+    ))
+
+@router.get("/{event_id}.ics", response_class=StreamingResponse)
+async def get_event_calendar(
+    event_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get the slots of an event as an iCalendar feed (see events.get_event_calendar).
+    """
+    return await db.run_sync(lambda session: events.get_event_calendar(event_id, if_none_match, session))
+
+@router.get("/{event_id}", response_model=Union[schemas.EventDetail, schemas.EventAvailability])
+async def get_event(
+    event_id: int,
+    view: Literal["full", "summary"] = Query("full", description="'summary' returns per-slot availability instead of bookings"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get detailed information about a specific event (see events.get_event).
+    """
+    return await db.run_sync(lambda session: events.get_event(event_id, view, if_none_match, session))
+
+@router.get("/{event_id}/availability", response_model=List[schemas.SlotAvailability])
+async def get_event_availability(
+    event_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get the availability of every time slot of an event (see events.get_event_availability).
+    """
+    return await db.run_sync(lambda session: events.get_event_availability(event_id, if_none_match, session))
+
+@router.get("/{event_id}/bookings/export", response_class=StreamingResponse)
+async def export_event_bookings(
+    event_id: int,
+    format: Literal["csv", "ndjson"] = Query("csv", description="'csv' (with a header line) or 'ndjson'"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Download every booking of an event as CSV or NDJSON (see events.export_event_bookings).
+    """
+    return await db.run_sync(lambda session: events.export_event_bookings(event_id, format, session))
+
+@router.get("/{event_id}/occurrences", response_model=List[schemas.Occurrence])
+async def get_event_occurrences(
+    event_id: int,
+    window_start: datetime.datetime = Query(..., alias="from"),
+    window_end: datetime.datetime = Query(..., alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get every bookable occurrence of an event within a time window (see events.get_event_occurrences).
+    """
+    return await db.run_sync(
+        lambda session: events.get_event_occurrences(event_id, window_start, window_end, session)
+    )
+
+@router.delete("/{event_id}", status_code=204)
+async def delete_event(event_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Delete an event by its ID (see events.delete_event).
+    """
+    return await db.run_sync(lambda session: events.delete_event(event_id, session))
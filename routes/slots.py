@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+import base64
+import datetime
+from database import get_db
+import serialization
+import models, schemas
+from routes.events import MAX_PAGE_SIZE
+
+# Create a new router object for searching slots across events.
+router = APIRouter(
+    prefix="/slots",
+    tags=["slots"],
+)
+
+def _encode_cursor(start_time: datetime.datetime, event_id: int, slot_id: int) -> str:
+    """Opaque cursor for the slot that ends a page."""
+    raw = f"{start_time.isoformat()}|{event_id}|{slot_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime.datetime, int, int]:
+    """
+    Decode a cursor made by _encode_cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start_time, event_id, slot_id = raw.split("|")
+        return datetime.datetime.fromisoformat(start_time), int(event_id), int(slot_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def query_slots_page(
+    db: Session,
+    starts_from: datetime.datetime,
+    starts_to: datetime.datetime,
+    available: bool,
+    cursor: Optional[Tuple[datetime.datetime, int, int]],
+    limit: int,
+) -> dict:
+    """
+    Run the slot search query (see search_slots).
+
+    Returns:
+        dict: The page in the SlotSearchPage shape, built straight from the rows
+    """
+    key = (models.TimeSlot.start_time, models.TimeSlot.event_id, models.TimeSlot.id)
+    query = (
+        select(
+            models.TimeSlot.id.label("slot_id"),
+            models.TimeSlot.event_id,
+            models.Event.title.label("event_title"),
+            models.TimeSlot.start_time,
+            models.TimeSlot.booked_count,
+            models.Event.max_bookings_per_slot.label("capacity"),
+        )
+        .join(models.Event, models.Event.id == models.TimeSlot.event_id)
+        .where(models.TimeSlot.start_time >= starts_from, models.TimeSlot.start_time < starts_to)
+    )
+    if available:
+        query = query.where(models.TimeSlot.booked_count < models.Event.max_bookings_per_slot)
+    if cursor is not None:
+        query = query.where(tuple_(*key) > tuple_(*cursor))
+    # Fetch one extra row to know whether another page exists.
+    rows = db.execute(query.order_by(*key).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_cursor(last.start_time, last.event_id, last.slot_id)
+    return {
+        "items": [serialization.slot_search_item(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    }
+
+@router.get("/", response_model=schemas.SlotSearchPage)
+def search_slots(
+    starts_from: datetime.datetime = Query(..., alias="from", description="Slots starting at or after this time"),
+    starts_to: datetime.datetime = Query(..., alias="to", description="Slots starting before this time"),
+    available: bool = Query(False, description="Only slots that are not fully booked"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Find the slots of all events that start within a time window.
+    
+    Slots are returned in start time order with their remaining capacity,
+    computed in the same query. The query is a range scan of the
+    (start_time, event_id, id) index, and pages are keyset-paginated on
+    that same key, so a page costs the same however large the table or
+    deep the page. Only slot rows are searched: occurrences of a recurring
+    event that nobody has booked yet have no row and are listed by
+    GET /events/{id}/occurrences instead.
+    
+    Args:
+        starts_from: Start of the window (inclusive)
+        starts_to: End of the window (exclusive)
+        available: Only slots with at least one free seat
+        cursor: Cursor from the previous page's next_cursor
+        limit: Maximum number of slots to return
+        db: Database session (automatically provided by FastAPI)
+    
+    Returns:
+        SlotSearchPage: The slots on this page and the cursor for the next one
+    
+    Raises:
+        HTTPException: 400 if the window is empty or the cursor is invalid
+    """
+    starts_from = schemas.to_naive_utc(starts_from)
+    starts_to = schemas.to_naive_utc(starts_to)
+    if starts_to <= starts_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must be later than 'from'"
+        )
+    page = query_slots_page(
+        db, starts_from, starts_to, available, _decode_cursor(cursor) if cursor else None, limit
+    )
+    return serialization.FastJSONResponse(page)
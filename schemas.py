@@ -1,11 +1,21 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Annotated, Any, List, Literal, Optional
 import datetime
 
 # Pydantic models (schemas) are used for data validation and serialization.
 # They define the shape of the data that the API expects in requests
 # and sends in responses.
 
+# Times are stored as naive UTC. Clients may send offsets ("...Z",
+# "...+02:00"); they are converted on the way in, so naive and aware values
+# are never compared with each other.
+def to_naive_utc(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+UTCDateTime = Annotated[datetime.datetime, AfterValidator(to_naive_utc)]
+
 # ==================================
 #       Booking Schemas
 # ==================================
@@ -16,9 +26,29 @@ class BookingBase(BaseModel):
     user_email: EmailStr # Pydantic validates this is a valid email format.
 
 # Schema for creating a new booking.
-# It inherits from BookingBase and adds the time_slot_id.
+# It inherits from BookingBase and adds the slot to book: either an existing
+# time_slot_id, or the start_time of an occurrence of the event's recurrence
+# rule (the slot is then created on first booking).
 class BookingCreate(BookingBase):
-    time_slot_id: int
+    time_slot_id: Optional[int] = None
+    start_time: Optional[UTCDateTime] = None
+
+    @model_validator(mode="after")
+    def check_slot_reference(self):
+        if (self.time_slot_id is None) == (self.start_time is None):
+            raise ValueError("Provide exactly one of time_slot_id or start_time")
+        return self
+
+# Schema for booking several slots of one event at once, all or nothing.
+class BatchBookingCreate(BookingBase):
+    time_slot_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+    @field_validator("time_slot_ids")
+    @classmethod
+    def check_distinct(cls, time_slot_ids):
+        if len(set(time_slot_ids)) != len(time_slot_ids):
+            raise ValueError("time_slot_ids must not repeat a slot")
+        return time_slot_ids
 
 # Schema for reading a booking's details.
 # It includes the 'id' and 'created_at' fields from the database model.
@@ -30,13 +60,45 @@ class Booking(BookingBase):
     class Config:
         from_attributes = True
 
+# Schema for a booking in a user's history, with the slot and event it is for.
+class BookingDetail(Booking):
+    event_id: int
+    event_title: str
+    start_time: datetime.datetime
+
+# Schemas for one page of a user's booking history, newest first.
+# 'next_cursor' is the opaque 'cursor' to pass to fetch the following page,
+# or None when there are no more bookings.
+class BookingPage(BaseModel):
+    items: List[Booking] = []
+    next_cursor: Optional[str] = None
+
+class BookingDetailPage(BaseModel):
+    items: List[BookingDetail] = []
+    next_cursor: Optional[str] = None
+
+# Schema for a place on the waitlist of a full time slot.
+# 'position' is 1 for the next person to get a freed seat.
+class WaitlistEntry(BookingBase):
+    id: int
+    time_slot_id: int
+    created_at: datetime.datetime
+    position: int
+
+# Schema for the result of cancelling a booking.
+# 'promoted' is the booking given to the first person on the slot's waitlist,
+# or None if nobody was waiting and the seat was freed.
+class CancellationResult(BaseModel):
+    cancelled_booking_id: int
+    promoted: Optional[Booking] = None
+
 # ==================================
 #       TimeSlot Schemas
 # ==================================
 
 # Base schema for a time slot.
 class TimeSlotBase(BaseModel):
-    start_time: datetime.datetime
+    start_time: UTCDateTime
 
 # Schema for creating a time slot (usually not used directly by the user).
 class TimeSlotCreate(TimeSlotBase):
@@ -52,6 +114,72 @@ class TimeSlot(TimeSlotBase):
     class Config:
         from_attributes = True
 
+# Schema for the compact availability of a time slot.
+# It carries counts only, so it never exposes who booked the slot.
+class SlotAvailability(BaseModel):
+    slot_id: int
+    start_time: datetime.datetime
+    booked: int
+    capacity: int
+    remaining: int
+
+# Schema for a slot found by the cross-event search (GET /slots).
+class SlotSearchItem(BaseModel):
+    slot_id: int
+    event_id: int
+    event_title: str
+    start_time: datetime.datetime
+    booked: int
+    capacity: int
+    remaining: int
+
+# A page of slot search results. Pass next_cursor as 'cursor' for the next page.
+class SlotSearchPage(BaseModel):
+    items: List[SlotSearchItem] = []
+    next_cursor: Optional[str] = None
+
+# Schema for one occurrence of an event, in the availability shape.
+# 'slot_id' is None for occurrences of a recurrence rule nobody has booked yet.
+class Occurrence(BaseModel):
+    slot_id: Optional[int] = None
+    start_time: datetime.datetime
+    booked: int
+    capacity: int
+    remaining: int
+
+# ==================================
+#     Recurrence Rule Schemas
+# ==================================
+
+# Base schema for a recurrence rule (a subset of iCalendar RRULE).
+class RecurrenceRuleBase(BaseModel):
+    frequency: Literal["daily", "weekly"]
+    interval: int = Field(1, ge=1)
+    weekdays: Optional[List[int]] = None # Weekly only, 0 = Monday; defaults to the weekday of starts_at
+    starts_at: UTCDateTime # First occurrence; its time of day is used for all occurrences
+    until: Optional[UTCDateTime] = None
+    count: Optional[int] = Field(None, ge=1)
+    exclusions: List[UTCDateTime] = []
+
+    @field_validator("weekdays")
+    @classmethod
+    def check_weekdays(cls, weekdays):
+        if weekdays is not None and any(day < 0 or day > 6 for day in weekdays):
+            raise ValueError("weekdays must be between 0 (Monday) and 6 (Sunday)")
+        return weekdays
+
+# Schema for creating a recurrence rule as part of an event.
+class RecurrenceRuleCreate(RecurrenceRuleBase):
+    pass
+
+# Schema for reading a recurrence rule.
+class RecurrenceRule(RecurrenceRuleBase):
+    id: int
+    event_id: int
+
+    class Config:
+        from_attributes = True
+
 # ==================================
 #        Event Schemas
 # ==================================
@@ -63,9 +191,18 @@ class EventBase(BaseModel):
     max_bookings_per_slot: int = 1
 
 # Schema for creating a new event.
-# It requires a list of ISO 8601 formatted time slot strings.
+# It takes a list of ISO 8601 formatted time slot strings, and/or a
+# recurrence rule whose occurrences are generated on demand. An event with
+# neither could never be booked, so it is rejected.
 class EventCreate(EventBase):
-    time_slots: List[datetime.datetime]
+    time_slots: List[UTCDateTime] = []
+    recurrence: Optional[RecurrenceRuleCreate] = None
+
+    @model_validator(mode="after")
+    def check_bookable(self):
+        if not self.time_slots and self.recurrence is None:
+            raise ValueError("Provide at least one time slot or a recurrence rule")
+        return self
 
 # Schema for reading an event, used for list views.
 # It doesn't include the detailed time slots list.
@@ -75,7 +212,34 @@ class Event(EventBase):
     class Config:
         from_attributes = True
 
+# Schemas for the result of a bulk event import.
+# 'index' is the position of the item in the submitted array / NDJSON lines.
+class BulkCreatedEvent(BaseModel):
+    index: int
+    id: int
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: Any
+
+class BulkCreateResult(BaseModel):
+    created: List[BulkCreatedEvent] = []
+    errors: List[BulkItemError] = []
+
+# Schema for one page of the event list.
+# 'next_cursor' is the 'after_id' to pass to fetch the following page,
+# or None when there are no more events.
+class EventPage(BaseModel):
+    items: List[Event] = []
+    next_cursor: Optional[int] = None
+
 # Schema for reading a single event with all its details.
 # It includes the list of associated time slots.
 class EventDetail(Event):
-    time_slots: List[TimeSlot] = [] 
\ No newline at end of file
+    time_slots: List[TimeSlot] = []
+    recurrence: Optional[RecurrenceRule] = None
+
+# Schema for the compact ("summary") view of a single event.
+# Same event fields as EventDetail, but each slot only reports its availability.
+class EventAvailability(Event):
+    time_slots: List[SlotAvailability] = []
@@ -0,0 +1,108 @@
+import datetime
+import json
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+# Fast JSON path for high-volume read endpoints.
+#
+# A handler that returns a model or dict has it validated again against its
+# response_model and converted by FastAPI before it is encoded. For list
+# endpoints that means every row goes through Pydantic twice. The endpoints
+# using this module instead build plain dicts straight from the selected
+# columns and return a FastJSONResponse, which FastAPI sends as is. The
+# response_model stays on the route for the OpenAPI schema, and
+# test_serialization.py checks that these dicts match what the Pydantic
+# models would have produced.
+#
+# The dict builders below must list the same fields, in the same order, as
+# the schemas named in their docstrings.
+
+
+def isoformat(value: Optional[datetime.datetime]) -> Optional[str]:
+    """A naive UTC datetime as Pydantic writes it in JSON (for cached values)."""
+    return value.isoformat() if value is not None else None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode content as JSON with orjson, or the json module if orjson is missing.
+
+    The content may contain datetime values; both encoders write them in ISO
+    8601 like Pydantic does.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded by dumps() above."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def event_item(row) -> dict:
+    """schemas.Event from a row with the event columns."""
+    return {
+        "title": row.title,
+        "description": row.description,
+        "max_bookings_per_slot": row.max_bookings_per_slot,
+        "id": row.id,
+    }
+
+
+def slot_availability(row, capacity: int) -> dict:
+    """schemas.SlotAvailability from a row with slot_id, start_time and booked_count."""
+    return {
+        "slot_id": row.slot_id,
+        "start_time": isoformat(row.start_time),
+        "booked": row.booked_count,
+        "capacity": capacity,
+        "remaining": max(capacity - row.booked_count, 0),
+    }
+
+
+def slot_search_item(row) -> dict:
+    """schemas.SlotSearchItem from a row with slot_id, event_id, event_title, start_time, booked_count and capacity."""
+    return {
+        "slot_id": row.slot_id,
+        "event_id": row.event_id,
+        "event_title": row.event_title,
+        "start_time": row.start_time,
+        "booked": row.booked_count,
+        "capacity": row.capacity,
+        "remaining": max(row.capacity - row.booked_count, 0),
+    }
+
+
+def booking_item(row) -> dict:
+    """schemas.Booking from a row with the booking columns."""
+    return {
+        "user_name": row.user_name,
+        "user_email": row.user_email,
+        "id": row.id,
+        "time_slot_id": row.time_slot_id,
+        "created_at": row.created_at,
+    }
+
+
+def booking_detail_item(row) -> dict:
+    """schemas.BookingDetail from a row with the booking columns, event_id, event_title and start_time."""
+    item = booking_item(row)
+    item["event_id"] = row.event_id
+    item["event_title"] = row.event_title
+    item["start_time"] = row.start_time
+    return item
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+pytest.importorskip("aiosqlite")
+
+import database  # noqa: E402
+from routes import bookings, bookings_async, events, events_async  # noqa: E402
+
+
+@pytest.fixture
+def async_client(db_session):
+    """Client for an app wired like main.py with DB_ASYNC enabled."""
+    app = FastAPI()
+    app.include_router(events_async.router)
+    app.include_router(bookings_async.router)
+    app.include_router(events.router)
+    app.include_router(bookings.router)
+    app.add_event_handler("shutdown", database.dispose_async_engine)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_async_routes_take_precedence(async_client):
+    endpoints = {
+        (route.path, tuple(sorted(route.methods))): route.endpoint
+        for route in reversed(async_client.app.routes)
+    }
+    assert endpoints[("/events/{event_id}", ("GET",))] is events_async.get_event
+    assert endpoints[("/bookings/events/{event_id}/bookings", ("POST",))] is bookings_async.create_booking
+
+
+def test_booking_flow_on_async_path(async_client):
+    event = async_client.post("/events/", json={
+        "title": "Async workshop",
+        "time_slots": ["2030-01-15T10:00:00"],
+        "max_bookings_per_slot": 1,
+    })
+    assert event.status_code == 201
+    event = event.json()
+    slot_id = event["time_slots"][0]["id"]
+
+    booking = {"time_slot_id": slot_id, "user_name": "Alice", "user_email": "alice@example.com"}
+    assert async_client.post(f"/bookings/events/{event['id']}/bookings", json=booking).status_code == 201
+    booking["user_email"] = "bob@example.com"
+    assert async_client.post(f"/bookings/events/{event['id']}/bookings", json=booking).status_code == 409
+
+    detail = async_client.get(f"/events/{event['id']}").json()
+    assert detail["time_slots"][0]["bookings"][0]["user_email"] == "alice@example.com"
+    assert async_client.get(f"/events/{event['id']}/availability").json()[0]["remaining"] == 0
+    assert async_client.get("/events/").json()["items"][0]["title"] == "Async workshop"
+    assert len(async_client.get("/bookings/users/alice@example.com/bookings").json()["items"]) == 1
+    assert async_client.get("/events/9999").status_code == 404
+
+    assert async_client.delete(f"/events/{event['id']}").status_code == 204
+    assert async_client.get(f"/events/{event['id']}").status_code == 404
+
+
+def test_async_path_refuses_the_redis_cache(tmp_path):
+    env = dict(
+        os.environ,
+        DB_ASYNC="true",
+        CACHE_BACKEND="redis",
+        DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}",
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", "import main"],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+    )
+    assert result.returncode != 0
+    assert "cannot be combined with CACHE_BACKEND=redis" in result.stderr
@@ -0,0 +1,279 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import models, schemas
+from admission import admit_booking
+from database import SessionLocal
+
+
+def _create_event(client, slots=1, capacity=1):
+    response = client.post("/events/", json={
+        "title": "Workshop",
+        "description": "Hands-on session",
+        "time_slots": [f"2030-01-15T{10 + i:02d}:00:00" for i in range(slots)],
+        "max_bookings_per_slot": capacity,
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def _book(client, event_id, slot_id, email):
+    return client.post(f"/bookings/events/{event_id}/bookings", json={
+        "time_slot_id": slot_id,
+        "user_name": "Test User",
+        "user_email": email,
+    })
+
+
+def test_booking_is_created(client):
+    event = _create_event(client)
+    slot_id = event["time_slots"][0]["id"]
+
+    response = _book(client, event["id"], slot_id, "alice@example.com")
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["time_slot_id"] == slot_id
+    assert body["user_email"] == "alice@example.com"
+
+
+def test_duplicate_booking_is_rejected(client):
+    event = _create_event(client, capacity=5)
+    slot_id = event["time_slots"][0]["id"]
+
+    assert _book(client, event["id"], slot_id, "alice@example.com").status_code == 201
+    response = _book(client, event["id"], slot_id, "alice@example.com")
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "You have already booked this time slot"
+    # The rejected duplicate must not keep the seat it briefly claimed.
+    slot = client.get(f"/events/{event['id']}").json()["time_slots"][0]
+    assert len(slot["bookings"]) == 1
+
+
+def test_full_slot_is_rejected(client):
+    event = _create_event(client, capacity=1)
+    slot_id = event["time_slots"][0]["id"]
+
+    assert _book(client, event["id"], slot_id, "alice@example.com").status_code == 201
+    response = _book(client, event["id"], slot_id, "bob@example.com")
+
+    assert response.status_code == 409
+    assert "fully booked" in response.json()["detail"]
+
+
+def test_unknown_event_and_slot_return_404(client):
+    event = _create_event(client)
+    other = _create_event(client)
+
+    assert _book(client, 9999, 1, "alice@example.com").status_code == 404
+    # A slot that exists but belongs to a different event is not bookable.
+    response = _book(client, event["id"], other["time_slots"][0]["id"], "alice@example.com")
+    assert response.status_code == 404
+
+
+# ==================================
+#       Concurrency
+# ==================================
+
+CAPACITY = 25
+ATTEMPTS = 300
+
+
+def _hammer(session_factory, event_id, slot_id, record_property):
+    """
+    Fire ATTEMPTS parallel bookings at one slot and tally the outcomes.
+
+    The throughput is recorded as a test property (see --junitxml); for a
+    standalone number run benchmarks/bench_admission.py.
+    """
+    def attempt(i):
+        db = session_factory()
+        try:
+            booking = schemas.BookingCreate(
+                time_slot_id=slot_id, user_name=f"User {i}", user_email=f"user{i}@example.com"
+            )
+            admit_booking(db, event_id, booking)
+            return 201
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        outcomes = list(pool.map(attempt, range(ATTEMPTS)))
+    elapsed = time.perf_counter() - started
+    record_property("admission_attempts", ATTEMPTS)
+    record_property("admission_requests_per_second", round(ATTEMPTS / elapsed, 1))
+    return outcomes
+
+
+def _seed_hot_slot(session_factory):
+    db = session_factory()
+    try:
+        event = models.Event(title="Flash sale", max_bookings_per_slot=CAPACITY)
+        event.time_slots.append(models.TimeSlot(start_time=models.datetime.datetime(2030, 1, 1, 9)))
+        db.add(event)
+        db.commit()
+        return event.id, event.time_slots[0].id
+    finally:
+        db.close()
+
+
+def _assert_no_oversell(session_factory, slot_id, outcomes):
+    assert outcomes.count(201) == CAPACITY
+    assert outcomes.count(409) == ATTEMPTS - CAPACITY
+
+    db = session_factory()
+    try:
+        booked = db.scalar(select(func.count(models.Booking.id)).where(models.Booking.time_slot_id == slot_id))
+        counter = db.scalar(select(models.TimeSlot.booked_count).where(models.TimeSlot.id == slot_id))
+    finally:
+        db.close()
+    assert booked == CAPACITY
+    assert counter == CAPACITY
+
+
+def test_concurrent_bookings_never_oversell_sqlite(db_session, record_property):
+    event_id, slot_id = _seed_hot_slot(SessionLocal)
+    outcomes = _hammer(SessionLocal, event_id, slot_id, record_property)
+    _assert_no_oversell(SessionLocal, slot_id, outcomes)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set")
+def test_concurrent_bookings_never_oversell_postgres(record_property):
+    pg_engine = create_engine(os.environ["TEST_POSTGRES_URL"], pool_size=32, max_overflow=0)
+    models.Base.metadata.drop_all(bind=pg_engine)
+    models.Base.metadata.create_all(bind=pg_engine)
+    PgSession = sessionmaker(autocommit=False, autoflush=False, bind=pg_engine)
+    try:
+        event_id, slot_id = _seed_hot_slot(PgSession)
+        outcomes = _hammer(PgSession, event_id, slot_id, record_property)
+        _assert_no_oversell(PgSession, slot_id, outcomes)
+    finally:
+        models.Base.metadata.drop_all(bind=pg_engine)
+        pg_engine.dispose()
+
+
+def test_user_booking_history_pages_newest_first(client):
+    event = _create_event(client, slots=5)
+    for slot in event["time_slots"]:
+        assert _book(client, event["id"], slot["id"], "alice@example.com").status_code == 201
+    _book(client, event["id"], event["time_slots"][0]["id"], "bob@example.com")
+    url = "/bookings/users/alice@example.com/bookings"
+
+    first = client.get(url, params={"limit": 2}).json()
+    second = client.get(url, params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    third = client.get(url, params={"limit": 2, "cursor": second["next_cursor"]}).json()
+
+    slot_ids = [b["time_slot_id"] for page in (first, second, third) for b in page["items"]]
+    assert slot_ids == [slot["id"] for slot in reversed(event["time_slots"])]
+    assert third["next_cursor"] is None
+    assert client.get(url, params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_user_booking_history_details_and_time_filters(client):
+    future = _create_event(client)
+    past = client.post("/events/", json={"title": "Last year", "time_slots": ["2020-01-01T10:00:00"]}).json()
+    _book(client, future["id"], future["time_slots"][0]["id"], "alice@example.com")
+    _book(client, past["id"], past["time_slots"][0]["id"], "alice@example.com")
+    url = "/bookings/users/alice@example.com/bookings"
+
+    detailed = client.get(url, params={"include": "details"}).json()["items"]
+    assert [(b["event_title"], b["start_time"]) for b in detailed] == [
+        ("Last year", "2020-01-01T10:00:00"), ("Workshop", "2030-01-15T10:00:00"),
+    ]
+    assert "event_title" not in client.get(url).json()["items"][0]
+
+    upcoming = client.get(url, params={"when": "upcoming"}).json()["items"]
+    assert [b["time_slot_id"] for b in upcoming] == [future["time_slots"][0]["id"]]
+    finished = client.get(url, params={"when": "past", "include": "details"}).json()["items"]
+    assert [b["event_id"] for b in finished] == [past["id"]]
+
+
+def _book_batch(client, event_id, slot_ids, email):
+    return client.post(f"/bookings/events/{event_id}/bookings/batch", json={
+        "time_slot_ids": slot_ids,
+        "user_name": "Test User",
+        "user_email": email,
+    })
+
+
+def _booked_counts(event_id):
+    db = SessionLocal()
+    try:
+        return db.scalars(
+            select(models.TimeSlot.booked_count).where(models.TimeSlot.event_id == event_id).order_by(models.TimeSlot.id)
+        ).all()
+    finally:
+        db.close()
+
+
+def test_batch_books_every_slot_at_once(client, count_queries):
+    event = _create_event(client, slots=4, capacity=2)
+    slot_ids = [slot["id"] for slot in event["time_slots"]][::-1]
+
+    count_queries.reset()
+    response = _book_batch(client, event["id"], slot_ids, "series@example.com")
+
+    assert response.status_code == 201
+    assert [booking["time_slot_id"] for booking in response.json()] == slot_ids
+    assert _booked_counts(event["id"]) == [1, 1, 1, 1]
+    # Lock, claim, insert, version bump: nothing per slot.
+    assert count_queries.count <= 5
+
+
+def test_batch_is_all_or_nothing_and_lists_blocking_slots(client):
+    event = _create_event(client, slots=4, capacity=1)
+    slot_ids = [slot["id"] for slot in event["time_slots"]]
+    assert _book(client, event["id"], slot_ids[1], "other@example.com").status_code == 201
+    assert _book(client, event["id"], slot_ids[2], "series@example.com").status_code == 201
+
+    response = _book_batch(client, event["id"], slot_ids + [999999], "series@example.com")
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["blocked"] == [
+        {"time_slot_id": slot_ids[1], "reason": "full"},
+        {"time_slot_id": slot_ids[2], "reason": "already_booked"},
+        {"time_slot_id": 999999, "reason": "not_found"},
+    ]
+    # The free slots were not kept either.
+    assert _booked_counts(event["id"]) == [0, 1, 1, 0]
+    assert len(client.get("/bookings/users/series@example.com/bookings").json()["items"]) == 1
+
+
+def test_batch_validation(client):
+    event = _create_event(client, slots=2)
+    slot_id = event["time_slots"][0]["id"]
+    assert _book_batch(client, event["id"], [], "a@example.com").status_code == 422
+    assert _book_batch(client, event["id"], [slot_id, slot_id], "a@example.com").status_code == 422
+    assert _book_batch(client, 999999, [slot_id], "a@example.com").status_code == 404
+
+
+def test_concurrent_overlapping_batches_never_oversell(client):
+    event = _create_event(client, slots=3, capacity=2)
+    slot_ids = [slot["id"] for slot in event["time_slots"]]
+    batches = [slot_ids, slot_ids[::-1], slot_ids[:2], slot_ids[1:], slot_ids]
+
+    with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+        codes = list(pool.map(
+            lambda item: _book_batch(client, event["id"], item[1], f"user{item[0]}@example.com").status_code,
+            enumerate(batches),
+        ))
+
+    assert set(codes) <= {201, 409}
+    counts = _booked_counts(event["id"])
+    assert all(count <= 2 for count in counts)
+    expected = [0, 0, 0]
+    for batch, code in zip(batches, codes):
+        if code == 201:
+            for slot_id in batch:
+                expected[slot_ids.index(slot_id)] += 1
+    assert counts == expected
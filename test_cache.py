@@ -0,0 +1,91 @@
+import time
+
+import cache
+from cache import MemoryCache
+
+
+def test_memory_cache_evicts_least_recently_used():
+    store = MemoryCache(max_entries=2, default_ttl=60)
+    store.set("a", 1)
+    store.set("b", 2)
+    assert store.get("a") == 1  # "b" is now the least recently used
+    store.set("c", 3)
+
+    assert store.get("b") is None
+    assert store.get("a") == 1
+    assert store.get("c") == 3
+    assert store.stats()["evictions"] == 1
+
+
+def test_memory_cache_expires_entries():
+    store = MemoryCache(max_entries=10, default_ttl=60)
+    store.set("short", "value", ttl=0.01)
+    time.sleep(0.02)
+
+    assert store.get("short") is None
+    stats = store.stats()
+    assert stats["expirations"] == 1
+    assert stats["misses"] == 1
+
+
+def test_delete_prefix_does_not_touch_similar_keys():
+    store = MemoryCache()
+    store.set(cache.event_key(1, "full"), {})
+    store.set(cache.event_key(10, "full"), {})
+    store.delete_prefix("event:1:")
+
+    assert store.get(cache.event_key(1, "full")) is None
+    assert store.get(cache.event_key(10, "full")) == {}
+
+
+def test_event_reads_are_cached_and_invalidated_by_writes(client, count_queries):
+    event = client.post("/events/", json={
+        "title": "Workshop",
+        "time_slots": ["2030-01-15T10:00:00"],
+        "max_bookings_per_slot": 2,
+    }).json()
+    url = f"/events/{event['id']}/availability"
+
+    assert client.get(url).json()[0]["booked"] == 0
+    count_queries.reset()
+    assert client.get(url).json()[0]["booked"] == 0
+    assert count_queries.count == 0  # served from the cache
+
+    client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": event["time_slots"][0]["id"],
+        "user_name": "Alice",
+        "user_email": "alice@example.com",
+    })
+    assert client.get(url).json()[0]["booked"] == 1
+
+    client.delete(f"/events/{event['id']}")
+    assert client.get(url).status_code == 404
+    assert client.get("/events/").json()["items"] == []
+
+
+def test_load_racing_an_invalidation_is_not_cached(db_session):
+    key = cache.event_key(1, "summary")
+    scope = cache.event_scope(1)
+
+    def load_then_get_invalidated():
+        # The reader has read the old row; a booking commits and invalidates
+        # before the reader gets to store it.
+        stale = {"booked": 0}
+        cache.invalidate_event(1)
+        return stale
+
+    assert cache.cache.get_or_load(key, load_then_get_invalidated, scope=scope) == {"booked": 0}
+    assert cache.cache.get(key) is None
+
+    # The next load, which starts after the invalidation, is cached again.
+    assert cache.cache.get_or_load(key, lambda: {"booked": 1}, scope=scope) == {"booked": 1}
+    assert cache.cache.get(key) == {"booked": 1}
+
+
+def test_generation_guard_is_per_scope():
+    store = MemoryCache()
+    other = store.generation("event:2")
+    store.bump_generation("event:1")
+
+    store.set("event:2:full", {}, generation=("event:2", other))
+    assert store.get("event:2:full") == {}
@@ -0,0 +1,106 @@
+import pytest
+
+import cache
+import conditional
+
+
+def _event(client, **fields):
+    response = client.post("/events/", json={
+        "title": "Polled event",
+        "time_slots": ["2030-01-01T09:00:00", "2030-01-01T10:00:00"],
+        "max_bookings_per_slot": 3,
+        **fields,
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def _book(client, event, slot_index=0, email="poller@example.com"):
+    response = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": event["time_slots"][slot_index]["id"], "user_name": "Poller", "user_email": email,
+    })
+    assert response.status_code == 201
+
+
+@pytest.mark.parametrize("url", ["/events/{id}", "/events/{id}?view=summary", "/events/{id}/availability"])
+def test_unchanged_event_answers_304_without_loading_slots(client, count_queries, url):
+    event = _event(client)
+    url = url.format(id=event["id"])
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"') and first.headers["cache-control"] == "no-cache"
+
+    # Even with a cold cache, only the event's version is read.
+    cache.cache.clear()
+    count_queries.reset()
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+    assert count_queries.count == 1
+    assert "time_slots" not in count_queries.statements[0] and "bookings" not in count_queries.statements[0]
+
+
+def test_booking_changes_the_etag(client):
+    event = _event(client)
+    url = f"/events/{event['id']}/availability"
+    etag = client.get(url).headers["etag"]
+
+    _book(client, event, slot_index=1)
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[1]["booked"] == 1
+    # The full and summary views of the event share the new tag.
+    assert client.get(f"/events/{event['id']}").headers["etag"] == response.headers["etag"]
+
+
+def test_materializing_an_occurrence_changes_the_etag(client):
+    event = _event(client, time_slots=[], recurrence={"frequency": "daily", "starts_at": "2030-01-01T09:00:00"})
+    etag = client.get(f"/events/{event['id']}").headers["etag"]
+
+    booked = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "start_time": "2030-01-03T09:00:00", "user_name": "Poller", "user_email": "poller@example.com",
+    })
+    assert booked.status_code == 201
+
+    response = client.get(f"/events/{event['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["time_slots"]) == 1
+
+
+def test_deleted_event_is_not_reported_unchanged(client):
+    event = _event(client)
+    etag = client.get(f"/events/{event['id']}").headers["etag"]
+    assert client.delete(f"/events/{event['id']}").status_code == 204
+    assert client.get(f"/events/{event['id']}", headers={"If-None-Match": etag}).status_code == 404
+
+
+def test_event_list_pages_are_conditional(client):
+    event = _event(client)
+    for url in ("/events/", "/events/?has_availability=true"):
+        etag = client.get(url).headers["etag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # A new event on the page changes its tag.
+    etag = client.get("/events/").headers["etag"]
+    _event(client, title="Another")
+    assert client.get("/events/", headers={"If-None-Match": etag}).status_code == 200
+
+    # So does a booking of an event on an availability-filtered page.
+    url = "/events/?has_availability=true"
+    etag = client.get(url).headers["etag"]
+    _book(client, event)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = conditional.event_etag(1, 2)
+    assert conditional.etag_matches(etag, etag)
+    assert conditional.etag_matches('"event-1-2"', etag)
+    assert conditional.etag_matches('W/"other", W/"event-1-2"', etag)
+    assert conditional.etag_matches("*", etag)
+    assert not conditional.etag_matches('W/"event-1-3"', etag)
+    assert not conditional.etag_matches(None, etag)
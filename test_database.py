@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+
+import database
+from database import create_db_engine, pool_stats
+
+
+def _pragmas(conn):
+    return {
+        name: conn.execute(text(f"PRAGMA {name}")).scalar()
+        for name in ("journal_mode", "synchronous", "busy_timeout", "foreign_keys")
+    }
+
+
+def test_sqlite_connections_get_pragmas(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.connect() as conn:
+        # synchronous=NORMAL is 1.
+        assert _pragmas(conn) == {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "busy_timeout": database.SQLITE_BUSY_TIMEOUT_MS,
+            "foreign_keys": 1,
+        }
+    engine.dispose()
+
+
+def test_async_sqlite_connections_get_pragmas(tmp_path):
+    pytest.importorskip("aiosqlite")
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}", is_async=True)
+
+    async def read():
+        try:
+            async with engine.connect() as conn:
+                return await conn.run_sync(_pragmas)
+        finally:
+            await engine.dispose()
+
+    pragmas = asyncio.run(read())
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["foreign_keys"] == 1
+    assert pool_stats(engine)["pool"] == "InstrumentedAsyncQueuePool"
+
+
+def test_pool_stats_count_checkouts_and_timeouts(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(database, "DB_POOL_TIMEOUT", 0.05)
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+
+    with engine.connect():
+        stats = pool_stats(engine)
+        assert stats["size"] == 1
+        assert stats["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = pool_stats(engine)
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["checked_out"] == 0
+    assert stats["wait_seconds_max"] >= 0.05
+
+    # dispose() recreates the pool; the counters carry over.
+    engine.dispose()
+    assert pool_stats(engine)["timeouts"] == 1
+
+
+def test_pool_stats_endpoint(client):
+    client.get("/events/")
+    stats = client.get("/stats/pool").json()["sync"]
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert stats["checkouts"] >= 1
@@ -0,0 +1,121 @@
+import datetime
+
+import pytest
+
+import email_service
+import models
+from database import SessionLocal
+
+
+class RecordingSender:
+    """Stand-in for SMTPSender that records messages and can fail on demand."""
+
+    def __init__(self, fail=False):
+        self.messages = []
+        self.fail = fail
+
+    def send(self, message):
+        if self.fail:
+            raise OSError("connection refused")
+        self.messages.append(message)
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_ENABLED", True)
+
+
+def _book(client, email="alice@example.com"):
+    event = client.post("/events/", json={
+        "title": "Pottery <basics>",
+        "time_slots": ["2030-01-15T10:00:00"],
+        "max_bookings_per_slot": 5,
+    }).json()
+    response = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": event["time_slots"][0]["id"], "user_name": "Alice", "user_email": email,
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_booking_queues_confirmation_in_its_transaction(client, db_session, outbox):
+    booking = _book(client)
+
+    item = db_session.query(models.EmailOutbox).one()
+    assert (item.kind, item.status, item.booking_id) == ("confirmation", "pending", booking["id"])
+    assert (item.recipient, item.event_title) == ("alice@example.com", "Pottery <basics>")
+    assert item.slot_start == datetime.datetime(2030, 1, 15, 10)
+
+
+def test_rejected_booking_queues_nothing(client, db_session, outbox):
+    _book(client)
+    duplicate = client.post("/bookings/events/1/bookings", json={
+        "time_slot_id": 1, "user_name": "Alice", "user_email": "alice@example.com",
+    })
+    assert duplicate.status_code == 409
+    assert db_session.query(models.EmailOutbox).count() == 1
+
+
+def test_drain_sends_batch_and_escapes_values(client, db_session, outbox):
+    for n in range(3):
+        _book(client, email=f"user{n}@example.com")
+    sender = RecordingSender()
+
+    assert email_service.drain_outbox(SessionLocal, sender, batch_size=2) == 2
+    assert email_service.drain_outbox(SessionLocal, sender, batch_size=2) == 1
+    assert email_service.drain_outbox(SessionLocal, sender, batch_size=2) == 0
+
+    assert [m["To"] for m in sender.messages] == [f"user{n}@example.com" for n in range(3)]
+    assert sender.messages[0]["Subject"] == "Booking Confirmation - Pottery <basics>"
+    assert "Pottery &lt;basics&gt;" in sender.messages[0].get_content()
+    assert {item.status for item in db_session.query(models.EmailOutbox)} == {"sent"}
+
+
+def test_failed_send_backs_off_then_gives_up(client, db_session, outbox, monkeypatch):
+    monkeypatch.setattr(email_service, "OUTBOX_MAX_ATTEMPTS", 2)
+    _book(client)
+    clock = [datetime.datetime(2030, 1, 1)]
+
+    def drain(sender):
+        return email_service.drain_outbox(SessionLocal, sender, now=lambda: clock[0])
+
+    assert drain(RecordingSender(fail=True)) == 1
+    item = db_session.query(models.EmailOutbox).one()
+    assert (item.status, item.attempts) == ("pending", 1)
+    assert item.next_attempt_at == clock[0] + datetime.timedelta(seconds=email_service.backoff_seconds(1))
+
+    assert drain(RecordingSender(fail=True)) == 0  # not due yet
+    clock[0] = item.next_attempt_at
+    assert drain(RecordingSender(fail=True)) == 1
+    db_session.expire_all()
+    item = db_session.query(models.EmailOutbox).one()
+    assert (item.status, item.attempts, item.last_error) == ("failed", 2, "connection refused")
+
+
+def test_worker_reuses_one_smtp_connection(client, db_session, outbox):
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    handler_module = pytest.importorskip("aiosmtpd.handlers")
+
+    received = []
+
+    class Handler:
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope.rcpt_tos)
+            return "250 OK"
+
+    controller = controller_module.Controller(Handler(), hostname="127.0.0.1", port=0)
+    controller.start()
+    try:
+        for n in range(3):
+            _book(client, email=f"user{n}@example.com")
+        sender = email_service.SMTPSender(
+            host="127.0.0.1", port=controller.server.sockets[0].getsockname()[1],
+            username=None, starttls=False,
+        )
+        email_service.run_worker_once(SessionLocal, sender)
+        sender.close()
+    finally:
+        controller.stop()
+
+    assert received == [[f"user{n}@example.com"] for n in range(3)]
+    assert sender.connections_opened == 1
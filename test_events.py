@@ -0,0 +1,154 @@
+def _create_event(client, title="Workshop", slots=("2030-01-15T10:00:00",), capacity=1):
+    response = client.post("/events/", json={
+        "title": title,
+        "description": "Hands-on session",
+        "time_slots": list(slots),
+        "max_bookings_per_slot": capacity,
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def _book(client, event, slot_index=0, email="alice@example.com"):
+    slot_id = event["time_slots"][slot_index]["id"]
+    response = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": slot_id,
+        "user_name": "Alice",
+        "user_email": email,
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_event_list_pages_with_cursor(client):
+    created = [_create_event(client, title=f"Event {i}")["id"] for i in range(5)]
+
+    first = client.get("/events/", params={"limit": 2}).json()
+    assert [e["id"] for e in first["items"]] == created[:2]
+    assert first["next_cursor"] == created[1]
+    assert "time_slots" not in first["items"][0]
+
+    second = client.get("/events/", params={"limit": 2, "after_id": first["next_cursor"]}).json()
+    assert [e["id"] for e in second["items"]] == created[2:4]
+
+    last = client.get("/events/", params={"limit": 2, "after_id": second["next_cursor"]}).json()
+    assert [e["id"] for e in last["items"]] == created[4:]
+    assert last["next_cursor"] is None
+
+
+def test_event_list_filters(client):
+    yoga = _create_event(client, title="Yoga 100%", slots=("2030-03-01T09:00:00",))
+    _create_event(client, title="Yoga basics", slots=("2030-05-01T09:00:00",))
+    full = _create_event(client, title="Pottery", slots=("2030-03-02T09:00:00",))
+    _book(client, full)
+
+    def ids(**params):
+        return [e["id"] for e in client.get("/events/", params=params).json()["items"]]
+
+    # LIKE wildcards in the prefix are matched literally.
+    assert ids(title_prefix="Yoga 100%") == [yoga["id"]]
+    assert len(ids(title_prefix="Yoga")) == 2
+    assert full["id"] not in ids(has_availability=True)
+    assert ids(starts_after="2030-03-01T00:00:00", starts_before="2030-04-01T00:00:00") == [yoga["id"], full["id"]]
+    assert ids(has_availability=True, starts_before="2030-04-01T00:00:00") == [yoga["id"]]
+
+
+def test_event_list_rejects_oversized_limit(client):
+    assert client.get("/events/", params={"limit": 10_000}).status_code == 422
+
+
+def test_availability_reports_counts_per_slot(client):
+    event = _create_event(client, slots=("2030-01-15T11:00:00", "2030-01-15T10:00:00"), capacity=2)
+    booked_slot = event["time_slots"][0]
+    _book(client, event)
+
+    response = client.get(f"/events/{event['id']}/availability")
+
+    assert response.status_code == 200
+    slots = {s["slot_id"]: s for s in response.json()}
+    assert slots[booked_slot["id"]] == {
+        "slot_id": booked_slot["id"],
+        "start_time": booked_slot["start_time"],
+        "booked": 1,
+        "capacity": 2,
+        "remaining": 1,
+    }
+    # Slots are ordered by start time.
+    assert [s["start_time"] for s in response.json()] == ["2030-01-15T10:00:00", "2030-01-15T11:00:00"]
+
+
+def test_event_summary_view_has_no_bookings(client):
+    event = _create_event(client, capacity=3)
+    _book(client, event)
+
+    summary = client.get(f"/events/{event['id']}", params={"view": "summary"}).json()
+
+    assert summary["title"] == "Workshop"
+    assert summary["time_slots"][0]["remaining"] == 2
+    assert "bookings" not in summary["time_slots"][0]
+    assert "alice@example.com" not in str(summary)
+
+
+def test_availability_of_event_without_slots_and_missing_event(client):
+    # A recurring event has no slot rows until an occurrence is booked.
+    event = client.post("/events/", json={
+        "title": "Open gym",
+        "recurrence": {"frequency": "daily", "starts_at": "2030-01-01T07:00:00"},
+    }).json()
+
+    assert client.get(f"/events/{event['id']}/availability").json() == []
+    assert client.get("/events/9999/availability").status_code == 404
+    assert client.get("/events/9999", params={"view": "summary"}).status_code == 404
+
+
+def test_create_event_returns_slots_in_submitted_order(client):
+    slots = ["2030-01-15T12:00:00", "2030-01-15T09:00:00", "2030-01-15T10:00:00"]
+    event = _create_event(client, slots=slots)
+
+    assert [s["start_time"] for s in event["time_slots"]] == slots
+    assert all(s["bookings"] == [] and s["event_id"] == event["id"] for s in event["time_slots"])
+
+
+def test_bulk_create_from_json_array_reports_item_errors(client):
+    response = client.post("/events/bulk", json=[
+        {"title": "Monday class", "time_slots": ["2030-01-06T18:00:00", "2030-01-13T18:00:00"]},
+        {"description": "missing title", "time_slots": []},
+        {"title": "Tuesday class", "time_slots": ["2030-01-07T18:00:00"]},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["index"] for item in body["created"]] == [0, 2]
+    assert [error["index"] for error in body["errors"]] == [1]
+
+    monday = client.get(f"/events/{body['created'][0]['id']}").json()
+    assert monday["title"] == "Monday class"
+    assert len(monday["time_slots"]) == 2
+
+
+def test_bulk_create_from_ndjson_stream(client):
+    lines = [
+        '{"title": "Event A", "time_slots": ["2030-01-06T18:00:00"]}',
+        '{not json',
+        '{"title": "Event B", "time_slots": ["2030-01-07T18:00:00"]}',
+    ]
+
+    def body():
+        # Split mid-line to exercise reassembly of lines across chunks.
+        payload = ("\n".join(lines) + "\n").encode()
+        yield payload[:20]
+        yield payload[20:]
+
+    response = client.post(
+        "/events/bulk", content=body(), headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    body = response.json()
+    assert [item["index"] for item in body["created"]] == [0, 2]
+    assert body["errors"][0]["index"] == 1
+    titles = [e["title"] for e in client.get("/events/").json()["items"]]
+    assert titles == ["Event A", "Event B"]
+
+
+def test_bulk_create_rejects_non_array_json(client):
+    assert client.post("/events/bulk", json={"title": "x"}).status_code == 400
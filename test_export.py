@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+
+import export
+from database import SessionLocal
+
+
+def _event(client, slots, capacity=5):
+    response = client.post("/events/", json={"title": "Export", "time_slots": slots, "max_bookings_per_slot": capacity})
+    assert response.status_code == 201
+    return response.json()
+
+
+def _book(client, event, index, name, email):
+    response = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": event["time_slots"][index]["id"], "user_name": name, "user_email": email,
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_csv_export_lists_bookings_by_slot_start_time(client):
+    event = _event(client, ["2030-06-02T10:00:00", "2030-06-01T09:00:00"])
+    late = _book(client, event, 0, "Ann", "ann@example.com")
+    early = _book(client, event, 1, "Bob, Jr.", "bob@example.com")
+    _book(client, _event(client, ["2030-06-01T09:00:00"]), 0, "Other", "other@example.com")
+
+    response = client.get(f"/events/{event['id']}/bookings/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.headers["content-disposition"] == f'attachment; filename="event-{event["id"]}-bookings.csv"'
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == list(export.EXPORT_COLUMNS)
+    assert rows[1:] == [
+        [str(early["id"]), str(early["time_slot_id"]), "2030-06-01T09:00:00", "Bob, Jr.", "bob@example.com", early["created_at"]],
+        [str(late["id"]), str(late["time_slot_id"]), "2030-06-02T10:00:00", "Ann", "ann@example.com", late["created_at"]],
+    ]
+
+
+def test_csv_export_writes_formulas_as_text(client):
+    event = _event(client, ["2030-06-01T09:00:00"])
+    _book(client, event, 0, "=HYPERLINK(\"http://x\")", "f@example.com")
+
+    rows = list(csv.reader(io.StringIO(client.get(f"/events/{event['id']}/bookings/export").text)))
+    assert rows[1][3] == "'=HYPERLINK(\"http://x\")"
+
+
+def test_ndjson_export_streams_in_batches(client, monkeypatch, count_queries):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    event = _event(client, ["2030-06-01T09:00:00", "2030-06-01T10:00:00"])
+    booked = [_book(client, event, index % 2, f"User {index}", f"user{index}@example.com") for index in range(5)]
+
+    count_queries.reset()
+    response = client.get(f"/events/{event['id']}/bookings/export", params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    # The existence check, then one query whose rows are fetched in batches.
+    assert count_queries.count == 2
+
+    # The test client buffers the body, so the chunks are taken from the stream itself.
+    chunks = list(export.stream_bookings(SessionLocal, event["id"], "ndjson"))
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+    assert b"".join(chunks) == response.content
+    items = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    slot_order = sorted(booked, key=lambda b: (b["time_slot_id"], b["id"]))
+    assert [item["id"] for item in items] == [b["id"] for b in slot_order]
+    assert list(items[0]) == list(export.EXPORT_COLUMNS)
+    assert items[0]["start_time"] == "2030-06-01T09:00:00"
+
+
+def test_export_of_an_event_without_bookings_or_unknown_event(client):
+    event = _event(client, ["2030-06-01T09:00:00"])
+    assert client.get(f"/events/{event['id']}/bookings/export").text.strip() == ",".join(export.EXPORT_COLUMNS)
+    assert client.get(f"/events/{event['id']}/bookings/export", params={"format": "ndjson"}).content == b""
+    assert client.get("/events/999999/bookings/export").status_code == 404
+    assert client.get(f"/events/{event['id']}/bookings/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,134 @@
+import datetime
+
+import ics
+import models
+from database import SessionLocal
+
+
+def _event(client, **fields):
+    fields.setdefault("title", "Yoga")
+    response = client.post("/events/", json=fields)
+    assert response.status_code == 201
+    return response.json()
+
+
+def _book(client, event_id, email, **slot):
+    response = client.post(f"/bookings/events/{event_id}/bookings", json={"user_name": "Sam", "user_email": email, **slot})
+    assert response.status_code == 201
+    return response.json()
+
+
+def _unfold(body: str):
+    assert all(len(line.encode()) <= 75 for line in body.split("\r\n"))
+    return body.replace("\r\n ", "").split("\r\n")
+
+
+def _vevents(lines):
+    events, current = [], None
+    for line in lines:
+        if line == "BEGIN:VEVENT":
+            current = {}
+        elif line == "END:VEVENT":
+            events.append(current)
+            current = None
+        elif current is not None:
+            name, _, value = line.partition(":")
+            current.setdefault(name, []).append(value)
+    return events
+
+
+def test_event_feed_lists_slots_and_the_recurrence_rule(client):
+    event = _event(
+        client,
+        title="Yoga, for everyone; bring a mat",
+        description="Line one\nLine two",
+        time_slots=["2030-05-02T18:00:00", "2030-05-01T18:00:00"],
+        recurrence={
+            "frequency": "weekly", "interval": 2, "weekdays": [0, 4], "starts_at": "2030-01-02T08:00:00",
+            "count": 10, "exclusions": ["2030-01-14T08:00:00"],
+        },
+    )
+    # A materialized occurrence is covered by the RRULE, not listed again.
+    _book(client, event["id"], "a@example.com", start_time="2030-01-18T08:00:00")
+
+    response = client.get(f"/events/{event['id']}.ics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/calendar; charset=utf-8"
+    lines = _unfold(response.text)
+    assert lines[0] == "BEGIN:VCALENDAR" and lines[-2:] == ["END:VCALENDAR", ""]
+    assert "X-WR-CALNAME:Yoga\\, for everyone\\; bring a mat" in lines
+    rule, *slots = _vevents(lines)
+    assert rule["UID"] == [f"event-{event['id']}-recurrence@bookmyslot"]
+    # Wednesday is not a listed weekday, so the first occurrence is Friday Jan 4.
+    assert rule["DTSTART"] == ["20300104T080000Z"]
+    assert rule["RRULE"] == ["FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR;COUNT=10"]
+    assert rule["EXDATE"] == ["20300114T080000Z"]
+    assert rule["DESCRIPTION"] == ["Line one\\nLine two"]
+    assert [slot["DTSTART"] for slot in slots] == [["20300501T180000Z"], ["20300502T180000Z"]]
+    assert slots[0]["DURATION"] == [f"PT{ics.ICS_SLOT_MINUTES}M"]
+
+
+def test_rrule_writes_whichever_of_until_and_count_ends_first():
+    rule = models.RecurrenceRule(frequency="daily", interval=1, starts_at=datetime.datetime(2030, 1, 1, 9), count=5)
+    rule.until = datetime.datetime(2030, 1, 3, 9)
+    assert ics.rrule_lines(rule)[1] == "RRULE:FREQ=DAILY;INTERVAL=1;UNTIL=20300103T090000Z"
+    rule.until = datetime.datetime(2030, 1, 30, 9)
+    assert ics.rrule_lines(rule)[1] == "RRULE:FREQ=DAILY;INTERVAL=1;COUNT=5"
+    rule.until = datetime.datetime(2029, 12, 31)
+    assert ics.rrule_lines(rule) is None
+
+
+def test_long_lines_are_folded_on_character_boundaries():
+    line = "SUMMARY:" + "é" * 100
+    folded = ics.fold(line)
+    assert all(len(part) <= 75 for part in folded.split(b"\r\n"))
+    assert folded.decode("utf-8").replace("\r\n ", "") == line + "\r\n"
+
+
+def test_user_feed_lists_bookings_and_is_conditional(client, count_queries):
+    event = _event(client, title="Pottery", time_slots=["2030-05-01T18:00:00", "2030-05-08T18:00:00"], max_bookings_per_slot=2)
+    first = _book(client, event["id"], "sam@example.com", time_slot_id=event["time_slots"][0]["id"])
+    _book(client, event["id"], "other@example.com", time_slot_id=event["time_slots"][1]["id"])
+    url = "/bookings/users/sam@example.com/bookings.ics"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    (vevent,) = _vevents(_unfold(response.text))
+    assert vevent["UID"] == [f"booking-{first['id']}@bookmyslot"]
+    assert vevent["SUMMARY"] == ["Pottery"]
+    assert vevent["DTSTART"] == ["20300501T180000Z"]
+
+    # An unchanged feed is answered from one aggregate query.
+    count_queries.reset()
+    unchanged = client.get(url, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert count_queries.count == 1
+
+    second = _book(client, event["id"], "sam@example.com", time_slot_id=event["time_slots"][1]["id"])
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(_vevents(_unfold(changed.text))) == 2
+
+    assert client.delete(f"/bookings/{second['id']}").status_code == 200
+    assert client.get(url, headers={"If-None-Match": changed.headers["etag"]}).status_code == 200
+    assert client.get("/bookings/users/not-an-email/bookings.ics").status_code == 400
+
+
+def test_event_feed_is_conditional_and_streamed_in_batches(client, monkeypatch):
+    monkeypatch.setattr(ics, "ICS_BATCH_SIZE", 2)
+    event = _event(client, time_slots=[f"2030-05-0{day}T18:00:00" for day in range(1, 6)])
+    url = f"/events/{event['id']}.ics"
+
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    _book(client, event["id"], "a@example.com", time_slot_id=event["time_slots"][0]["id"])
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/events/999999.ics").status_code == 404
+
+    # The header and first batch, two more batches, then the end of the calendar.
+    chunks = list(ics.stream_event_calendar(SessionLocal, event["id"]))
+    assert [chunk.count(b"BEGIN:VEVENT") for chunk in chunks] == [2, 2, 1, 0]
+    assert chunks[-1] == b"END:VCALENDAR\r\n"
@@ -0,0 +1,90 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select, update
+
+import idempotency
+import models
+from database import SessionLocal
+
+
+def _event(client):
+    event = client.post("/events/", json={
+        "title": "Retried", "time_slots": ["2030-01-01T09:00:00"], "max_bookings_per_slot": 5,
+    }).json()
+    return event["id"], event["time_slots"][0]["id"]
+
+
+def _book(client, event_id, slot_id, key, email="mobile@example.com"):
+    return client.post(
+        f"/bookings/events/{event_id}/bookings",
+        json={"time_slot_id": slot_id, "user_name": "Mobile", "user_email": email},
+        headers={"Idempotency-Key": key},
+    )
+
+
+def _bookings():
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count(models.Booking.id)))
+    finally:
+        db.close()
+
+
+def test_retry_replays_the_original_response(client, count_queries):
+    event_id, slot_id = _event(client)
+    first = _book(client, event_id, slot_id, "key-1")
+    assert first.status_code == 201
+    assert idempotency.REPLAYED_HEADER not in first.headers
+
+    count_queries.reset()
+    retry = _book(client, event_id, slot_id, "key-1")
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers[idempotency.REPLAYED_HEADER] == "true"
+    # Only the key was looked up; admission did not run again.
+    assert count_queries.count == 1
+    assert _bookings() == 1
+
+    # Without a key, the retry is a new request and finds the existing booking.
+    assert client.post(f"/bookings/events/{event_id}/bookings", json={
+        "time_slot_id": slot_id, "user_name": "Mobile", "user_email": "mobile@example.com",
+    }).status_code == 409
+
+
+def test_key_reused_for_another_request_is_rejected(client):
+    event_id, slot_id = _event(client)
+    assert _book(client, event_id, slot_id, "key-1").status_code == 201
+    assert _book(client, event_id, slot_id, "key-1", email="other@example.com").status_code == 422
+    assert _book(client, event_id, slot_id, "x" * 300).status_code == 400
+
+
+def test_failed_requests_are_not_stored(client):
+    event_id, slot_id = _event(client)
+    assert _book(client, event_id, 999999, "key-1").status_code == 404
+    # The key was not used up by the failure.
+    assert _book(client, event_id, slot_id, "key-1").status_code == 201
+
+
+def test_expired_key_runs_the_request_again(client):
+    event_id, slot_id = _event(client)
+    _book(client, event_id, slot_id, "key-1")
+    db = SessionLocal()
+    try:
+        db.execute(update(models.IdempotencyKey).values(expires_at=datetime.datetime(2000, 1, 1)))
+        db.commit()
+        assert _book(client, event_id, slot_id, "key-1").status_code == 409
+        assert _book(client, event_id, slot_id, "key-1", email="new@example.com").status_code == 201
+        assert idempotency.purge_expired_keys(db) == 0  # the expired row was replaced
+    finally:
+        db.close()
+
+
+def test_concurrent_attempts_with_one_key_book_once(client):
+    event_id, slot_id = _event(client)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: _book(client, event_id, slot_id, "storm"), range(8)))
+
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert _bookings() == 1
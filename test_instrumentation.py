@@ -0,0 +1,133 @@
+import logging
+
+import pytest
+
+import cache
+import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    instrumentation.metrics.reset()
+    yield
+    instrumentation.metrics.reset()
+
+
+def _event(client):
+    response = client.post("/events/", json={
+        "title": "Instrumented",
+        "time_slots": ["2030-01-01T09:00:00", "2030-01-01T10:00:00"],
+        "max_bookings_per_slot": 2,
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def _metric(text, name, route, method="GET", status="200"):
+    prefix = f'{name}{{method="{method}",route="{route}",status="{status}"}} '
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return None
+
+
+def test_metrics_are_labelled_by_route_template(client):
+    event = _event(client)
+    cache.cache.clear()
+    for _ in range(3):
+        assert client.get(f"/events/{event['id']}").status_code == 200
+    assert client.get("/events/999999").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+
+    assert _metric(text, "http_requests_total", "/events/{event_id}") == 3
+    assert _metric(text, "http_requests_total", "/events/{event_id}", status="404") == 1
+    assert _metric(text, "http_request_duration_seconds_count", "/events/{event_id}") == 3
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/events/{event_id}",status="200",le="+Inf"} 3' in text
+    # The first read missed the cache and queried the database.
+    assert _metric(text, "db_statements_total", "/events/{event_id}") >= 1
+    assert _metric(text, "db_statement_seconds_total", "/events/{event_id}") > 0
+    # The event row the first read loaded.
+    assert _metric(text, "db_rows_total", "/events/{event_id}") >= 1
+
+
+def test_rows_of_core_selects_and_streams_are_counted(client):
+    event = _event(client)
+    for slot in event["time_slots"]:
+        response = client.post(f"/bookings/events/{event['id']}/bookings", json={
+            "time_slot_id": slot["id"], "user_name": "Counted", "user_email": "rows@example.com",
+        })
+        assert response.status_code == 201
+
+    assert client.get("/bookings/users/rows@example.com/bookings").status_code == 200
+    assert client.get(f"/events/{event['id']}/bookings/export").status_code == 200
+    text = client.get("/metrics").text
+
+    # Column selects encoded by the fast JSON path: the two booking rows.
+    assert _metric(text, "db_rows_total", "/bookings/users/{email}/bookings") == 2
+    # The existence check's row plus the two streamed rows.
+    assert _metric(text, "db_rows_total", "/events/{event_id}/bookings/export") == 3
+
+
+def test_unmatched_paths_share_one_label(client):
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+    text = client.get("/metrics").text
+    assert _metric(text, "http_requests_total", "unmatched", status="404") == 2
+
+
+def test_statements_are_attributed_to_the_request():
+    stats = instrumentation.RequestStats()
+    for _ in range(instrumentation.N_PLUS_ONE_THRESHOLD):
+        stats.record("SELECT * FROM bookings WHERE time_slot_id = ?", 0.001, -1)
+    stats.record("UPDATE time_slots SET booked_count = booked_count + 1", 0.002, 1)
+
+    assert stats.statements == instrumentation.N_PLUS_ONE_THRESHOLD + 1
+    assert stats.rows == 1
+    assert stats.repeated_selects() == [
+        ("SELECT * FROM bookings WHERE time_slot_id = ?", instrumentation.N_PLUS_ONE_THRESHOLD)
+    ]
+    # Slowest statement first.
+    assert stats.breakdown()[0][0] == "SELECT * FROM bookings WHERE time_slot_id = ?"
+
+
+def test_n_plus_one_and_slow_requests_are_flagged(client, monkeypatch, caplog):
+    event = _event(client)
+    monkeypatch.setattr(instrumentation, "SLOW_REQUEST_MS", 0)
+
+    from database import SessionLocal
+    from fastapi import APIRouter
+    from sqlalchemy import text as sql_text
+    from main import app
+
+    # A deliberately N+1 endpoint: the same SELECT over and over.
+    router = APIRouter()
+
+    @router.get("/test/n-plus-one")
+    def n_plus_one():
+        db = SessionLocal()
+        try:
+            for _ in range(instrumentation.N_PLUS_ONE_THRESHOLD):
+                db.execute(sql_text("SELECT COUNT(*) FROM bookings WHERE time_slot_id = :id"), {"id": 1})
+        finally:
+            db.close()
+        return {}
+
+    app.include_router(router)
+    try:
+        with caplog.at_level(logging.WARNING, logger="instrumentation"):
+            assert client.get("/test/n-plus-one").status_code == 200
+            assert client.get(f"/events/{event['id']}").status_code == 200
+    finally:
+        app.router.routes = [r for r in app.router.routes if getattr(r, "path", None) != "/test/n-plus-one"]
+
+    text = client.get("/metrics").text
+    assert _metric(text, "http_requests_n_plus_one_total", "/test/n-plus-one") == 1
+    assert _metric(text, "http_requests_n_plus_one_total", "/events/{event_id}") == 0
+    assert _metric(text, "http_requests_slow_total", "/events/{event_id}") == 1
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("Possible N+1 query in GET /test/n-plus-one" in m for m in messages)
+    assert any(m.startswith("Slow request GET /events/{event_id}") and "Top statements" in m for m in messages)
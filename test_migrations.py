@@ -0,0 +1,91 @@
+from sqlalchemy import create_engine, inspect, text
+
+import migrations
+
+# Schema of a database created before the booking admission changes.
+OLD_SCHEMA = [
+    "CREATE TABLE events (id INTEGER PRIMARY KEY, title VARCHAR, description VARCHAR, max_bookings_per_slot INTEGER)",
+    "CREATE TABLE time_slots (id INTEGER PRIMARY KEY, event_id INTEGER REFERENCES events (id), start_time DATETIME)",
+    "CREATE TABLE bookings (id INTEGER PRIMARY KEY, time_slot_id INTEGER REFERENCES time_slots (id), "
+    "user_name VARCHAR, user_email VARCHAR, created_at DATETIME)",
+]
+
+
+def _old_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO events VALUES (1, 'Old event', NULL, 3)"))
+        conn.execute(text("INSERT INTO time_slots VALUES (1, 1, '2030-01-01 10:00:00'), (2, 1, '2030-01-01 11:00:00')"))
+        conn.execute(text(
+            "INSERT INTO bookings VALUES "
+            "(1, 1, 'A', 'a@example.com', NULL), (2, 1, 'B', 'b@example.com', NULL), (3, 2, 'A', 'a@example.com', NULL)"
+        ))
+    return engine
+
+
+def test_upgrade_backfills_booked_count_and_adds_uniqueness(tmp_path):
+    engine = _old_database(tmp_path)
+
+    migrations.upgrade(engine)
+    migrations.upgrade(engine)  # a second run is a no-op
+
+    with engine.connect() as conn:
+        counts = dict(conn.execute(text("SELECT id, booked_count FROM time_slots")).all())
+        assert counts == {1: 2, 2: 1}
+        assert migrations._has_unique(conn, "bookings", "uq_bookings_time_slot_user_email")
+    index_names = {i["name"] for i in inspect(engine).get_indexes("time_slots")}
+    assert "ix_time_slots_event_id_start_time" in index_names
+
+
+def test_upgrade_links_slots_to_recurrence_rules(tmp_path):
+    engine = _old_database(tmp_path)
+
+    migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        assert "recurrence_rule_id" in migrations._columns(conn, "time_slots")
+        assert migrations._has_unique(conn, "time_slots", "uq_time_slots_rule_start_time")
+        assert conn.execute(text("SELECT COUNT(*) FROM time_slots WHERE recurrence_rule_id IS NULL")).scalar() == 2
+
+
+def test_upgrade_leaves_duplicate_bookings_alone(tmp_path):
+    engine = _old_database(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO bookings VALUES (4, 2, 'A', 'a@example.com', NULL)"))
+
+    migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        assert not migrations._has_unique(conn, "bookings", "uq_bookings_time_slot_user_email")
+        assert conn.execute(text("SELECT COUNT(*) FROM bookings")).scalar() == 4
+
+
+def test_upgrade_adds_event_versions(tmp_path):
+    engine = _old_database(tmp_path)
+
+    migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM events")).scalars().all() == [1]
+
+
+def test_upgrade_makes_event_deletion_cascade(tmp_path):
+    engine = _old_database(tmp_path)
+
+    migrations.upgrade(engine)
+    migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        assert migrations._foreign_key_actions(conn, "time_slots")[("event_id", "events")][1] == "CASCADE"
+        assert migrations._foreign_key_actions(conn, "bookings")[("time_slot_id", "time_slots")][1] == "CASCADE"
+    index_names = {i["name"] for i in inspect(engine).get_indexes("time_slots")}
+    assert "ix_time_slots_event_id_start_time" in index_names
+
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA foreign_keys=ON"))
+        assert conn.execute(text("SELECT COUNT(*) FROM bookings")).scalar() == 3
+        conn.execute(text("DELETE FROM events WHERE id = 1"))
+        assert conn.execute(text("SELECT COUNT(*) FROM time_slots")).scalar() == 0
+        assert conn.execute(text("SELECT COUNT(*) FROM bookings")).scalar() == 0
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import update
+
+import models
+import pubsub
+from database import SessionLocal
+from routes import events
+
+
+def _messages(body):
+    """Parse a server-sent events body into (event, id, data) tuples, skipping comments."""
+    messages = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if line and not line.startswith((":", "retry"))
+        )
+        if fields:
+            messages.append((fields.get("event"), fields.get("id"), fields.get("data")))
+    return messages
+
+
+def test_hub_loads_once_per_change_and_fans_out():
+    broker = pubsub.MemoryBroker()
+    loads = []
+
+    def loader(event_id):
+        loads.append(event_id)
+        return {"version": len(loads), "time_slots": []}
+
+    async def scenario():
+        hub = pubsub.AvailabilityHub(broker, loader)
+        first, second = hub.subscribe(1), hub.subscribe(1)
+        other = hub.subscribe(2)
+        await asyncio.sleep(0.05)  # let the dispatcher start listening
+
+        # Writers publish from threadpool threads.
+        threading.Thread(target=broker.publish, args=(1,)).start()
+        got = await asyncio.wait_for(asyncio.gather(first.get(), second.get()), timeout=2)
+        assert got == [{"version": 1, "time_slots": []}] * 2
+        assert other.empty()
+        assert loads == [1]
+
+        hub.unsubscribe(1, first)
+        hub.unsubscribe(1, second)
+        assert hub.subscriber_count(1) == 0
+        await hub.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def short_streams(monkeypatch):
+    monkeypatch.setattr(pubsub, "SSE_MAX_SECONDS", 1.0)
+    monkeypatch.setattr(pubsub, "SSE_HEARTBEAT_SECONDS", 0.3)
+
+
+def _event(client):
+    response = client.post("/events/", json={
+        "title": "Live",
+        "time_slots": ["2030-01-01T09:00:00"],
+        "max_bookings_per_slot": 2,
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def _after(delay, action):
+    thread = threading.Thread(target=lambda: (time.sleep(delay), action()))
+    thread.start()
+    return thread
+
+
+def test_stream_pushes_bookings(client, short_streams):
+    event = _event(client)
+    slot_id = event["time_slots"][0]["id"]
+    booked = []
+    writer = _after(0.3, lambda: booked.append(client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": slot_id, "user_name": "Viewer", "user_email": "viewer@example.com",
+    }).status_code))
+
+    response = client.get(f"/events/{event['id']}/availability/stream")
+    writer.join()
+
+    assert booked == [201]
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = _messages(response.text)
+    assert [name for name, _, _ in messages] == ["availability", "availability"]
+    assert '"remaining":2' in messages[0][2] and '"remaining":1' in messages[1][2]
+    assert int(messages[1][1]) > int(messages[0][1])
+
+
+def test_stream_ends_when_the_event_is_deleted(client, short_streams):
+    event = _event(client)
+    writer = _after(0.3, lambda: client.delete(f"/events/{event['id']}"))
+
+    response = client.get(f"/events/{event['id']}/availability/stream")
+    writer.join()
+
+    assert [name for name, _, _ in _messages(response.text)] == ["availability", "deleted"]
+
+
+def test_stream_of_missing_event_is_404(client):
+    assert client.get("/events/999999/availability/stream").status_code == 404
+
+
+def test_snapshot_is_not_served_from_a_stale_cache(client):
+    event = _event(client)
+    assert client.get(f"/events/{event['id']}/availability").json()[0]["remaining"] == 2  # fills the cache
+
+    # A booking made by another worker: the database changes, but with a
+    # per-process cache nothing invalidates this worker's copy.
+    with SessionLocal() as db:
+        db.execute(update(models.TimeSlot).values(booked_count=1))
+        db.execute(update(models.Event).values(version=models.Event.version + 1))
+        db.commit()
+
+    assert client.get(f"/events/{event['id']}/availability").json()[0]["remaining"] == 2
+    assert events.load_availability_snapshot(event["id"])["time_slots"][0]["remaining"] == 1
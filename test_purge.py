@@ -0,0 +1,66 @@
+import datetime
+import logging
+
+from sqlalchemy import func, select
+
+import models
+from database import SessionLocal
+import cache
+import pubsub
+from purge import check_shared_backends, purge_expired_events
+
+NOW = datetime.datetime(2030, 6, 1)
+
+
+def _event(client, title, slots, recurrence=None):
+    response = client.post("/events/", json={
+        "title": title, "time_slots": slots, "max_bookings_per_slot": 5, "recurrence": recurrence,
+    })
+    assert response.status_code == 201
+    event = response.json()
+    for slot in event["time_slots"]:
+        client.post(f"/bookings/events/{event['id']}/bookings", json={
+            "time_slot_id": slot["id"], "user_name": "Past", "user_email": "past@example.com",
+        })
+    return event["id"]
+
+
+def _count(model):
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(model))
+    finally:
+        db.close()
+
+
+def test_purge_deletes_only_expired_events_in_batches(client):
+    expired = [_event(client, f"Past {i}", ["2030-01-01T09:00:00", "2030-02-01T09:00:00"]) for i in range(5)]
+    ongoing = _event(client, "Ongoing", ["2030-01-01T09:00:00", "2030-07-01T09:00:00"])
+    ended_rule = _event(client, "Ended series", [], {
+        "frequency": "weekly", "starts_at": "2030-01-07T09:00:00", "until": "2030-03-01T00:00:00",
+    })
+    open_rule = _event(client, "Open series", [], {"frequency": "daily", "starts_at": "2030-01-01T09:00:00"})
+
+    assert purge_expired_events(SessionLocal, NOW, batch_size=2) == 6
+
+    remaining = {event["id"] for event in client.get("/events/").json()["items"]}
+    assert remaining == {ongoing, open_rule}
+    assert not remaining & set(expired + [ended_rule])
+    # The cascade took the slots and bookings of the purged events along.
+    assert _count(models.TimeSlot) == 2
+    assert _count(models.Booking) == 2
+    assert _count(models.RecurrenceRule) == 1
+
+    assert purge_expired_events(SessionLocal, NOW) == 0
+
+
+def test_memory_backends_are_reported(monkeypatch, caplog):
+    monkeypatch.setattr(cache, "CACHE_BACKEND", "memory")
+    monkeypatch.setattr(pubsub, "PUBSUB_BACKEND", "memory")
+    with caplog.at_level(logging.WARNING, logger="purge"):
+        assert len(check_shared_backends()) == 2
+    assert "CACHE_BACKEND=memory" in caplog.text and "PUBSUB_BACKEND=memory" in caplog.text
+
+    monkeypatch.setattr(cache, "CACHE_BACKEND", "redis")
+    monkeypatch.setattr(pubsub, "PUBSUB_BACKEND", "postgres")
+    assert check_shared_backends() == []
@@ -0,0 +1,80 @@
+import pytest
+
+import cache
+
+# Each endpoint below must issue the same number of SQL statements whether
+# the event has one slot with one booking or many slots with many bookings.
+# A count that grows with the data means an N+1 query crept in.
+
+
+def _seed_event(client, slots, bookings_per_slot):
+    response = client.post("/events/", json={
+        "title": f"Event with {slots} slots",
+        "time_slots": [f"2030-01-{1 + i % 28:02d}T{8 + i // 28:02d}:00:00" for i in range(slots)],
+        "max_bookings_per_slot": max(bookings_per_slot, 1),
+    })
+    assert response.status_code == 201
+    event = response.json()
+    for slot in event["time_slots"]:
+        for n in range(bookings_per_slot):
+            booked = client.post(f"/bookings/events/{event['id']}/bookings", json={
+                "time_slot_id": slot["id"],
+                "user_name": f"User {n}",
+                # Per-event addresses, so a user's booking count grows with the event.
+                "user_email": f"user{n}@event{event['id']}.example.com",
+            })
+            assert booked.status_code == 201
+    return event
+
+
+def _statements_for(client, count_queries, method, url, **kwargs):
+    # Measure the database work, not a read-through cache hit.
+    cache.cache.clear()
+    count_queries.reset()
+    response = client.request(method, url, **kwargs)
+    assert response.status_code < 400, response.text
+    return count_queries.count
+
+
+READ_ENDPOINTS = [
+    "/events/{id}",
+    "/events/{id}?view=summary",
+    "/events/{id}/availability",
+    "/events/",
+    # user0 holds one booking of the small event and one per slot of the large one.
+    "/bookings/users/user0@event{id}.example.com/bookings",
+    "/bookings/users/user0@event{id}.example.com/bookings?include=details&when=upcoming",
+]
+
+
+@pytest.mark.parametrize("url", READ_ENDPOINTS)
+def test_read_endpoints_issue_constant_statements(client, count_queries, url):
+    small = _seed_event(client, slots=1, bookings_per_slot=1)
+    large = _seed_event(client, slots=40, bookings_per_slot=5)
+
+    small_count = _statements_for(client, count_queries, "GET", url.format(id=small["id"]))
+    large_count = _statements_for(client, count_queries, "GET", url.format(id=large["id"]))
+
+    assert large_count == small_count
+
+
+
+def test_create_event_issues_constant_statements(client, count_queries):
+    def create(slots):
+        return _statements_for(client, count_queries, "POST", "/events/", json={
+            "title": "Season",
+            "time_slots": [f"2030-02-01T{h:02d}:00:00" for h in range(slots)],
+        })
+
+    assert create(1) == create(24)
+
+
+def test_delete_event_issues_constant_statements(client, count_queries):
+    small = _seed_event(client, slots=1, bookings_per_slot=1)
+    large = _seed_event(client, slots=40, bookings_per_slot=5)
+
+    small_count = _statements_for(client, count_queries, "DELETE", f"/events/{small['id']}")
+    large_count = _statements_for(client, count_queries, "DELETE", f"/events/{large['id']}")
+
+    assert large_count == small_count
+    assert client.get(f"/bookings/users/user0@event{large['id']}.example.com/bookings").json()["items"] == []
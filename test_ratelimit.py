@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+import ratelimit
+from main import app
+
+
+def _rejected(client, reason):
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(f'booking_requests_rejected_total{{reason="{reason}"}}'):
+            return int(line.split()[-1])
+
+
+def _event(client):
+    event = client.post("/events/", json={
+        "title": "Opening night", "time_slots": ["2030-01-01T20:00:00"], "max_bookings_per_slot": 100,
+    }).json()
+    return event["id"], event["time_slots"][0]["id"]
+
+
+def _book(client, event_id, slot_id, email):
+    return client.post(f"/bookings/events/{event_id}/bookings", json={
+        "time_slot_id": slot_id, "user_name": "Fan", "user_email": email,
+    })
+
+
+def test_token_bucket_refills_and_takes_all_keys_or_none(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: clock[0])
+    limiter = ratelimit.MemoryRateLimiter(rate=1, burst=2)
+
+    async def scenario():
+        assert await limiter.acquire(["ip:a", "email:x"]) == 0
+        assert await limiter.acquire(["ip:a", "email:x"]) == 0
+        assert await limiter.acquire(["ip:a", "email:y"]) == pytest.approx(1.0)
+        # The rejected request took nothing from email:y.
+        assert await limiter.acquire(["ip:b", "email:y"]) == 0
+        assert await limiter.acquire(["ip:b", "email:y"]) == 0
+        clock[0] += 0.5
+        assert await limiter.acquire(["ip:a"]) == pytest.approx(0.5)
+        clock[0] += 0.5
+        assert await limiter.acquire(["ip:a"]) == 0
+
+    asyncio.run(scenario())
+
+
+def test_booking_over_the_rate_limit_gets_429(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "limiter", ratelimit.MemoryRateLimiter(rate=0.1, burst=2))
+    event_id, slot_id = _event(client)
+    before = _rejected(client, "rate_limited")
+
+    assert _book(client, event_id, slot_id, "one@example.com").status_code == 201
+    assert _book(client, event_id, slot_id, "two@example.com").status_code == 201
+    limited = _book(client, event_id, slot_id, "three@example.com")
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+    assert _rejected(client, "rate_limited") == before + 1
+
+
+def test_clients_behind_a_proxy_get_their_own_ip_bucket(client, monkeypatch):
+    # What uvicorn --proxy-headers --forwarded-allow-ips '*' installs (see render.yaml).
+    proxied = TestClient(ProxyHeadersMiddleware(app, trusted_hosts="*"))
+    monkeypatch.setattr(ratelimit, "limiter", ratelimit.MemoryRateLimiter(rate=0.1, burst=1))
+    event_id, slot_id = _event(client)
+
+    def book(ip, email):
+        return proxied.post(f"/bookings/events/{event_id}/bookings", headers={"X-Forwarded-For": ip}, json={
+            "time_slot_id": slot_id, "user_name": "Fan", "user_email": email,
+        }).status_code
+
+    assert book("203.0.113.1", "one@example.com") == 201
+    assert book("203.0.113.2", "two@example.com") == 201
+    assert book("203.0.113.1", "three@example.com") == 429
+
+
+def test_full_gate_sheds_load_with_503(client, monkeypatch):
+    gate = ratelimit.ConcurrencyGate(max_concurrency=1, max_waiting=0, timeout=0.1)
+    monkeypatch.setattr(ratelimit, "booking_gate", gate)
+    event_id, slot_id = _event(client)
+    before = _rejected(client, "overloaded")
+
+    assert _book(client, event_id, slot_id, "first@example.com").status_code == 201
+    assert gate.in_flight == 0
+
+    gate.in_flight = 1  # a booking still being served
+    shed = _book(client, event_id, slot_id, "second@example.com")
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == str(ratelimit.BOOKING_GATE_RETRY_AFTER_SECONDS)
+    metrics = client.get("/metrics").text
+    assert "booking_gate_in_flight 1" in metrics
+    assert _rejected(client, "overloaded") == before + 1
+
+
+def test_gate_hands_turns_to_waiters_in_order():
+    async def scenario():
+        gate = ratelimit.ConcurrencyGate(max_concurrency=1, max_waiting=2, timeout=0.2)
+        order = []
+
+        async def request(name, hold):
+            if not await gate.acquire():
+                order.append(f"{name} rejected")
+                return
+            order.append(name)
+            await asyncio.sleep(hold)
+            gate.release()
+
+        first = asyncio.create_task(request("first", 0.05))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(request(name, 0)) for name in ("second", "third")]
+        await asyncio.sleep(0)
+        assert gate.waiting == 2
+        # No room left to wait.
+        assert not await gate.acquire()
+        await asyncio.gather(first, *waiting)
+        assert order == ["first", "second", "third"]
+        assert (gate.in_flight, gate.waiting) == (0, 0)
+
+        # A waiter gives up after the timeout, and the gate stays consistent.
+        assert await gate.acquire()
+        assert not await gate.acquire()
+        gate.release()
+        assert (gate.in_flight, gate.waiting) == (0, 0)
+
+    asyncio.run(scenario())
@@ -0,0 +1,144 @@
+import datetime
+
+import models
+from recurrence import is_occurrence, nth_occurrence, occurrences
+
+
+def dt(*args):
+    return datetime.datetime(*args)
+
+
+def rule(**fields):
+    fields.setdefault("interval", 1)
+    return models.RecurrenceRule(**fields)
+
+
+def test_daily_rule_jumps_to_window_and_honours_count():
+    daily = rule(frequency="daily", interval=2, starts_at=dt(2030, 1, 1, 9), count=10)
+
+    window = list(occurrences(daily, dt(2030, 1, 10), dt(2030, 2, 1)))
+
+    # Occurrences are every other day; the 10th (index 9) is on Jan 19.
+    assert window == [dt(2030, 1, 11, 9), dt(2030, 1, 13, 9), dt(2030, 1, 15, 9), dt(2030, 1, 17, 9), dt(2030, 1, 19, 9)]
+
+
+def test_weekly_rule_with_weekdays_until_and_exclusions():
+    # 2030-01-02 is a Wednesday.
+    weekly = rule(
+        frequency="weekly",
+        weekdays=[0, 2],
+        starts_at=dt(2030, 1, 2, 18),
+        until=dt(2030, 1, 21, 18),
+        exclusions=[dt(2030, 1, 14, 18).isoformat()],
+    )
+
+    window = list(occurrences(weekly, dt(2029, 12, 1), dt(2030, 3, 1)))
+
+    # Monday Dec 31 is before starts_at, Monday Jan 14 is excluded,
+    # and Monday Jan 21 at 18:00 is the inclusive 'until'.
+    assert window == [dt(2030, 1, 2, 18), dt(2030, 1, 7, 18), dt(2030, 1, 9, 18), dt(2030, 1, 16, 18), dt(2030, 1, 21, 18)]
+
+
+def test_weekly_count_skips_days_before_start():
+    weekly = rule(frequency="weekly", interval=2, weekdays=[0, 4], starts_at=dt(2030, 1, 2, 8), count=3)
+
+    # Friday Jan 4, then (two weeks later) Monday Jan 14 and Friday Jan 18.
+    assert list(occurrences(weekly, dt(2030, 1, 1), dt(2031, 1, 1))) == [
+        dt(2030, 1, 4, 8), dt(2030, 1, 14, 8), dt(2030, 1, 18, 8)
+    ]
+    assert list(occurrences(weekly, dt(2030, 1, 15), dt(2031, 1, 1))) == [dt(2030, 1, 18, 8)]
+
+
+def test_nth_occurrence_matches_the_expansion():
+    weekly = rule(frequency="weekly", interval=2, weekdays=[0, 4], starts_at=dt(2030, 1, 2, 8), exclusions=[dt(2030, 1, 14, 8).isoformat()])
+    daily = rule(frequency="daily", interval=3, starts_at=dt(2030, 1, 1, 9))
+
+    # Excluded occurrences keep their index.
+    assert [nth_occurrence(weekly, index) for index in range(4)] == [
+        dt(2030, 1, 4, 8), dt(2030, 1, 14, 8), dt(2030, 1, 18, 8), dt(2030, 1, 28, 8)
+    ]
+    assert nth_occurrence(daily, 2) == dt(2030, 1, 7, 9)
+
+
+def test_is_occurrence():
+    daily = rule(frequency="daily", starts_at=dt(2030, 1, 1, 9))
+
+    assert is_occurrence(daily, dt(2030, 6, 1, 9))
+    assert not is_occurrence(daily, dt(2030, 6, 1, 10))
+    assert not is_occurrence(daily, dt(2029, 12, 31, 9))
+
+
+def test_recurring_event_slots_are_materialized_on_first_booking(client):
+    event = client.post("/events/", json={
+        "title": "Open gym",
+        "max_bookings_per_slot": 2,
+        "recurrence": {"frequency": "daily", "starts_at": "2030-01-01T07:00:00"},
+    }).json()
+    assert event["time_slots"] == []
+    assert event["recurrence"]["frequency"] == "daily"
+
+    window = {"from": "2030-03-01T00:00:00", "to": "2030-03-04T00:00:00"}
+    listed = client.get(f"/events/{event['id']}/occurrences", params=window).json()
+    assert [o["start_time"] for o in listed] == ["2030-03-01T07:00:00", "2030-03-02T07:00:00", "2030-03-03T07:00:00"]
+    assert all(o["slot_id"] is None and o["remaining"] == 2 for o in listed)
+
+    for email in ("a@example.com", "b@example.com"):
+        booked = client.post(f"/bookings/events/{event['id']}/bookings", json={
+            "start_time": "2030-03-02T07:00:00", "user_name": "Gym goer", "user_email": email,
+        })
+        assert booked.status_code == 201
+
+    listed = client.get(f"/events/{event['id']}/occurrences", params=window).json()
+    assert listed[1]["slot_id"] == booked.json()["time_slot_id"]
+    assert listed[1]["remaining"] == 0
+    assert len(client.get(f"/events/{event['id']}").json()["time_slots"]) == 1
+
+    missing = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "start_time": "2030-03-02T08:00:00", "user_name": "Gym goer", "user_email": "c@example.com",
+    })
+    assert missing.status_code == 404
+
+
+def test_offset_times_are_read_as_utc(client):
+    event = client.post("/events/", json={
+        "title": "Open gym",
+        "recurrence": {"frequency": "daily", "starts_at": "2030-01-01T09:00:00+02:00"},
+    }).json()
+    assert event["recurrence"]["starts_at"] == "2030-01-01T07:00:00"
+
+    listed = client.get(f"/events/{event['id']}/occurrences", params={
+        "from": "2030-01-02T00:00:00Z", "to": "2030-01-03T00:00:00Z",
+    })
+    assert listed.status_code == 200
+    assert [o["start_time"] for o in listed.json()] == ["2030-01-02T07:00:00"]
+
+    booked = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "start_time": "2030-01-02T07:00:00Z", "user_name": "Gym goer", "user_email": "a@example.com",
+    })
+    assert booked.status_code == 201
+
+
+def test_list_filters_match_unbooked_occurrences(client):
+    gym = client.post("/events/", json={
+        "title": "Open gym",
+        "recurrence": {"frequency": "daily", "starts_at": "2030-01-01T07:00:00", "count": 2},
+    }).json()
+    client.post("/events/", json={"title": "Talk", "time_slots": ["2030-06-01T10:00:00"]})
+
+    def titles(**params):
+        return [e["title"] for e in client.get("/events/", params=params).json()["items"]]
+
+    assert titles(has_availability=True) == ["Open gym", "Talk"]
+    assert titles(starts_after="2030-01-02T00:00:00", starts_before="2030-01-03T00:00:00") == ["Open gym"]
+    # The rule's two occurrences are over by March.
+    assert titles(starts_after="2030-03-01T00:00:00") == ["Talk"]
+
+    for day in ("01", "02"):
+        client.post(f"/bookings/events/{gym['id']}/bookings", json={
+            "start_time": f"2030-01-{day}T07:00:00", "user_name": "Gym goer", "user_email": "a@example.com",
+        })
+    assert titles(has_availability=True) == ["Talk"]
+
+
+def test_event_needs_slots_or_a_rule(client):
+    assert client.post("/events/", json={"title": "x"}).status_code == 422
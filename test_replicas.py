@@ -0,0 +1,135 @@
+import datetime
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+import database
+import models
+from main import app
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A second SQLite file acting as the only read replica."""
+    replicas = database.ReplicaSet([f"sqlite:///{tmp_path / 'replica.db'}"])
+    models.Base.metadata.create_all(bind=replicas.engines[0])
+    monkeypatch.setattr(database, "replicas", replicas)
+    yield replicas.engines[0]
+    replicas.engines[0].dispose()
+
+
+def _event(client, title="Primary"):
+    response = client.post("/events/", json={"title": title, "time_slots": ["2030-01-01T10:00:00"], "max_bookings_per_slot": 5})
+    assert response.status_code == 201
+    return response.json()
+
+
+def _seed_replica_booking(replica, email, name):
+    # Nothing replicates between the two files, so rows only the replica has
+    # show which database served a read.
+    with replica.begin() as conn:
+        conn.execute(insert(models.Event), {"id": 1, "title": "Replica", "max_bookings_per_slot": 5})
+        conn.execute(insert(models.TimeSlot), {"id": 1, "event_id": 1, "start_time": datetime.datetime(2030, 1, 1, 10)})
+        conn.execute(insert(models.Booking), {
+            "time_slot_id": 1, "user_name": name, "user_email": email, "created_at": datetime.datetime(2030, 1, 1),
+        })
+
+
+def _booking_names(client, email, **headers):
+    response = client.get(f"/bookings/users/{email}/bookings", headers=headers)
+    assert response.status_code == 200
+    return [item["user_name"] for item in response.json()["items"]]
+
+
+def test_reads_go_to_the_replica_until_the_client_writes(client, replica):
+    _seed_replica_booking(replica, "sam@example.com", "On the replica")
+    assert _booking_names(client, "sam@example.com") == ["On the replica"]
+
+    event = _event(client)
+    response = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": event["time_slots"][0]["id"], "user_name": "On the primary", "user_email": "sam@example.com",
+    })
+    assert response.status_code == 201
+    assert database.READ_YOUR_WRITES_COOKIE in response.cookies
+
+    # The test client sends the cookie back, so the writer reads the primary...
+    assert _booking_names(client, "sam@example.com") == ["On the primary"]
+    # ...while other clients (and the writer, once the cookie is gone) read the replica.
+    client.cookies.clear()
+    assert _booking_names(client, "sam@example.com") == ["On the replica"]
+
+
+def test_cross_site_writers_read_the_primary(client, replica):
+    # The frontend is served from another site, over HTTPS.
+    origin = "https://bookmyslot.vercel.app"
+    site = TestClient(app, base_url="https://api.example.com", headers={"Origin": origin})
+    _seed_replica_booking(replica, "sam@example.com", "On the replica")
+    event = _event(site)
+
+    response = site.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": event["time_slots"][0]["id"], "user_name": "On the primary", "user_email": "sam@example.com",
+    })
+    assert response.status_code == 201
+    assert response.headers["access-control-allow-origin"] == origin
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert database.READ_YOUR_WRITES_HEADER in response.headers["access-control-expose-headers"]
+    # A SameSite=Lax cookie would never be sent with the frontend's API calls.
+    assert "SameSite=None; Secure" in response.headers["set-cookie"]
+    until = response.headers[database.READ_YOUR_WRITES_HEADER]
+
+    # The cookie is sent back with credentialed requests...
+    assert _booking_names(site, "sam@example.com") == ["On the primary"]
+    # ...and where the browser blocks it, the client echoes the header instead.
+    site.cookies.clear()
+    assert _booking_names(site, "sam@example.com", **{database.READ_YOUR_WRITES_HEADER: until}) == ["On the primary"]
+    assert _booking_names(site, "sam@example.com") == ["On the replica"]
+    # A deadline a write could not have granted is ignored.
+    far = str(time.time() + 3600)
+    assert _booking_names(site, "sam@example.com", **{database.READ_YOUR_WRITES_HEADER: far}) == ["On the replica"]
+
+
+def test_failed_writes_and_reads_do_not_set_the_cookie(client, replica):
+    assert database.READ_YOUR_WRITES_COOKIE not in client.get("/events/").cookies
+    failed = client.post("/bookings/events/999/bookings", json={"time_slot_id": 1, "user_name": "A", "user_email": "a@example.com"})
+    assert failed.status_code == 404
+    assert database.READ_YOUR_WRITES_COOKIE not in failed.cookies
+    assert database.READ_YOUR_WRITES_HEADER not in failed.headers
+
+
+def test_cached_event_reads_are_loaded_from_the_primary(client, replica):
+    # The event exists on the primary only, like a write the replica has not
+    # received yet; the cache must not be filled from the replica.
+    event = _event(client)
+    client.cookies.clear()
+
+    assert client.get(f"/events/{event['id']}").json()["title"] == "Primary"
+    assert [item["title"] for item in client.get("/events/").json()["items"]] == ["Primary"]
+
+
+def test_unreachable_replica_falls_back_to_the_primary(client, tmp_path, monkeypatch):
+    replicas = database.ReplicaSet([f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+    monkeypatch.setattr(database, "replicas", replicas)
+    _event(client)
+    client.cookies.clear()
+
+    assert client.get("/bookings/users/sam@example.com/bookings").status_code == 200
+    assert replicas.fallbacks == 1
+    assert replicas.stats()[0]["down"]
+    # The replica is skipped until the retry period is over.
+    assert replicas.connect() is None
+    assert replicas.fallbacks == 2
+
+
+def test_replicas_are_used_in_turn(tmp_path):
+    replicas = database.ReplicaSet([f"sqlite:///{tmp_path / name}" for name in ("a.db", "b.db")])
+    picked = []
+    for _ in range(4):
+        connection = replicas.connect()
+        picked.append(replicas.engines.index(connection.engine))
+        connection.close()
+    assert picked == [0, 1, 0, 1]
+    for engine in replicas.engines:
+        engine.dispose()
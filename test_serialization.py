@@ -0,0 +1,85 @@
+import datetime
+import json
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+import schemas
+import serialization
+
+# The fast JSON path builds responses without the Pydantic models. Each
+# response must still be exactly what the route's response_model would
+# produce: validating it and dumping it again must give the same JSON back
+# (a missing, extra or differently formatted field would change it).
+
+
+def _round_trips(model, body):
+    adapter = TypeAdapter(model)
+    assert adapter.dump_python(adapter.validate_python(body), mode="json") == body
+
+
+def _seed(client):
+    event = client.post("/events/", json={
+        "title": "Contract",
+        "description": None,
+        # Sub-second start times exercise the datetime formatting.
+        "time_slots": ["2030-01-01T09:00:00", "2030-01-01T10:30:00.250000"],
+        "max_bookings_per_slot": 2,
+    }).json()
+    for slot in event["time_slots"]:
+        response = client.post(f"/bookings/events/{event['id']}/bookings", json={
+            "time_slot_id": slot["id"], "user_name": "Ada", "user_email": "ada@example.com",
+        })
+        assert response.status_code == 201
+    return event
+
+
+def test_event_list_matches_schema(client):
+    _seed(client)
+    client.post("/events/", json={"title": "Second", "description": "Text", "time_slots": ["2030-02-01T09:00:00"]})
+    for url in ("/events/?limit=1", "/events/?has_availability=true"):
+        body = client.get(url).json()
+        assert body["items"]
+        _round_trips(schemas.EventPage, body)
+
+
+def test_availability_matches_schema(client):
+    event = _seed(client)
+    body = client.get(f"/events/{event['id']}/availability").json()
+    assert [slot["start_time"] for slot in body] == ["2030-01-01T09:00:00", "2030-01-01T10:30:00.250000"]
+    _round_trips(List[schemas.SlotAvailability], body)
+    # The summary view shares the cached availability dict.
+    _round_trips(schemas.EventAvailability, client.get(f"/events/{event['id']}?view=summary").json())
+
+
+@pytest.mark.parametrize("params, model", [
+    ({}, schemas.BookingPage),
+    ({"include": "details"}, schemas.BookingDetailPage),
+])
+def test_user_bookings_match_schema(client, params, model):
+    _seed(client)
+    body = client.get("/bookings/users/ada@example.com/bookings", params={**params, "limit": 1}).json()
+    assert len(body["items"]) == 1 and body["next_cursor"]
+    _round_trips(model, body)
+
+
+def test_slot_search_matches_schema(client):
+    _seed(client)
+    body = client.get("/slots/", params={"from": "2030-01-01T00:00:00", "to": "2030-01-02T00:00:00", "limit": 1}).json()
+    assert len(body["items"]) == 1 and body["next_cursor"]
+    _round_trips(schemas.SlotSearchPage, body)
+
+
+def test_json_fallback_encodes_like_orjson(monkeypatch):
+    row = SimpleNamespace(
+        id=1, time_slot_id=2, user_name="Zoë", user_email="zoe@example.com",
+        created_at=datetime.datetime(2030, 1, 1, 9, 0, 0, 123456),
+        event_id=3, event_title="Café", start_time=datetime.datetime(2030, 1, 2, 9),
+    )
+    content = {"items": [serialization.booking_detail_item(row)], "next_cursor": None}
+    fast = serialization.FastJSONResponse(content).body
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(serialization.FastJSONResponse(content).body) == json.loads(fast)
+    _round_trips(schemas.BookingDetailPage, json.loads(fast))
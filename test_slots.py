@@ -0,0 +1,78 @@
+from sqlalchemy import text
+
+from database import engine
+
+
+def _event(client, title, slots, capacity=2):
+    response = client.post("/events/", json={"title": title, "time_slots": slots, "max_bookings_per_slot": capacity})
+    assert response.status_code == 201
+    return response.json()
+
+
+def _book(client, event, index, email):
+    response = client.post(f"/bookings/events/{event['id']}/bookings", json={
+        "time_slot_id": event["time_slots"][index]["id"], "user_name": "Searcher", "user_email": email,
+    })
+    assert response.status_code == 201
+
+
+def test_search_returns_slots_in_the_window_with_remaining_capacity(client):
+    morning = _event(client, "Morning", ["2030-03-05T09:00:00", "2030-03-05T11:30:00", "2030-03-05T12:00:00"])
+    other = _event(client, "Other", ["2030-03-05T08:59:59", "2030-03-05T10:00:00"], capacity=1)
+    _book(client, morning, 1, "a@example.com")
+    _book(client, other, 1, "a@example.com")
+
+    window = {"from": "2030-03-05T09:00:00", "to": "2030-03-05T12:00:00"}
+    items = client.get("/slots/", params=window).json()["items"]
+    assert [(item["event_title"], item["start_time"]) for item in items] == [
+        ("Morning", "2030-03-05T09:00:00"),
+        ("Other", "2030-03-05T10:00:00"),
+        ("Morning", "2030-03-05T11:30:00"),
+    ]
+    assert [(item["booked"], item["capacity"], item["remaining"]) for item in items] == [(0, 2, 2), (1, 1, 0), (1, 2, 1)]
+
+    available = client.get("/slots/", params={**window, "available": "true"}).json()["items"]
+    assert [item["slot_id"] for item in available] == [items[0]["slot_id"], items[2]["slot_id"]]
+
+    # Time zone offsets are converted to UTC.
+    shifted = client.get("/slots/", params={"from": "2030-03-05T10:00:00+01:00", "to": "2030-03-05T10:00:01+01:00"})
+    assert [item["slot_id"] for item in shifted.json()["items"]] == [items[0]["slot_id"]]
+
+
+def test_search_pages_through_equal_start_times(client):
+    for n in range(5):
+        _event(client, f"Parallel {n}", ["2030-03-05T09:00:00", "2030-03-05T10:00:00"])
+
+    seen, cursor = [], None
+    while True:
+        params = {"from": "2030-03-05T00:00:00", "to": "2030-03-06T00:00:00", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/slots/", params=params).json()
+        seen.extend((item["start_time"], item["event_id"]) for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == 10
+    assert seen == sorted(seen)
+
+
+def test_search_rejects_bad_windows_and_cursors(client):
+    assert client.get("/slots/", params={"from": "2030-03-05T10:00:00", "to": "2030-03-05T10:00:00"}).status_code == 400
+    assert client.get("/slots/", params={"from": "2030-03-05T10:00:00"}).status_code == 422
+    assert client.get("/slots/", params={
+        "from": "2030-03-05T10:00:00", "to": "2030-03-06T10:00:00", "cursor": "garbage",
+    }).status_code == 400
+
+
+def test_search_is_an_index_range_scan(client):
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT time_slots.id FROM time_slots JOIN events ON events.id = time_slots.event_id "
+            "WHERE time_slots.start_time >= '2030-01-01' AND time_slots.start_time < '2030-01-02' "
+            "AND (time_slots.start_time, time_slots.event_id, time_slots.id) > ('2030-01-01', 1, 1) "
+            "ORDER BY time_slots.start_time, time_slots.event_id, time_slots.id LIMIT 51"
+        )).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_time_slots_start_time_event_id" in details
+    assert "TEMP B-TREE" not in details
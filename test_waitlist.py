@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+import email_service
+import models, schemas
+from admission import admit_booking, cancel_and_promote
+from database import SessionLocal
+
+
+def _full_event(client, capacity=1, booked=None):
+    event = client.post("/events/", json={
+        "title": "Popular",
+        "time_slots": ["2030-01-01T09:00:00"],
+        "max_bookings_per_slot": capacity,
+    }).json()
+    slot_id = event["time_slots"][0]["id"]
+    bookings = [_book(client, event["id"], slot_id, f"holder{i}@example.com").json() for i in range(capacity if booked is None else booked)]
+    return event["id"], slot_id, bookings
+
+
+def _book(client, event_id, slot_id, email):
+    return client.post(f"/bookings/events/{event_id}/bookings", json={
+        "time_slot_id": slot_id, "user_name": "User", "user_email": email,
+    })
+
+
+def _wait(client, event_id, slot_id, email):
+    return client.post(f"/bookings/events/{event_id}/waitlist", json={
+        "time_slot_id": slot_id, "user_name": "Waiting", "user_email": email,
+    })
+
+
+def _slot_counts(slot_id):
+    db = SessionLocal()
+    try:
+        counter = db.scalar(select(models.TimeSlot.booked_count).where(models.TimeSlot.id == slot_id))
+        booked = db.scalar(select(func.count(models.Booking.id)).where(models.Booking.time_slot_id == slot_id))
+        waiting = db.scalar(select(func.count(models.WaitlistEntry.id)).where(models.WaitlistEntry.time_slot_id == slot_id))
+        return counter, booked, waiting
+    finally:
+        db.close()
+
+
+def test_cancellation_frees_the_seat(client):
+    event_id, slot_id, (booking,) = _full_event(client)
+
+    response = client.delete(f"/bookings/{booking['id']}")
+    assert response.status_code == 200
+    assert response.json() == {"cancelled_booking_id": booking["id"], "promoted": None}
+    assert _slot_counts(slot_id) == (0, 0, 0)
+    assert client.get(f"/events/{event_id}/availability").json()[0]["remaining"] == 1
+
+    assert client.delete(f"/bookings/{booking['id']}").status_code == 404
+    assert _book(client, event_id, slot_id, "next@example.com").status_code == 201
+
+
+def test_waitlist_only_for_full_slots(client):
+    event_id, slot_id, _ = _full_event(client, capacity=2, booked=1)
+    assert _wait(client, event_id, slot_id, "early@example.com").status_code == 409
+
+    _book(client, event_id, slot_id, "second@example.com")
+    first = _wait(client, event_id, slot_id, "early@example.com")
+    assert first.status_code == 201
+    assert first.json()["position"] == 1
+    assert _wait(client, event_id, slot_id, "late@example.com").json()["position"] == 2
+
+    assert _wait(client, event_id, slot_id, "early@example.com").status_code == 409  # already waiting
+    assert _wait(client, event_id, slot_id, "holder0@example.com").status_code == 409  # already booked
+    assert _wait(client, event_id, 999999, "other@example.com").status_code == 404
+
+
+def test_cancellation_promotes_the_first_in_line(client, monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_ENABLED", True)
+    event_id, slot_id, (booking,) = _full_event(client)
+    first = _wait(client, event_id, slot_id, "first@example.com").json()
+    _wait(client, event_id, slot_id, "second@example.com")
+    assert client.delete(f"/bookings/waitlist/{first['id']}").status_code == 204
+    _wait(client, event_id, slot_id, "third@example.com")
+
+    result = client.delete(f"/bookings/{booking['id']}").json()
+    assert result["promoted"]["user_email"] == "second@example.com"
+    # The seat changed hands: still full, one fewer waiting.
+    assert _slot_counts(slot_id) == (1, 1, 1)
+    assert _book(client, event_id, slot_id, "sneaky@example.com").status_code == 409
+
+    db = SessionLocal()
+    try:
+        emails = db.execute(select(models.EmailOutbox.kind, models.EmailOutbox.recipient).order_by(models.EmailOutbox.id)).all()
+    finally:
+        db.close()
+    assert emails[-2:] == [("cancellation", "holder0@example.com"), ("confirmation", "second@example.com")]
+
+
+def test_concurrent_cancellations_and_bookings_on_a_hot_slot(client):
+    capacity, waiting, cancellations, newcomers = 20, 8, 12, 40
+    event_id, slot_id, bookings = _full_event(client, capacity=capacity)
+    for i in range(waiting):
+        assert _wait(client, event_id, slot_id, f"waiting{i}@example.com").status_code == 201
+
+    def cancel(booking):
+        db = SessionLocal()
+        try:
+            return cancel_and_promote(db, booking["id"])[1].promoted is not None
+        finally:
+            db.close()
+
+    def book(i):
+        db = SessionLocal()
+        try:
+            admit_booking(db, event_id, schemas.BookingCreate(
+                time_slot_id=slot_id, user_name="New", user_email=f"new{i}@example.com"
+            ))
+            return 201
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        promotions = pool.map(cancel, bookings[:cancellations])
+        outcomes = pool.map(book, range(newcomers))
+        promotions, outcomes = list(promotions), list(outcomes)
+
+    # Every waiting user got a seat before any newcomer could take one.
+    assert promotions.count(True) == waiting
+    freed = cancellations - waiting
+    assert outcomes.count(201) <= freed
+    counter, booked, still_waiting = _slot_counts(slot_id)
+    assert still_waiting == 0
+    assert counter == booked == capacity - freed + outcomes.count(201)